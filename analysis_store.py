@@ -0,0 +1,226 @@
+"""
+Durable store of every generated analysis (Task 1, 2 and 3 results).
+
+Results used to live only in `st.session_state` and were lost with the
+browser tab or the server process. Here each one is a row in a SQLite file
+(WAL mode, one connection per thread, like the other stores) with its JSON
+payload stored compactly (zlib-compressed, no whitespace). Rows are indexed
+by kind, category, product, creation time and prompt hash, so the latest
+result, the history of a category and an exact prompt can all be looked up
+without scanning payloads.
+
+Kinds used by the app: "market", "contract", "contract_item", "contract_summary",
+"score_initial", "score_refined".
+Scorecards point at the market run they were built from via `parent_id`.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_STORE_PATH = os.environ.get("ANALYSIS_STORE_PATH", ".cache/analyses.sqlite3")
+
+KINDS = ("market", "contract", "contract_item", "contract_summary", "score_initial",
+         "score_refined")
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def _pack(data) -> tuple:
+    text = json.dumps(data, separators=(",", ":"), ensure_ascii=False, sort_keys=True)
+    raw = text.encode("utf-8")
+    return zlib.compress(raw, 6), hashlib.sha256(raw).hexdigest()
+
+
+class AnalysisStore:
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind        TEXT NOT NULL,
+                category    TEXT,
+                prompt_hash TEXT,
+                data_hash   TEXT NOT NULL,
+                model       TEXT,
+                parent_id   INTEGER REFERENCES analyses(id),
+                created_at  REAL NOT NULL,
+                data        BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS analysis_products (
+                analysis_id INTEGER NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+                product     TEXT NOT NULL,
+                PRIMARY KEY (product, analysis_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_analyses_kind_category
+                ON analyses(kind, category, created_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_analyses_prompt ON analyses(prompt_hash);
+            CREATE INDEX IF NOT EXISTS idx_analyses_parent ON analyses(parent_id);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # ---------------------------------------------------------
+    # WRITE
+    # ---------------------------------------------------------
+    def save(self, kind: str, data: dict, category: str = None, products=(),
+             prompt: str = None, model: str = None, parent_id: int = None) -> int:
+        """
+        Persist one result and return its id. Saving the same payload again
+        for the same kind, category and parent returns the existing id.
+        """
+        blob, data_hash = _pack(data)
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT id FROM analyses WHERE kind = ? AND category IS ? AND parent_id IS ? "
+            "AND data_hash = ? ORDER BY created_at DESC LIMIT 1",
+            (kind, category, parent_id, data_hash),
+        ).fetchone()
+        if row:
+            return row[0]
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT INTO analyses(kind, category, prompt_hash, data_hash, model, parent_id, "
+                "created_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, category, prompt_hash(prompt) if prompt else None, data_hash, model,
+                 parent_id, time.time(), blob),
+            )
+            analysis_id = cur.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO analysis_products(analysis_id, product) VALUES (?, ?)",
+                [(analysis_id, p) for p in products],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return analysis_id
+
+    def delete(self, analysis_id: int):
+        self._conn().execute("DELETE FROM analyses WHERE id = ?", (analysis_id,))
+
+    # ---------------------------------------------------------
+    # READ
+    # ---------------------------------------------------------
+    _COLUMNS = "a.id, a.kind, a.category, a.model, a.parent_id, a.created_at"
+
+    def _meta(self, row) -> dict:
+        analysis_id, kind, category, model, parent_id, created_at = row[:6]
+        products = [
+            r[0] for r in self._conn().execute(
+                "SELECT product FROM analysis_products WHERE analysis_id = ? ORDER BY rowid",
+                (analysis_id,),
+            )
+        ]
+        return {
+            "id": analysis_id,
+            "kind": kind,
+            "category": category,
+            "products": products,
+            "model": model,
+            "parent_id": parent_id,
+            "created_at": created_at,
+        }
+
+    def _entry(self, row) -> dict:
+        entry = self._meta(row)
+        entry["data"] = json.loads(zlib.decompress(row[6]).decode("utf-8"))
+        return entry
+
+    def get(self, analysis_id: int):
+        row = self._conn().execute(
+            f"SELECT {self._COLUMNS}, a.data FROM analyses a WHERE a.id = ?", (analysis_id,)
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def latest(self, kind: str, category: str = None, product: str = None, parent_id: int = None):
+        """Most recent result of `kind`, optionally for a category, product or parent run."""
+        where, params = self._filters(kind, category, product, parent_id)
+        row = self._conn().execute(
+            f"SELECT {self._COLUMNS}, a.data FROM analyses a {where} "
+            "ORDER BY a.created_at DESC LIMIT 1",
+            params,
+        ).fetchone()
+        return self._entry(row) if row else None
+
+    def by_prompt(self, prompt: str, kind: str = None):
+        """Most recent result generated from exactly this prompt."""
+        sql = f"SELECT {self._COLUMNS}, a.data FROM analyses a WHERE a.prompt_hash = ?"
+        params = [prompt_hash(prompt)]
+        if kind:
+            sql += " AND a.kind = ?"
+            params.append(kind)
+        row = self._conn().execute(sql + " ORDER BY a.created_at DESC LIMIT 1", params).fetchone()
+        return self._entry(row) if row else None
+
+    def history(self, kind: str = None, category: str = None, product: str = None,
+                limit: int = 50, offset: int = 0) -> list:
+        """Metadata (no payloads) of past results, newest first."""
+        where, params = self._filters(kind, category, product, None)
+        rows = self._conn().execute(
+            f"SELECT {self._COLUMNS} FROM analyses a {where} "
+            "ORDER BY a.created_at DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [self._meta(row) for row in rows]
+
+    def products(self, kind: str) -> list:
+        """Every product with a stored result of `kind`, in one query."""
+        return [
+            r[0] for r in self._conn().execute(
+                "SELECT DISTINCT p.product FROM analysis_products p "
+                "JOIN analyses a ON a.id = p.analysis_id WHERE a.kind = ?",
+                (kind,),
+            )
+        ]
+
+    def since(self, kind: str, after_id: int, limit: int = 500) -> list:
+        """Results of `kind` with an id above `after_id`, payloads included, oldest first."""
+        rows = self._conn().execute(
+            f"SELECT {self._COLUMNS}, a.data FROM analyses a WHERE a.kind = ? AND a.id > ? "
+            "ORDER BY a.id LIMIT ?",
+            (kind, after_id, limit),
+        ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def _filters(self, kind, category, product, parent_id):
+        clauses, params = [], []
+        if product is not None:
+            clauses.append("a.id IN (SELECT analysis_id FROM analysis_products WHERE product = ?)")
+            params.append(product)
+        for column, value in (("kind", kind), ("category", category), ("parent_id", parent_id)):
+            if value is not None:
+                clauses.append(f"a.{column} = ?")
+                params.append(value)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        counts = dict(conn.execute("SELECT kind, COUNT(*) FROM analyses GROUP BY kind"))
+        stored = conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM analyses").fetchone()[0]
+        return {"entries": sum(counts.values()), "by_kind": counts, "bytes": stored}
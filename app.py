@@ -1,9 +1,63 @@
-import json
-from datetime import date
+import functools
+import os
+import re
+import time
+import uuid
 
-import pandas as pd
 import streamlit as st
-from openai import OpenAI
+
+from analysis_store import AnalysisStore
+from catalog import task1_categories, task2_products
+from contract_fanout import run_contract_fanout
+from contract_reuse import ContractItemReuse, canonical_item
+from exports import (
+    FORMATS,
+    available_formats,
+    entry_tables,
+    export_to_file,
+    stored_reports,
+    stored_tables,
+)
+from job_queue import DONE, JobQueue
+from json_stream import JsonStreamParser
+from llm import (
+    DEFAULT_MAX_TOKENS,
+    LLM_BACKEND,
+    LLM_MODEL,
+    complete,
+    complete_stream,
+    finish_json,
+    make_client,
+)
+from llm_cache import ResponseCache
+from llm_client import shared_limiter
+from market_store import MarketIntelStore
+from market_warmup import BackgroundRefresher, validate_market_data
+from model_router import complete_json_routed, first_tier, model_label, recording_models
+from prompts import (
+    INITIAL_WEIGHTS,
+    REFINED_WEIGHTS,
+    contract_prompt,
+    market_intelligence_prompt,
+    scorecard_dimension_refinement_prompt,
+    scorecard_initial_prompt,
+    scorecard_refined_prompt,
+)
+from render import (
+    contract_item_md,
+    contract_summary_md,
+    country_risk_md,
+    kpis_md,
+    section_md,
+    supplier_md,
+)
+from schemas import CONTRACT_FORMAT, MARKET_FORMAT
+from scorecard_jobs import STAGES, ScorecardJob
+from single_flight import FLIGHTS
+from telemetry import RECORDER
+from usage_ledger import BUDGET, EXHAUSTED, LEDGER, BudgetExceeded, set_session
+
+SCRIPT_STARTED = time.perf_counter()
 
 # ---------------------------------------------------------
 # PAGE CONFIG
@@ -17,147 +71,362 @@ st.set_page_config(
 # ---------------------------------------------------------
 # LIGHT THEME CSS
 # ---------------------------------------------------------
-st.markdown(
-    """
-    <style>
-    body {
-        background: linear-gradient(180deg, #f5f7fb 0%, #ffffff 40%, #e6f2ff 100%);
-        color: #0f172a;
-    }
-    .block-container {
-        padding-top: 1.8rem !important;
-        padding-bottom: 3rem !important;
-        max-width: 1200px;
-    }
-    .card {
-        background-color: #ffffff;
-        border-radius: 18px;
-        padding: 1.4rem 1.6rem;
-        box-shadow: 0 16px 30px rgba(15,23,42,0.06);
-        border: 1px solid #e2e8f0;
-        margin-bottom: 1.1rem;
-    }
-    .task-header {
-        background: linear-gradient(90deg, #eef4ff 0%, #f0fff4 100%);
-        border-radius: 18px;
-        padding: 1.4rem 1.6rem;
-        border: 1px solid #d4e4ff;
-        margin-bottom: 1.2rem;
-    }
-    .pill {
-        display: inline-flex;
-        align-items: center;
-        gap: 6px;
-        padding: 0.25rem 0.6rem;
-        border-radius: 9999px;
-        font-size: 0.78rem;
-        font-weight: 600;
-        letter-spacing: 0.02em;
-        border: 1px solid rgba(148,163,184,0.5);
-        background-color: #ffffff;
-        color: #1d4ed8;
-    }
-    .section-title {
-        font-weight: 700;
-        font-size: 1.05rem;
-        margin-bottom: 0.45rem;
-        color: #0f172a;
-    }
-    .tiny-label {
-        font-size: 0.75rem;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        color: #64748b;
-        margin-bottom: 0.25rem;
-    }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+THEME_CSS = """
+body {
+    background: linear-gradient(180deg, #f5f7fb 0%, #ffffff 40%, #e6f2ff 100%);
+    color: #0f172a;
+}
+.block-container {
+    padding-top: 1.8rem !important;
+    padding-bottom: 3rem !important;
+    max-width: 1200px;
+}
+.card {
+    background-color: #ffffff;
+    border-radius: 18px;
+    padding: 1.4rem 1.6rem;
+    box-shadow: 0 16px 30px rgba(15,23,42,0.06);
+    border: 1px solid #e2e8f0;
+    margin-bottom: 1.1rem;
+}
+.task-header {
+    background: linear-gradient(90deg, #eef4ff 0%, #f0fff4 100%);
+    border-radius: 18px;
+    padding: 1.4rem 1.6rem;
+    border: 1px solid #d4e4ff;
+    margin-bottom: 1.2rem;
+}
+.pill {
+    display: inline-flex;
+    align-items: center;
+    gap: 6px;
+    padding: 0.25rem 0.6rem;
+    border-radius: 9999px;
+    font-size: 0.78rem;
+    font-weight: 600;
+    letter-spacing: 0.02em;
+    border: 1px solid rgba(148,163,184,0.5);
+    background-color: #ffffff;
+    color: #1d4ed8;
+}
+.section-title {
+    font-weight: 700;
+    font-size: 1.05rem;
+    margin-bottom: 0.45rem;
+    color: #0f172a;
+}
+.tiny-label {
+    font-size: 0.75rem;
+    font-weight: 600;
+    text-transform: uppercase;
+    letter-spacing: 0.05em;
+    color: #64748b;
+    margin-bottom: 0.25rem;
+}
+"""
+
+
+@st.cache_resource
+def theme_css() -> str:
+    # Collapsed once per process instead of re-sending the indented source
+    return "<style>" + re.sub(r"\s+", " ", THEME_CSS).strip() + "</style>"
+
+
+st.markdown(theme_css(), unsafe_allow_html=True)
 
 # ---------------------------------------------------------
 # OPENAI CLIENT
 # ---------------------------------------------------------
 OPENAI_API_KEY = st.secrets.get("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
+if not OPENAI_API_KEY and LLM_BACKEND != "fake":
     st.error("OPENAI_API_KEY missing in Streamlit secrets.")
     st.stop()
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+
+@st.cache_resource
+def get_llm_client(api_key: str):
+    # One pooled, rate-limited client per server process, shared by every
+    # session (see llm_client.py for the limits).
+    return make_client(api_key)
+
+
+def llm_client():
+    # Built (and the OpenAI SDK imported) on the first generation, not on
+    # the first page load
+    return get_llm_client(OPENAI_API_KEY)
+
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    # One cache object per server process; the SQLite file behind it is
+    # shared with every other process on the host.
+    return ResponseCache()
+
+
+response_cache = get_response_cache()
+
+
+@st.cache_resource
+def get_market_store() -> MarketIntelStore:
+    return MarketIntelStore()
+
+
+@st.cache_resource
+def get_market_refresher() -> BackgroundRefresher:
+    # Keeps already-warmed Task 1 categories fresh; see market_warmup.py
+    # for the full batch warm-up. Started by the first Task 1 result, so a
+    # page load alone does not build the client.
+    interval = int(os.environ.get("MARKET_REFRESH_INTERVAL_SECONDS", 3600))
+    return BackgroundRefresher(
+        llm_client(), get_market_store(), cache=response_cache, interval_seconds=interval
+    ).start()
+
+
+@st.cache_resource
+def get_analysis_store() -> AnalysisStore:
+    # Every generated result, so a new tab or a restart does not regenerate
+    return AnalysisStore()
+
+
+@st.cache_resource
+def get_contract_reuse() -> ContractItemReuse:
+    # Stored per-item Task 2 analyses plus a vector index of their names
+    return ContractItemReuse(get_analysis_store())
+
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    # Long analyses run here, outside the script run, so a rerun does not
+    # discard them (see job_queue.py)
+    return JobQueue()
+
+
+@st.cache_resource
+def get_risk_store():
+    # Country risk scores of every market run as Parquet, for the portfolio
+    # view; created (and pandas / pyarrow loaded) on first use
+    from risk_store import RiskStore
+
+    return RiskStore()
+
+
+market_store = get_market_store()
+analysis_store = get_analysis_store()
+job_queue = get_job_queue()
+contract_reuse = get_contract_reuse()
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+
+def bind_session():
+    """
+    Book LLM usage of this run, and of the jobs and threads it starts, to the
+    browser session (usage_ledger.py). A fragment rerun runs on its own
+    thread with a fresh context, so every fragment that starts LLM work or
+    checks the budget calls this first.
+    """
+    set_session(st.session_state.session_id)
+
+
+bind_session()
 
 # ---------------------------------------------------------
 # HELPERS
 # ---------------------------------------------------------
-def call_llm(prompt: str, max_tokens: int = 3500) -> str:
-    response = client.responses.create(
-        model="gpt-4.1-mini",
-        input=prompt,
-        max_output_tokens=max_tokens,
-    )
-    return (response.output_text or "").strip()
+def call_llm(prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, text_format: dict = None) -> str:
+    return complete(llm_client(), prompt, max_tokens, cache=response_cache, text_format=text_format)
+
+
+def call_llm_json(prompt: str, text_format: dict, usage: dict = None) -> dict:
+    # Cheapest tier first, escalating on invalid output (see model_router.py)
+    return complete_json_routed(llm_client(), prompt, text_format, cache=response_cache,
+                                usage=usage)
+
+
+def finish_llm_json(prompt: str, raw: str, text_format: dict, max_tokens: int = DEFAULT_MAX_TOKENS,
+                    model: str = LLM_MODEL) -> dict:
+    return finish_json(llm_client(), prompt, raw, text_format, cache=response_cache,
+                       max_tokens=max_tokens, model=model)
 
 
-def parse_json_from_text(raw: str):
-    first = raw.find("{")
-    last = raw.rfind("}")
-    if first == -1 or last == -1:
-        raise ValueError("LLM did not return valid JSON.")
-    return json.loads(raw[first:last+1])
+def call_llm_stream(prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, text_format: dict = None,
+                    model: str = LLM_MODEL, usage: dict = None):
+    return complete_stream(llm_client(), prompt, max_tokens, cache=response_cache, model=model,
+                           text_format=text_format, usage=usage)
+
+
+def stream_llm_json(prompt: str, watch_arrays, on_event, text_format: dict,
+                    usage: dict = None) -> str:
+    """
+    Stream a JSON response from the first routing tier of `text_format`,
+    calling `on_event(kind, key, value)` for every element of `watch_arrays`
+    (and every top-level string field) as soon as it is complete. Returns
+    the full raw text; pass it to `finish_streamed_json`.
+    """
+    tier = first_tier(text_format)
+    parser = JsonStreamParser(watch_arrays)
+    for delta in call_llm_stream(prompt, tier.max_tokens, text_format, tier.model, usage):
+        for event in parser.feed(delta):
+            on_event(*event)
+    return parser.text.strip()
+
+
+def finish_streamed_json(prompt: str, raw: str, text_format: dict, usage: dict = None) -> dict:
+    """
+    Validate a streamed response, escalating to the next tiers if it is
+    unusable. `usage["model"]` is then the model of the returned data.
+    """
+    return complete_json_routed(llm_client(), prompt, text_format, cache=response_cache,
+                                raw=raw, raw_usage=usage, usage=usage)
 
 
 # ---------------------------------------------------------
-# STATIC DATA
+# RENDERING HELPERS
 # ---------------------------------------------------------
-task1_categories = [
-    "Electronics & Semiconductors",
-    "Packaging Materials",
-    "Logistics & Transportation",
-    "Chemicals & Materials",
-    "IT Services & Software",
-    "Hardware Components (ODM)",
-    "Cloud Computing Services",
-    "Network Equipment",
-    "Data Storage Solutions",
-    "Manufacturing Equipment",
-    "Office Supplies",
-    "Energy & Utilities",
-    "Laptop Components (Displays, Batteries)",
-    "Server Processors (CPUs)",
-    "Semiconductor & Microchips",
-    "Standard Cables & Connectors",
-    "Cooling Systems & Thermal Solutions",
-    "Power Supply Units",
-    "Networking Equipment (Switches/Routers)",
-    "Data Storage Devices (SSDs)",
-]
-
-task2_products = [
-    "Laptop Components (Displays, Batteries, Keyboards)",
-    "Server Components (Processors, Memory, Storage)",
-    "Semiconductor & Microchips",
-    "Printed Circuit Boards (PCBs)",
-    "Standard Cables & Connectors",
-    "Cooling Systems & Thermal Solutions",
-    "Power Supply Units",
-    "Networking Equipment",
-    "Data Storage Devices (SSDs)",
-    "Graphics Processing Units (GPUs)",
-    "Packaging Materials",
-    "Logistics & Freight Services",
-    "Green/Sustainable Materials",
-    "Cloud Infrastructure Services",
-    "IT Support & Consulting",
-    "Security & Compliance Solutions",
-    "Manufacturing Equipment & Tools",
-    "Testing & Quality Assurance Equipment",
-    "Raw Materials (Plastics, Metals, Composites)",
-]
-
-for key in ["market_data", "contract_data", "score_initial", "score_refined"]:
+# Builders from render.py, memoised by a hash of their payload so that an
+# unchanged section is not rebuilt on every rerun.
+MARKDOWN_BUILDERS = {
+    "supplier": supplier_md,
+    "country_risk": country_risk_md,
+    "contract_item": contract_item_md,
+    "contract_summary": contract_summary_md,
+    "kpis": kpis_md,
+}
+
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def cached_markdown(kind: str, payload) -> str:
+    return MARKDOWN_BUILDERS[kind](payload)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def cached_section(kind: str, rows: list) -> str:
+    return section_md(MARKDOWN_BUILDERS[kind], rows)
+
+
+# The table builders import pandas / numpy on first use, so the first page
+# load does not pay for them until a table is actually drawn.
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_scorecard_frame(scorecard: dict):
+    from scorecard import scorecard_frame
+
+    return scorecard_frame(scorecard)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_what_if_frame(scores, base_weights: dict, weights: dict):
+    from scorecard import what_if_frame
+
+    return what_if_frame(scores, base_weights, weights)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_sensitivity_sweep(scores, base_weights: dict, factors):
+    from scorecard import sensitivity_sweep
+
+    return sensitivity_sweep(scores, base_weights, factors)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_comparison_frames(market_by_category: dict):
+    from market_compare import risks_frame, suppliers_frame
+
+    return suppliers_frame(market_by_category), risks_frame(market_by_category)
+
+
+def render_supplier(s: dict):
+    st.markdown(cached_markdown("supplier", s))
+
+
+def render_country_risk(r: dict):
+    st.markdown(cached_markdown("country_risk", r))
+
+
+def render_contract_item(item: dict):
+    st.markdown(cached_markdown("contract_item", item))
+
+
+# ---------------------------------------------------------
+# RERUN TIMINGS
+# ---------------------------------------------------------
+def record_timing(name: str, seconds: float):
+    st.session_state.setdefault("render_timings", {})[name] = seconds
+    RECORDER.record({"name": f"render.{name}", "start": time.time() - seconds, "duration": seconds})
+
+
+def timed(name: str):
+    """Record how long each (fragment) run of the wrapped function takes."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_timing(name, time.perf_counter() - t0)
+        return wrapper
+    return decorator
+
+
+def polling_fragment(active):
+    """
+    A fragment that reruns every second while `active()` is true, and is a
+    plain call otherwise, so an idle tab does not rerun it forever. Whoever
+    starts the work triggers a full rerun so the polling variant is mounted;
+    the fragment's own `st.rerun()` after collecting switches it back.
+    """
+    def decorator(fn):
+        polling = st.fragment(run_every=1.0)(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return (polling if active() else fn)(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------
+# RESULTS (session state, backed by the analysis store)
+# ---------------------------------------------------------
+def load_market_run(entry: dict):
+    """Show a stored Task 1 run, together with any scorecards built from it."""
+    st.session_state.market_data = entry["data"]
+    st.session_state.market_id = entry["id"]
+    st.session_state.market_meta = {"generated_at": entry["created_at"], "stale": False}
+    for stage in STAGES:
+        saved = analysis_store.latest(f"score_{stage}", parent_id=entry["id"])
+        st.session_state[f"score_{stage}"] = saved["data"] if saved else None
+
+
+def save_market_analysis(category: str, data: dict, prompt: str, model: str = None) -> int:
+    # `model` is the one that answered (routing and budgets pick it per call).
+    # The risk store is not written here: that would load pandas / pyarrow in
+    # the request; the portfolio view's backfill picks the run up when shown.
+    return analysis_store.save("market", data, category=category, prompt=prompt, model=model)
+
+
+def save_market_run(category: str, data: dict, prompt: str, meta: dict = None, model: str = None):
+    entry_id = save_market_analysis(category, data, prompt, model=model)
+    load_market_run({"id": entry_id, "data": data, "created_at": time.time()})
+    st.session_state.market_meta = meta
+
+
+for key in ["market_data", "market_id", "market_meta", "contract_data", "score_initial",
+            "score_refined", "score_job"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
+# A new session picks up where the last one left off
+if "restored" not in st.session_state:
+    st.session_state.restored = True
+    latest_market = analysis_store.latest("market")
+    if latest_market:
+        load_market_run(latest_market)
+    latest_contract = analysis_store.latest("contract")
+    if latest_contract:
+        st.session_state.contract_data = latest_contract["data"]
+
 # ---------------------------------------------------------
 # HEADER
 # ---------------------------------------------------------
@@ -175,17 +444,251 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# ---------------------------------------------------------
+# EXPORTS
+# ---------------------------------------------------------
+def export_download(key: str, fmt: str, write):
+    """"Prepare" button that writes an export with `write(fmt, stem)`, then its download button."""
+    state_key = f"{key}_export_file"
+    if st.button("Prepare export", key=f"{key}_export", use_container_width=True):
+        with st.spinner("Writing export…"):
+            try:
+                path = write(fmt, f"{st.session_state.session_id}-{key}")
+            except Exception as e:
+                st.error(f"Export failed: {e}")
+                st.session_state.pop(state_key, None)
+            else:
+                st.session_state[state_key] = (fmt, path)
+
+    prepared = st.session_state.get(state_key)
+    if prepared and prepared[0] == fmt and os.path.exists(prepared[1]):
+        with open(prepared[1], "rb") as f:
+            st.download_button(
+                f"⬇️ Download ({fmt})", f, file_name=f"{key}-export.{FORMATS[fmt][0]}",
+                mime=FORMATS[fmt][1], key=f"{key}_download", use_container_width=True,
+            )
+
+
+def export_panel(key: str, entries: list, title: str):
+    """Export of the results shown in a tab: flat tables or a PDF report."""
+    with st.expander("⬇️ Export results"):
+        fmt = st.selectbox("Format", available_formats(), key=f"{key}_export_format")
+        # A file prepared for earlier results is not offered for the new ones
+        signature = tuple(id(entry["data"]) for entry in entries)
+        if st.session_state.get(f"{key}_export_for") != signature:
+            st.session_state.pop(f"{key}_export_file", None)
+            st.session_state[f"{key}_export_for"] = signature
+        reports = [(entry["kind"], entry["data"], entry["category"]) for entry in entries]
+        export_download(
+            key, fmt,
+            lambda fmt, stem: export_to_file(fmt, entry_tables(entries), reports, stem, title),
+        )
+
+
+@st.fragment
+def bulk_export():
+    with st.expander("Export stored analyses"):
+        kinds = st.multiselect(
+            "Kinds", ["market", "contract", "contract_item", "score_initial", "score_refined"],
+            default=["market"], key="bulk_export_kinds",
+        )
+        limit = st.number_input("Newest per kind", min_value=1, max_value=100_000, value=500,
+                                step=100, key="bulk_export_limit")
+        fmt = st.selectbox("Format", available_formats(), key="bulk_export_format")
+        if not kinds:
+            return
+        # Payloads are read from the store one at a time while the file is written
+        export_download(
+            "bulk", fmt,
+            lambda fmt, stem: export_to_file(
+                fmt, stored_tables(analysis_store, kinds, limit),
+                stored_reports(analysis_store, kinds, limit), stem, "Stored procurement analyses",
+            ),
+        )
+
+
+# ---------------------------------------------------------
+# SIDEBAR · RESPONSE CACHE
+# ---------------------------------------------------------
+with st.sidebar:
+    st.markdown('<div class="tiny-label">LLM RESPONSE CACHE</div>', unsafe_allow_html=True)
+    cache_stats = response_cache.stats()
+    st.caption(
+        f"Entries: {cache_stats['entries']} · "
+        f"Hits: {cache_stats['hits_all_processes']} · "
+        f"Misses: {cache_stats['misses_all_processes']} · "
+        f"Hit rate: {cache_stats['hit_rate']:.0%}"
+    )
+    if st.button("Clear cache", use_container_width=True):
+        response_cache.clear()
+        st.rerun()
+
+    st.markdown('<div class="tiny-label">LLM REQUESTS</div>', unsafe_allow_html=True)
+    limiter_stats = shared_limiter().stats()
+    st.caption(
+        f"In flight: {limiter_stats['in_flight']}/{limiter_stats['max_in_flight']} · "
+        f"Sent: {limiter_stats['requests']} · "
+        f"Retries: {limiter_stats['retries']} · "
+        f"Throttled: {limiter_stats['throttled_seconds']:.1f}s"
+    )
+    flight_stats = FLIGHTS.stats()
+    st.caption(
+        f"Coalesced: {flight_stats['coalesced']} identical calls onto "
+        f"{flight_stats['leaders']} upstream · Abandoned: {flight_stats['abandoned']}"
+    )
+    reuse_stats = contract_reuse.stats()
+    st.caption(
+        f"Task 2 items reused: {reuse_stats['hits']} exact · {reuse_stats['near_hits']} similar · "
+        f"{reuse_stats['misses']} new"
+        + (f" ({reuse_stats['indexed']} indexed)" if reuse_stats["indexed"] is not None else "")
+    )
+    queue_stats = job_queue.stats()
+    st.caption(
+        f"Background jobs: {queue_stats['running']} running · {queue_stats['queued']} queued · "
+        f"{queue_stats['deduplicated']} duplicate submissions joined"
+    )
+
+    st.markdown('<div class="tiny-label">LLM USAGE TODAY</div>', unsafe_allow_html=True)
+    budget = BUDGET.status()
+    session_spent = LEDGER.spent_today(st.session_state.session_id)
+    st.caption(
+        f"This session: ${session_spent:.4f}"
+        + (f" of ${BUDGET.session_usd:.2f}" if BUDGET.session_usd else "")
+        + f" · All sessions: ${LEDGER.spent_today():.4f}"
+        + (f" of ${BUDGET.global_usd:.2f}" if BUDGET.global_usd else "")
+    )
+    if budget["state"] == EXHAUSTED:
+        st.caption("⛔ Budget used up: stored results are shown; new analyses are paused.")
+    elif budget["state"] != "ok":
+        st.caption(f"⚠️ {budget['used']:.0%} of budget used: new requests go to {BUDGET.model}.")
+    budget_stats = BUDGET.stats()
+    if any(budget_stats.values()):
+        st.caption(
+            f"Downgraded: {budget_stats['downgraded']} · Queued: {budget_stats['queued']} "
+            f"({budget_stats['waited_seconds']:.0f}s) · Refused: {budget_stats['rejected']}"
+        )
+
+    st.markdown('<div class="tiny-label">ANALYSIS STORE</div>', unsafe_allow_html=True)
+    store_stats = analysis_store.stats()
+    st.caption(
+        f"Stored analyses: {store_stats['entries']} · "
+        f"{store_stats['bytes'] / 1024:.0f} KiB compressed"
+    )
+    bulk_export()
+
+    # Fragment runs only update their own entry; shown as of the last full run
+    st.markdown('<div class="tiny-label">RENDER TIMINGS</div>', unsafe_allow_html=True)
+    render_timings = st.session_state.get("render_timings", {})
+    st.caption(
+        " · ".join(f"{name}: {seconds * 1000:.0f} ms" for name, seconds in render_timings.items())
+        or "No runs recorded yet."
+    )
+
+# The performance tab is only shown with ?admin=1 (or ADMIN_PERF_TAB=1)
+show_admin = st.query_params.get("admin") == "1" or os.environ.get("ADMIN_PERF_TAB") == "1"
+
 tabs = st.tabs([
     "🔍 1 · Supplier Market Intelligence",
     "📑 2 · Contract Type Recommendation",
     "🏅 3 · Supplier Evaluation Scorecard",
-])
+] + (["⏱️ Performance"] if show_admin else []))
 
 # ===================================================================== #
 #                               TASK 1                                  #
 # ===================================================================== #
 
-with tabs[0]:
+def task1_compare():
+    """Several categories at once: generated in parallel, shown side by side."""
+    from market_compare import (
+        country_heatmap,
+        dimension_heatmap,
+        generate_categories,
+        level_counts,
+        risk_styles,
+        shared_suppliers,
+    )
+
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.markdown('<div class="tiny-label">CATEGORIES TO COMPARE</div>', unsafe_allow_html=True)
+    chosen = st.multiselect(
+        "Categories to compare",
+        options=task1_categories,
+        default=st.session_state.get("compare_categories") or [],
+        max_selections=6,
+        label_visibility="collapsed",
+    )
+    regenerate = st.checkbox("Regenerate instead of using precomputed results", value=False,
+                             key="compare_regenerate")
+    compare_btn = st.button("🔍 Compare Categories", disabled=len(chosen) < 2)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    if compare_btn:
+        progress = st.progress(0.0, text="Generating market intelligence…")
+
+        def show_progress(done, total):
+            progress.progress(done / total, text=f"{done} of {total} categories ready")
+
+        results, failures = generate_categories(
+            chosen, llm_client(), market_store, cache=response_cache, force=regenerate,
+            on_progress=show_progress,
+        )
+        progress.empty()
+        for category, entry in results.items():
+            save_market_analysis(category, entry["data"], market_intelligence_prompt(category),
+                                 model=entry["model"])
+        for category, error in failures:
+            st.error(f"❌ {category}: {error}")
+        st.session_state.compare_categories = chosen
+        st.session_state.market_compare = {c: e["data"] for c, e in results.items()}
+
+    markets = st.session_state.get("market_compare")
+    if not markets:
+        st.info("Pick at least two categories to compare their suppliers and country risks.")
+        return
+
+    suppliers, risks = cached_comparison_frames(markets)
+
+    # --- SIDE BY SIDE ---
+    st.markdown("<div class='section-title'>🌍 Side by Side</div>", unsafe_allow_html=True)
+    for category, col in zip(markets, st.columns(len(markets))):
+        with col:
+            st.markdown(f"**{category}**")
+            st.caption(markets[category].get("marketOverview", ""))
+            st.dataframe(
+                suppliers.loc[suppliers["Category"] == category,
+                              ["Rank", "Supplier", "Headquarters", "Market Share"]],
+                hide_index=True, use_container_width=True,
+            )
+
+    # --- RISK HEATMAPS ---
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.markdown("<div class='section-title'>⚠️ Country Risk Heatmaps</div>", unsafe_allow_html=True)
+    st.caption("Risk scores 1–10 (higher is riskier), averaged over each category's countries.")
+    by_dimension = dimension_heatmap(risks)
+    st.dataframe(by_dimension.style.apply(risk_styles, axis=None).format("{:.1f}", na_rep="–"),
+                 use_container_width=True)
+    by_country = country_heatmap(risks)
+    st.dataframe(by_country.style.apply(risk_styles, axis=None).format("{:.1f}", na_rep="–"),
+                 use_container_width=True)
+    st.dataframe(level_counts(risks), use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # --- CROSS-CATEGORY SUPPLIERS ---
+    shared = shared_suppliers(suppliers)
+    if not shared.empty:
+        st.markdown("<div class='section-title'>🏭 Suppliers in Several Categories</div>",
+                    unsafe_allow_html=True)
+        st.dataframe(shared, hide_index=True, use_container_width=True)
+
+    with st.expander("All suppliers and country risks"):
+        st.dataframe(suppliers, hide_index=True, use_container_width=True)
+        st.dataframe(risks, hide_index=True, use_container_width=True)
+
+
+@st.fragment
+@timed("task 1")
+def task1_tab():
+    bind_session()
     st.markdown("""
         <div class="task-header">
             <div class="pill">TASK 1 · MARKET INTELLIGENCE</div>
@@ -198,6 +701,10 @@ with tabs[0]:
         </div>
     """, unsafe_allow_html=True)
 
+    if st.toggle("Compare several categories", key="task1_compare_mode"):
+        task1_compare()
+        return
+
     st.markdown('<div class="card">', unsafe_allow_html=True)
     col1, col2 = st.columns([3, 1])
 
@@ -209,6 +716,7 @@ with tabs[0]:
             index=0,
             label_visibility="collapsed",
         )
+        regenerate = st.checkbox("Regenerate instead of using the precomputed result", value=False)
 
     with col2:
         st.write("")
@@ -218,63 +726,91 @@ with tabs[0]:
 
     # ---------------- RUN GENAI ---------------- #
 
+    stored = None
+    over_budget = gen_btn and BUDGET.status()["state"] == EXHAUSTED
+    if gen_btn and selected_cat != "-- Select Category --" and (not regenerate or over_budget):
+        stored = market_store.get(selected_cat)
+        if over_budget and stored:
+            st.session_state.budget_notice = "LLM budget used up; showing the stored result."
+
     if gen_btn:
         if selected_cat == "-- Select Category --":
             st.warning("Please select a valid procurement category.")
+        elif stored:
+            save_market_run(selected_cat, stored["data"], market_intelligence_prompt(selected_cat),
+                            meta=stored, model=stored["model"])
+            if not over_budget:
+                refresher = get_market_refresher()
+                if stored["stale"]:
+                    refresher.refresh_now()
+            st.rerun()  # Task 3 depends on the new suppliers
+        elif over_budget:
+            st.error("⛔ The LLM budget is used up and there is no stored result for this "
+                     "category yet. Please try again later.")
         else:
             with st.spinner("Calling GenAI…"):
-                prompt1 = f"""
-Return ONLY valid JSON. No explanations.
-
-JSON MUST contain these keys:
-- "marketOverview"
-- "topSuppliers" (list of 5)
-- "countryRisks" (list of 3–4)
-
-If uncertain, provide placeholder text instead of removing a field.
-
-Structure:
-{{
-  "category": "{selected_cat}",
-  "marketOverview": "2-3 sentence overview.",
-  "topSuppliers": [
-    {{
-      "rank": 1,
-      "name": "Company",
-      "headquarters": "City, Country",
-      "marketShare": "~25%",
-      "keyCapabilities": ["cap1", "cap2", "cap3"],
-      "differentiators": "text",
-      "dellRelevance": "text"
-    }}
-  ],
-  "countryRisks": [
-    {{
-      "country": "Country",
-      "supplierConcentration": "High/Medium/Low",
-      "politicalRisk": {{"score": 5, "assessment": "text", "keyFactors": ["f1","f2"]}},
-      "logisticsRisk":  {{"score": 6, "assessment": "text", "keyFactors": ["f1","f2"]}},
-      "complianceRisk": {{"score": 7, "assessment": "text", "keyFactors": ["f1","f2"]}},
-      "esgRisk":        {{"score": 8, "assessment": "text", "keyFactors": ["f1","f2"]}},
-      "overallRiskLevel": "High/Medium/Low",
-      "mitigation": "text"
-    }}
-  ]
-}}
-"""
-
-                raw = call_llm(prompt1)
-
+                prompt1 = market_intelligence_prompt(selected_cat)
+
+                # Render suppliers / country risks as soon as each one is complete
+                live = st.empty()
+                with live.container():
+                    overview_box = st.empty()
+                    suppliers_box = st.container()
+                    risks_box = st.container()
+
+                def show_partial_market(kind, key, value):
+                    if kind == "field" and key == "marketOverview":
+                        overview_box.info(value)
+                    elif key == "topSuppliers":
+                        with suppliers_box:
+                            render_supplier(value)
+                    elif key == "countryRisks":
+                        with risks_box:
+                            render_country_risk(value)
+
+                usage = {}
+                raw = ""
+                fallback = None
                 try:
-                    market_data = parse_json_from_text(raw)
-                    st.session_state.market_data = market_data
-                except:
-                    st.error("❌ LLM returned invalid JSON. Please try again.")
+                    raw = stream_llm_json(
+                        prompt1, ["topSuppliers", "countryRisks"], show_partial_market,
+                        MARKET_FORMAT, usage,
+                    )
+                    market_data = finish_streamed_json(prompt1, raw, MARKET_FORMAT, usage)
+                    save_market_run(selected_cat, market_data, prompt1, model=usage.get("model"))
+                except BudgetExceeded as e:
+                    live.empty()
+                    fallback = market_store.get(selected_cat)
+                    if not fallback:
+                        st.error(f"⛔ {e}. There is no stored result for this category yet.")
+                        return
+                    st.session_state.budget_notice = "LLM budget used up; showing the stored result."
+                    save_market_run(selected_cat, fallback["data"], prompt1, meta=fallback,
+                                    model=fallback["model"])
+                except ValueError as e:  # json.JSONDecodeError is a ValueError
+                    live.empty()
+                    st.error(f"❌ LLM returned invalid JSON ({e}). Please try again.")
                     st.caption(raw)
-                    st.stop()
+                    return
+                except Exception as e:
+                    live.empty()
+                    st.error(f"❌ The LLM request failed ({e}). Please try again.")
+                    return
+                live.empty()
+
+                if fallback is None:
+                    try:
+                        market_store.put(selected_cat, validate_market_data(market_data),
+                                         model=usage.get("model"))
+                    except ValueError:
+                        pass  # incomplete results are shown but not stored for reuse
+                    get_market_refresher()
+            st.rerun()  # Task 3 depends on the new suppliers
 
     # ------------- DISPLAY OUTPUT ------------- #
 
+    if "budget_notice" in st.session_state:
+        st.warning(st.session_state.pop("budget_notice"))
     data = st.session_state.market_data
 
     if data:
@@ -285,6 +821,11 @@ Structure:
         # --- MARKET OVERVIEW ---
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown("<div class='section-title'>🌍 Market Overview</div>", unsafe_allow_html=True)
+        meta = st.session_state.get("market_meta")
+        if meta:
+            age_hours = (time.time() - meta["generated_at"]) / 3600
+            note = " · stale, refreshing in the background" if meta["stale"] else ""
+            st.caption(f"Generated {age_hours:.1f} h ago{note}")
         st.write(marketOverview)
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -295,17 +836,7 @@ Structure:
         if not topSuppliers:
             st.warning("⚠️ No supplier info returned by GenAI.")
         else:
-            for s in topSuppliers:
-                st.markdown(f"""
-                **{s.get('rank','?')}. {s.get('name','Unknown Supplier')}**  
-                *{s.get('headquarters','N/A')}*  
-
-                **Market Share:** {s.get('marketShare','N/A')}  
-                **Capabilities:** {", ".join(s.get("keyCapabilities", []))}  
-                **Differentiators:** {s.get("differentiators","N/A")}  
-                **Dell Relevance:** {s.get("dellRelevance","N/A")}
-                """)
-                st.markdown("---")
+            st.markdown(cached_section("supplier", topSuppliers))
 
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -316,26 +847,67 @@ Structure:
         if not countryRisks:
             st.warning("⚠️ No risk data returned.")
         else:
-            for r in countryRisks:
-                st.subheader(r.get("country", "Unknown Country"))
-                st.write(f"Supplier Concentration: **{r.get('supplierConcentration','N/A')}**")
-                st.write(r.get("mitigation", ""))
-
-                st.caption(
-                    f"Political: {r.get('politicalRisk',{}).get('score','?')} · "
-                    f"Logistics: {r.get('logisticsRisk',{}).get('score','?')} · "
-                    f"Compliance: {r.get('complianceRisk',{}).get('score','?')} · "
-                    f"ESG: {r.get('esgRisk',{}).get('score','?')}"
-                )
-                st.markdown("---")
+            st.markdown(cached_section("country_risk", countryRisks))
 
         st.markdown("</div>", unsafe_allow_html=True)
 
+        category = data.get("category", "")
+        export_panel("market", [{
+            "id": st.session_state.market_id, "kind": "market", "category": category, "data": data,
+            "created_at": (meta or {}).get("generated_at"),
+        }], f"Market intelligence: {category}")
+
+
+@st.fragment
+@timed("task 1 · portfolio risk")
+def task1_portfolio_risk():
+    """Risk across every stored market run, read from the precomputed aggregates."""
+    runs = analysis_store.stats()["by_kind"].get("market", 0)
+    if not runs:
+        return
+    with st.expander(f"📈 Portfolio risk across {runs} stored market runs"):
+        # Expander bodies always run; load the Parquet store only on request
+        if not st.toggle("Show portfolio dashboard", key="portfolio_risk"):
+            return
+        from market_compare import risk_styles
+
+        risk_store = get_risk_store()
+        # Picks up runs saved since the last draw, also by batch.py or
+        # other app processes
+        risk_store.backfill(analysis_store)
+        st.caption("Mean risk score (1–10, higher is riskier) per dimension.")
+        by_category = risk_store.pivot("by_dimension")
+        st.dataframe(by_category.style.apply(risk_styles, axis=None).format("{:.1f}", na_rep="–"),
+                     use_container_width=True)
+        by_country = risk_store.pivot("by_country")
+        st.dataframe(by_country.style.apply(risk_styles, axis=None).format("{:.1f}", na_rep="–"),
+                     use_container_width=True)
+
+        country = st.selectbox("Country detail", ["—"] + by_country.index.tolist())
+        if country != "—":
+            detail = risk_store.table(
+                columns=["generated_at", "category", "dimension", "score", "level"],
+                filters=[("country", "=", country)],
+            )
+            st.dataframe(
+                detail.pivot_table(index=["generated_at", "category"], columns="dimension",
+                                   values="score").sort_index(ascending=False),
+                use_container_width=True,
+            )
+
+
+with tabs[0]:
+    task1_tab()
+    task1_portfolio_risk()
+
 # ===================================================================== #
 #                               TASK 2                                  #
 # ===================================================================== #
 
-with tabs[1]:
+@st.fragment
+@timed("task 2")
+def task2_tab():
+    bind_session()
     st.markdown(
         """
         <div class="task-header">
@@ -366,132 +938,91 @@ with tabs[1]:
         options=task2_products,
         label_visibility="collapsed",
     )
+    other_items = st.text_input(
+        "Other items (comma-separated)",
+        placeholder="e.g. Thermal paste, Power supply unit (PSU)",
+        help="Free-text items. Close variants of items analysed before reuse the stored analysis.",
+    )
     st.markdown("</div>", unsafe_allow_html=True)
 
+    # Canonical names, in selection order, without duplicates
+    requested = selected_products + [i for i in other_items.split(",") if i.strip()]
+    selected_products = list(dict.fromkeys(canonical_item(i) for i in requested))
+
+    # Over budget, only stored items can be served, so reuse is forced on
+    over_budget = BUDGET.status()["state"] == EXHAUSTED
+    per_item_mode = st.toggle(
+        "⚡ Analyse each item in a separate concurrent request",
+        value=True,
+        disabled=over_budget,
+        help="Sends one request per item on a bounded worker pool and merges the results. "
+             "Faster for many items, and one bad response no longer discards the batch.",
+    ) or over_budget
+    reuse_items = st.toggle(
+        "♻️ Reuse stored item analyses",
+        value=True,
+        disabled=not per_item_mode or over_budget,
+        help="Items (and close variants) analysed in the last "
+             f"{contract_reuse.max_age_seconds / 86400:.0f} days are taken from the store; "
+             "only new items are sent to the model.",
+    ) or over_budget
+    if over_budget:
+        st.caption("⛔ LLM budget used up: only stored item analyses can be shown.")
     analyze_btn = st.button("📑 Analyze Contract Options", use_container_width=True)
 
-    # ---- Call LLM when button is pressed ----
+    # ---- Queue the analysis when the button is pressed ----
+    # It runs on the process-wide job queue, so changing the selection (or
+    # any other widget) while it runs does not throw the generation away.
     if analyze_btn:
         if not selected_products:
             st.warning("Please select at least one procurement item.")
         else:
-            items_csv = ", ".join(selected_products)
-
-            with st.spinner("Calling GenAI for contract analysis…"):
-                prompt2 = f"""
-You are a supply-chain contract expert for Dell Technologies.
-
-Your ONLY allowed contract types are:
-1. "Buy-back Contract"
-2. "Revenue-Sharing Contract"
-3. "Wholesale Price Contract"
-4. "Quantity Flexibility Contract"
-5. "Option Contract"
-6. "VMI (Vendor Managed Inventory)"
-7. "Cost-Sharing or Incentive Contracts"
-
-Do NOT invent any new contract names. Always use one of the exact names above.
-
-Evaluate the most suitable contract types for the following Dell procurement items:
-{items_csv}.
-
-For each item you must:
-1. Assess:
-   - costPredictability: level ("High" / "Medium" / "Low") + 1–2 line explanation
-   - marketVolatility: level ("High" / "Medium" / "Low") + explanation
-   - durationAndVolume: profile ("Short / Medium / Long term; Low / Medium / High volume") + explanation
-
-2. Compare the RELEVANT contract types (from the 7 allowed types) for this item.
-   For each compared contract type give:
-   - suitability: "High" / "Medium" / "Low"
-   - pros: 2–3 bullet points
-   - cons: 1–2 bullet points
-
-3. Select:
-   - recommendedContract: ONE best contract type from the list
-   - alternativeContract: ONE second-best contract type
-   - finalDecision: 2–3 sentence justification referring explicitly to cost predictability,
-     market volatility, and duration/volume fit.
-
-Finally, provide a short generic summary for each contract type explaining:
-- whenToUse: typical use case (1–2 sentences)
-- keyRisks: main risks/pitfalls (1–2 sentences)
-
-Return ONLY valid JSON (no markdown, no commentary) with EXACTLY this structure:
-
-{{
-  "analysisDate": "{date.today().isoformat()}",
-  "items": [
-    {{
-      "name": "Item name exactly as in input",
-      "assessment": {{
-        "costPredictability": {{
-          "level": "High",
-          "explanation": "text"
-        }},
-        "marketVolatility": {{
-          "level": "Medium",
-          "explanation": "text"
-        }},
-        "durationAndVolume": {{
-          "profile": "Long term; High volume",
-          "explanation": "text"
-        }}
-      }},
-      "contractComparison": [
-        {{
-          "type": "Wholesale Price Contract",
-          "suitability": "High",
-          "pros": ["point 1","point 2"],
-          "cons": ["point 1"]
-        }}
-      ],
-      "recommendedContract": "Wholesale Price Contract",
-      "alternativeContract": "Quantity Flexibility Contract",
-      "finalDecision": "2-3 sentence justification"
-    }}
-  ],
-  "contractTypeSummary": {{
-    "Buy-back Contract": {{
-      "whenToUse": "short text",
-      "keyRisks": "short text"
-    }},
-    "Revenue-Sharing Contract": {{
-      "whenToUse": "short text",
-      "keyRisks": "short text"
-    }},
-    "Wholesale Price Contract": {{
-      "whenToUse": "short text",
-      "keyRisks": "short text"
-    }},
-    "Quantity Flexibility Contract": {{
-      "whenToUse": "short text",
-      "keyRisks": "short text"
-    }},
-    "Option Contract": {{
-      "whenToUse": "short text",
-      "keyRisks": "short text"
-    }},
-    "VMI (Vendor Managed Inventory)": {{
-      "whenToUse": "short text",
-      "keyRisks": "short text"
-    }},
-    "Cost-Sharing or Incentive Contracts": {{
-      "whenToUse": "short text",
-      "keyRisks": "short text"
-    }}
-  }}
-}}
-                """.strip()
-
-                raw2 = call_llm(prompt2)
+            products = list(selected_products)
+            models = set()  # that answered, for the stored provenance
+            if per_item_mode:
+                def run(job):
+                    return run_contract_fanout(
+                        products, complete_json=recording_models(call_llm_json, models),
+                        on_progress=job.report,
+                        on_item=job.emit, reuse=contract_reuse if reuse_items else None,
+                    )
+            else:
+                def run(job):
+                    prompt2 = contract_prompt(products)
+
+                    def show_partial_contract(kind, key, value):
+                        if key == "items" and isinstance(value, dict):
+                            job.emit(value)
+
+                    usage = {}
+                    raw2 = stream_llm_json(prompt2, ["items"], show_partial_contract,
+                                           CONTRACT_FORMAT, usage)
+                    try:
+                        contract_data = finish_streamed_json(prompt2, raw2, CONTRACT_FORMAT, usage)
+                    except ValueError as e:
+                        raise ValueError(f"Could not parse model output as JSON: {e}") from e
+                    models.add(usage.get("model"))
+                    return contract_data, []
+
+            def save(result):
+                contract_data, _ = result
+                if contract_data["items"]:
+                    analysis_store.save("contract", contract_data, products=products,
+                                        model=model_label(models))
+
+            job_queue.submit(
+                st.session_state.session_id,
+                "contract",
+                ("single:" if not per_item_mode else "reuse:" if reuse_items else "per-item:")
+                + "|".join(products),
+                run,
+                label=", ".join(products),
+                on_done=save,
+            )
+            st.rerun()  # full rerun, so show_contract_jobs starts polling
 
-                try:
-                    contract_data = parse_json_from_text(raw2)
-                    st.session_state.contract_data = contract_data
-                except Exception as e:
-                    st.error(f"Could not parse model output as JSON: {e}")
-                    st.caption(raw2)
+    for error in st.session_state.pop("contract_errors", []):
+        st.error(error)
 
     # ---- Display results ----
     contract_data = st.session_state.contract_data
@@ -501,45 +1032,7 @@ Return ONLY valid JSON (no markdown, no commentary) with EXACTLY this structure:
         st.caption(f"Analysis date: {contract_data.get('analysisDate','')}")
 
         # Per-item analysis
-        for item in contract_data.get("items", []):
-            name = item.get("name", "Item")
-            assess = item.get("assessment", {})
-            cp = assess.get("costPredictability", {}) or {}
-            mv = assess.get("marketVolatility", {}) or {}
-            dv = assess.get("durationAndVolume", {}) or {}
-
-            st.markdown(f"### 🔹 {name}")
-
-            # Assessment
-            st.markdown("**1. Demand & risk assessment**")
-            st.markdown(
-                f"- **Cost predictability:** {cp.get('level','')} – {cp.get('explanation','')}\n"
-                f"- **Market volatility:** {mv.get('level','')} – {mv.get('explanation','')}\n"
-                f"- **Duration & volume:** {dv.get('profile','')} – {dv.get('explanation','')}"
-            )
-
-            # Comparison of contract types
-            st.markdown("**2. Comparison of relevant contract types**")
-            for cc in item.get("contractComparison", []):
-                ctype = cc.get("type", "")
-                suitability = cc.get("suitability", "")
-                pros = cc.get("pros", []) or []
-                cons = cc.get("cons", []) or []
-                st.markdown(f"- **{ctype}** (suitability: {suitability})")
-                if pros:
-                    st.markdown("  - Pros: " + "; ".join(pros))
-                if cons:
-                    st.markdown("  - Cons: " + "; ".join(cons))
-
-            # Final decision
-            st.markdown("**3. Final contract selection**")
-            st.markdown(
-                f"- ✅ **Recommended contract:** {item.get('recommendedContract','')}\n"
-                f"- 🔁 **Alternative contract:** {item.get('alternativeContract','')}\n\n"
-                f"{item.get('finalDecision','')}"
-            )
-
-            st.markdown("---")
+        st.markdown(cached_section("contract_item", contract_data.get("items", [])))
 
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -548,122 +1041,105 @@ Return ONLY valid JSON (no markdown, no commentary) with EXACTLY this structure:
         if summary:
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.markdown('<div class="section-title">📘 Contract Type Summary (Cheat Sheet)</div>', unsafe_allow_html=True)
-            for ctype, info in summary.items():
-                when = (info or {}).get("whenToUse", "")
-                risks = (info or {}).get("keyRisks", "")
-                st.markdown(f"**{ctype}**")
-                if when:
-                    st.markdown(f"- _When to use_: {when}")
-                if risks:
-                    st.markdown(f"- _Key risks_: {risks}")
-                st.markdown("")
+            st.markdown(cached_markdown("contract_summary", summary))
             st.markdown("</div>", unsafe_allow_html=True)
 
+        export_panel("contract", [{
+            "id": None, "kind": "contract", "category": None, "data": contract_data,
+            "created_at": None,
+        }], "Contract type recommendations")
+
+
+# --------- Contract jobs (polls without blocking reruns) ---------
+@polling_fragment(lambda: bool(job_queue.for_session(st.session_state.session_id, kind="contract")))
+def show_contract_jobs():
+    bind_session()
+    session = st.session_state.session_id
+    jobs = job_queue.for_session(session, kind="contract")
+    if not jobs:
+        return
+
+    for job in jobs:
+        if job.finished:
+            continue
+        done, total = job.progress
+        st.progress(
+            done / total if total else 0.0,
+            text=f"Calling GenAI for contract analysis… {job.label} · {job.elapsed:.0f}s",
+        )
+        for row in list(job.partial):
+            render_contract_item(row)
+
+    finished = [job for job in jobs if job.finished]
+    if finished:
+        errors = []
+        for job in finished:
+            job_queue.collect(session, job)
+            if job.state == DONE:
+                contract_data, failures = job.result
+                if contract_data["items"]:
+                    st.session_state.contract_data = contract_data
+                errors += [f"Could not analyse {item}: {error}" for item, error in failures]
+            else:
+                errors.append(f"Contract analysis failed: {job.error}")
+        st.session_state.contract_errors = errors
+        st.rerun()
 
-# ===================================================================== #
-#                     HELPER FOR TASK 3 (SCORECARDS)                    #
-# ===================================================================== #
-
-def compute_weighted_totals_and_ratings(scorecard: dict) -> dict:
-    """
-    Ensure each supplier row in `scorecard["supplierScores"]` has:
-      - numeric 'weightedTotal' (0–100 scale, or 0–10 – it still works)
-      - text 'rating' based on weighted total.
-
-    If the model already provided these, we keep them but normalise types.
-    """
-    dimensions = scorecard.get("dimensions", [])
-    supplier_scores = scorecard.get("supplierScores", [])
-
-    # Build weight map from dimensions
-    weight_map = {}
-    for dim in dimensions:
-        name = dim.get("name")
-        w = dim.get("weight", 0)
-        if name:
-            try:
-                weight_map[name] = float(w)
-            except (TypeError, ValueError):
-                weight_map[name] = 0.0
-
-    total_weight = sum(weight_map.values()) or 1.0
-
-    for s in supplier_scores:
-        scores = s.get("scores", {}) or {}
-        wt = s.get("weightedTotal")
-
-        # If model did not give a numeric weightedTotal, compute it
-        if not isinstance(wt, (int, float)):
-            wt_calc = 0.0
-            for dim_name, w in weight_map.items():
-                try:
-                    dim_score = float(scores.get(dim_name, 0.0))
-                except (TypeError, ValueError):
-                    dim_score = 0.0
-                wt_calc += dim_score * w / total_weight
-            wt = round(wt_calc, 3)
-            s["weightedTotal"] = wt
-        else:
-            # normalise numeric type
-            s["weightedTotal"] = float(wt)
-
-        # Map weighted total → rating (works whether scale is 0–10 or 0–100)
-        # Treat >=85 or >=8.5 as Excellent, etc.
-        scale_factor = 10.0 if wt <= 10 else 100.0
-        score_norm = wt if scale_factor == 10.0 else wt
-
-        if scale_factor == 10.0:
-            s_norm = score_norm
-        else:
-            s_norm = score_norm / 10.0  # approximate to 0–10 for thresholds
-
-        if s_norm >= 8.5:
-            rating = "Excellent"
-        elif s_norm >= 7.0:
-            rating = "Good"
-        elif s_norm >= 5.5:
-            rating = "Average"
-        else:
-            rating = "Poor"
-
-        s["rating"] = rating
 
-    return scorecard
+with tabs[1]:
+    task2_tab()
+    show_contract_jobs()
 
 
 # ===================================================================== #
 #                               TASK 3                                  #
 # ===================================================================== #
 
-with tabs[2]:
-    st.markdown(
-        """
-        <div class="task-header">
-            <div class="pill">TASK 3 · SUPPLIER SCORECARD</div>
-            <h2 style="margin-top:0.3rem;margin-bottom:0.1rem;font-size:1.3rem;font-weight:800;">
-                Supplier Evaluation Scorecard
-            </h2>
-            <p style="margin:0.2rem 0;color:#475569;font-size:0.9rem;">
-                Based on Task&nbsp;1 suppliers, build an initial weighted scorecard and then
-                a refined scorecard with KPIs.
-            </p>
-        </div>
-        """,
-        unsafe_allow_html=True,
+def task3_history_picker():
+    """Evaluate any stored Task 1 run, not just the one generated last."""
+    runs = analysis_store.history(kind="market", limit=50)
+    if not runs:
+        return
+
+    current = st.session_state.get("market_id")
+    if current is not None and current not in {r["id"] for r in runs}:
+        older = analysis_store.get(current)
+        if older:
+            runs.append(older)
+
+    ids = [r["id"] for r in runs]
+    labels = {
+        r["id"]: f"{r['category']} · {time.strftime('%Y-%m-%d %H:%M', time.localtime(r['created_at']))}"
+        for r in runs
+    }
+    choice = st.selectbox(
+        "Task 1 run to evaluate",
+        options=ids,
+        index=ids.index(current) if current in ids else 0,
+        format_func=labels.get,
     )
+    if choice != current:
+        load_market_run(analysis_store.get(choice))
+        st.rerun()
 
-    # --------- Ensure Task 1 has been run ---------
+
+def task3_context():
+    """(suppliers, category) from the Task 1 result, or (None, None)."""
     market_data = st.session_state.get("market_data")
     if not market_data or not market_data.get("topSuppliers"):
-        st.info("Run **Task 1 – Supplier Market Intelligence** first to identify suppliers.")
-        st.stop()
+        return None, None
 
     suppliers = [
         s.get("name", f"Supplier {i+1}")
         for i, s in enumerate(market_data.get("topSuppliers", []))
     ]
-    category = market_data.get("category", "Selected category")
+    return suppliers, market_data.get("category", "Selected category")
+
 
+@st.fragment
+@timed("task 3 · controls")
+def task3_controls(suppliers: list, category: str):
+    bind_session()
     # --------- Context card ---------
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.markdown('<div class="tiny-label">CONTEXT</div>', unsafe_allow_html=True)
@@ -671,111 +1147,97 @@ with tabs[2]:
     st.write("**Suppliers to evaluate:** " + ", ".join(suppliers))
     st.markdown("</div>", unsafe_allow_html=True)
 
+    model_rescore = st.toggle(
+        "🧮 Ask the model to rescore the refined scorecard",
+        value=False,
+        help="By default only the KPI text is requested (once per category) and the "
+             "refined weighted totals are recomputed locally from the initial scores.",
+    )
     score_btn = st.button("🏅 Generate Scorecards", use_container_width=True)
 
-    # --------- Call LLMs when button pressed ---------
-    if score_btn:
-        # ---------- INITIAL SCORECARD ----------
-        with st.spinner("Generating initial scorecard…"):
-            prompt_score_initial = f"""
-You are designing a **supplier evaluation scorecard** for Dell Technologies.
-
-Suppliers: {", ".join(suppliers)}
-Category: {category}
-
-Create an initial scorecard with **5 evaluation dimensions**:
-- Technical Capability (weight 25)
-- Quality Performance (weight 20)
-- Financial Health (weight 20)
-- ESG Compliance (weight 20)
-- Innovation Capability (weight 15)
-
-For each supplier, assign 0–10 scores on each dimension, and compute a numeric
-`weightedTotal` score using the weights above. Also assign a textual `rating`
-("Excellent", "Good", "Average", "Poor").
-
-Return **ONLY valid JSON**, no prose, with this structure:
-
-{{
-  "evaluationTitle": "Initial Scorecard",
-  "category": "{category}",
-  "evaluationDate": "{date.today().isoformat()}",
-  "dimensions": [
-    {{"name":"Technical Capability","weight":25,"description":"1 sentence"}},
-    {{"name":"Quality Performance","weight":20,"description":"1 sentence"}},
-    {{"name":"Financial Health","weight":20,"description":"1 sentence"}},
-    {{"name":"ESG Compliance","weight":20,"description":"1 sentence"}},
-    {{"name":"Innovation Capability","weight":15,"description":"1 sentence"}}
-  ],
-  "supplierScores": [
-    {{
-      "supplierName": "Supplier name from this list: {", ".join(suppliers)}",
-      "scores": {{
-        "Technical Capability": 0,
-        "Quality Performance": 0,
-        "Financial Health": 0,
-        "ESG Compliance": 0,
-        "Innovation Capability": 0
-      }},
-      "weightedTotal": 0,
-      "rating": "Excellent / Good / Average / Poor",
-      "strengths": ["strength1","strength2"],
-      "weaknesses": ["weak1"]
-    }}
-  ],
-  "bestSupplier": {{
-    "name": "Supplier name",
-    "score": 0,
-    "reasoning": "2-3 sentence explanation"
-  }},
-  "conclusion": "2-3 sentence recommendation for Dell"
-}}
-            """.strip()
-
-            raw_initial = call_llm(prompt_score_initial)
-            try:
-                score_initial = parse_json_from_text(raw_initial)
-                score_initial = compute_weighted_totals_and_ratings(score_initial)
-                st.session_state.score_initial = score_initial
-            except Exception as e:
-                st.error(f"Could not parse initial scorecard JSON: {e}")
-                st.caption(raw_initial)
-
-        # ---------- REFINED SCORECARD ----------
-        if st.session_state.get("score_initial"):
-            with st.spinner("Refining scorecard with KPIs…"):
-                prompt_score_refined = f"""
-Refine the following supplier evaluation scorecard for Dell.
-Adjust the weights and add 2–3 concrete KPIs for each dimension.
-
-Original scorecard JSON:
-{json.dumps(st.session_state["score_initial"])}
-
-New weights:
-- Technical Capability 30
-- Quality Performance 25
-- ESG Compliance 25
-- Financial Health 15
-- Innovation Capability 5
+    # --------- Over budget: show the stored scorecards instead ---------
+    if score_btn and BUDGET.status()["state"] == EXHAUSTED:
+        found = False
+        for stage in STAGES:
+            entry = (analysis_store.latest(f"score_{stage}", parent_id=st.session_state.market_id)
+                     or analysis_store.latest(f"score_{stage}", category=category))
+            if entry:
+                st.session_state[f"score_{stage}"] = entry["data"]
+                found = True
+        if found:
+            st.warning("⛔ The LLM budget is used up; showing the latest stored scorecards.")
+        else:
+            st.error("⛔ The LLM budget is used up and no scorecards are stored for this "
+                     "category yet. Please try again later.")
+        score_btn = False
 
-For each dimension, add a `kpis` array with objects:
-  "kpis":[{{"name":"KPI name","description":"what it measures","importance":"why it matters for Dell"}}]
+    # --------- Start background pipeline when button pressed ---------
+    if score_btn:
+        from scorecard import compute_weighted_totals_and_ratings
+
+        job = ScorecardJob(
+            api_key=OPENAI_API_KEY,
+            model=LLM_MODEL,
+            cache=response_cache,
+            finish=finish_llm_json,
+            finalize=compute_weighted_totals_and_ratings,
+            initial_prompt=scorecard_initial_prompt(suppliers, category),
+            build_refined_prompt=scorecard_refined_prompt,
+            speculative_prompt=(
+                scorecard_dimension_refinement_prompt(category, list(INITIAL_WEIGHTS))
+                if not model_rescore else None
+            ),
+            refined_weights=REFINED_WEIGHTS,
+        )
+        st.session_state.score_job = job.start()
+        st.rerun()  # full rerun, so show_score_job_progress starts polling
+
+
+# --------- Stage-level progress (polls without blocking reruns) ---------
+def score_job_active() -> bool:
+    job = st.session_state.get("score_job")
+    return job is not None and not job.collected
+
+
+@polling_fragment(score_job_active)
+def show_score_job_progress():
+    job = st.session_state.get("score_job")
+    if job is None or job.collected:
+        return
+
+    labels = {"initial": "Initial scorecard", "refined": "Refined scorecard with KPIs"}
+    st.progress(job.progress, text="Generating scorecards in the background…")
+    for stage in STAGES:
+        info = job.status[stage]
+        st.caption(f"{labels[stage]}: {info['state']} · {info['elapsed']:.1f}s")
+
+    if job.done:
+        job.collected = True
+        for stage in STAGES:
+            info = job.status[stage]
+            if job.results[stage] is not None:
+                st.session_state[f"score_{stage}"] = job.results[stage]
+                analysis_store.save(
+                    f"score_{stage}",
+                    job.results[stage],
+                    category=(st.session_state.market_data or {}).get("category"),
+                    model=job.models[stage],
+                    parent_id=st.session_state.market_id,
+                )
+            elif info["error"]:
+                st.session_state.score_job_errors = st.session_state.get("score_job_errors", []) + [
+                    (info["error"], info["raw"])
+                ]
+        st.rerun()
 
-Recalculate `weightedTotal` scores based on the new weights.
 
-Return **ONLY valid JSON** with the same top-level structure as before,
-plus the `kpis` field inside each dimension. Do not include any explanation text
-or markdown.
-                """.strip()
-
-                raw_refined = call_llm(prompt_score_refined)
-                try:
-                    score_refined = parse_json_from_text(raw_refined)
-                    score_refined = compute_weighted_totals_and_ratings(score_refined)
-                    st.session_state.score_refined = score_refined
-                except Exception as e:
-                    st.error(f"Could not parse refined scorecard JSON: {e}")
-                    st.caption(raw_refined)
+@st.fragment
+@timed("task 3 · results")
+def task3_results(category: str):
+    for error, raw in st.session_state.pop("score_job_errors", []):
+        st.error(error)
+        if raw:
+            st.caption(raw)
 
     # --------- DISPLAY SCORECARDS (if available) ---------
     score_initial = st.session_state.get("score_initial")
@@ -787,30 +1249,13 @@ or markdown.
         st.markdown("### 🟢 Initial Scorecard", unsafe_allow_html=True)
         st.caption(f"{category} · {score_initial.get('evaluationDate', '')}")
 
-        # Build dataframe
-        initial_rows = []
-        for s in score_initial.get("supplierScores", []):
-            row = {"Supplier": s.get("supplierName", "")}
-            scores = s.get("scores", {}) or {}
-            for dim in score_initial.get("dimensions", []):
-                dim_name = dim.get("name")
-                if dim_name:
-                    row[dim_name] = scores.get(dim_name)
-            row["Weighted Total"] = s.get("weightedTotal")
-            row["Rating"] = s.get("rating")
-            initial_rows.append(row)
-
-        if initial_rows:
-            df_initial = (
-                pd.DataFrame(initial_rows)
-                .sort_values("Weighted Total", ascending=False)
-                .reset_index(drop=True)
-            )
+        df_initial = cached_scorecard_frame(score_initial)
+        if not df_initial.empty:
             st.dataframe(df_initial, use_container_width=True, height=260)
 
         # Best supplier (initial)
         best = score_initial.get("bestSupplier")
-        if not best and initial_rows:
+        if not best and not df_initial.empty:
             # compute from dataframe if model did not provide
             top_row = df_initial.iloc[0]
             best = {
@@ -828,35 +1273,60 @@ or markdown.
 
         st.markdown("</div>", unsafe_allow_html=True)
 
+    # ---------- WHAT-IF WEIGHTS (local, no LLM call) ----------
+    if score_initial and score_initial.get("supplierScores"):
+        from scorecard import dimension_weights, score_matrix
+
+        base_weights = dimension_weights(score_initial).to_dict()
+        scores = score_matrix(score_initial, list(base_weights))
+
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown("### 🎚️ What-if Weights", unsafe_allow_html=True)
+        st.caption("Recomputed locally from the initial scores – no extra model call.")
+
+        slider_cols = st.columns(min(len(base_weights), 3) or 1)
+        what_if = {}
+        for i, (dim, w) in enumerate(base_weights.items()):
+            with slider_cols[i % len(slider_cols)]:
+                what_if[dim] = st.slider(
+                    dim, 0, max(50, int(round(w))), int(round(w)), step=1,
+                    key=f"what_if_{category}_{dim}",
+                )
+
+        st.dataframe(
+            cached_what_if_frame(scores, base_weights, what_if),
+            use_container_width=True,
+            height=240,
+        )
+
+        with st.expander("📐 Sensitivity sweep"):
+            spread = st.select_slider(
+                "Vary each weight by ±", options=[10, 25, 50], value=50,
+                format_func=lambda v: f"{v}%",
+            )
+            sweep = cached_sensitivity_sweep(
+                scores, what_if, factors=(1 - spread / 100, 1.0, 1 + spread / 100)
+            )
+            st.caption(
+                f"{sweep.attrs['scenarios']:,} weight vectors around the what-if weights above."
+            )
+            st.dataframe(sweep, use_container_width=True, height=240)
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
     # ---------- REFINED SCORECARD TABLE + KPIs ----------
     if score_refined:
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown("### 🔵 Refined Scorecard (with KPIs)", unsafe_allow_html=True)
         st.caption(f"{category} · {score_refined.get('evaluationDate', '')}")
 
-        refined_rows = []
-        for s in score_refined.get("supplierScores", []):
-            row = {"Supplier": s.get("supplierName", "")}
-            scores = s.get("scores", {}) or {}
-            for dim in score_refined.get("dimensions", []):
-                dim_name = dim.get("name")
-                if dim_name:
-                    row[dim_name] = scores.get(dim_name)
-            row["Weighted Total"] = s.get("weightedTotal")
-            row["Rating"] = s.get("rating")
-            refined_rows.append(row)
-
-        if refined_rows:
-            df_refined = (
-                pd.DataFrame(refined_rows)
-                .sort_values("Weighted Total", ascending=False)
-                .reset_index(drop=True)
-            )
+        df_refined = cached_scorecard_frame(score_refined)
+        if not df_refined.empty:
             st.dataframe(df_refined, use_container_width=True, height=260)
 
         # Best supplier (refined)
         best2 = score_refined.get("bestSupplier")
-        if not best2 and refined_rows:
+        if not best2 and not df_refined.empty:
             top_row2 = df_refined.iloc[0]
             best2 = {
                 "name": top_row2["Supplier"],
@@ -874,22 +1344,211 @@ or markdown.
         # Show KPIs per dimension (robust to different formats)
         if score_refined.get("dimensions"):
             with st.expander("📊 Dimension KPIs used in refined scorecard"):
-                for dim in score_refined["dimensions"]:
-                    dim_name = dim.get("name", "Dimension")
-                    kpis = dim.get("kpis", [])
-                    if not kpis:
-                        continue
-                    st.markdown(f"**{dim_name}**")
-                    for kpi in kpis:
-                        if isinstance(kpi, dict):
-                            name = kpi.get("name", "KPI")
-                            desc = kpi.get("description", "")
-                            imp = kpi.get("importance", "")
-                            extra = f" _(Importance: {imp})_" if imp else ""
-                            st.markdown(f"- **{name}** – {desc}{extra}")
-                        else:
-                            # if model returns simple strings instead of objects
-                            st.markdown(f"- {kpi}")
-                    st.markdown("---")
+                st.markdown(cached_markdown("kpis", score_refined["dimensions"]))
 
         st.markdown("</div>", unsafe_allow_html=True)
+
+    scorecards = [
+        {"id": None, "kind": f"score_{stage}", "category": category,
+         "data": st.session_state.get(f"score_{stage}"), "created_at": None}
+        for stage in STAGES if st.session_state.get(f"score_{stage}")
+    ]
+    if scorecards:
+        export_panel("scorecard", scorecards, f"Supplier evaluation: {category}")
+
+
+@st.fragment
+@timed("task 3 · bulk import")
+def task3_bulk_import():
+    with st.expander("📥 Score a supplier panel from CSV / Parquet"):
+        st.caption(
+            "One row per supplier: a name column plus one 0–10 score column per dimension ("
+            + ", ".join(INITIAL_WEIGHTS)
+            + "). Files are scored in chunks, so panel size is not limited by memory."
+        )
+        upload = st.file_uploader(
+            "Supplier panel", type=["csv", "parquet"], label_visibility="collapsed"
+        )
+        weight_set = st.radio("Weights", ["Initial", "Refined"], horizontal=True)
+        weights = INITIAL_WEIGHTS if weight_set == "Initial" else REFINED_WEIGHTS
+
+        if upload is not None and st.button("📊 Score panel", use_container_width=True):
+            from supplier_import import RESULTS_DIR, score_panel_file
+
+            out_path = os.path.join(RESULTS_DIR, f"{upload.file_id}-{weight_set.lower()}.parquet")
+            status = st.empty()
+            try:
+                summary = score_panel_file(
+                    upload, out_path, weights, name=upload.name,
+                    on_progress=lambda rows: status.caption(f"Scored {rows:,} suppliers…"),
+                )
+            except Exception as e:
+                st.error(f"Could not score {upload.name}: {e}")
+            else:
+                st.session_state.bulk_result = {
+                    "path": out_path,
+                    "name": os.path.splitext(upload.name)[0],
+                    "rows": summary.rows,
+                    "mean": summary.mean_total,
+                    "ratings": summary.rating_counts,
+                    "top": summary.top(),
+                }
+            status.empty()
+
+        result = st.session_state.get("bulk_result")
+        if not result or not os.path.exists(result["path"]):
+            return
+        from supplier_import import PAGE_ROWS, read_page, row_count
+
+        st.markdown(f"**{result['rows']:,} suppliers scored** · mean weighted total {result['mean']:.2f}")
+        st.caption(" · ".join(f"{label}: {count:,}" for label, count in result["ratings"].items()))
+        st.markdown("**Top suppliers**")
+        st.dataframe(result["top"], use_container_width=True, height=220)
+
+        pages = max(1, -(-row_count(result["path"]) // PAGE_ROWS))
+        page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1)
+        page_frame = read_page(result["path"], page - 1)
+        st.dataframe(page_frame, use_container_width=True, height=320)
+
+        col1, col2 = st.columns(2)
+        with col1, open(result["path"], "rb") as f:
+            st.download_button(
+                "⬇️ All results (Parquet)", f, file_name=f"{result['name']}-scored.parquet",
+                use_container_width=True,
+            )
+        with col2:
+            st.download_button(
+                "⬇️ This page (CSV)", page_frame.to_csv(index=False),
+                file_name=f"{result['name']}-scored-page{page}.csv", use_container_width=True,
+            )
+
+
+with tabs[2]:
+    st.markdown(
+        """
+        <div class="task-header">
+            <div class="pill">TASK 3 · SUPPLIER SCORECARD</div>
+            <h2 style="margin-top:0.3rem;margin-bottom:0.1rem;font-size:1.3rem;font-weight:800;">
+                Supplier Evaluation Scorecard
+            </h2>
+            <p style="margin:0.2rem 0;color:#475569;font-size:0.9rem;">
+                Based on Task&nbsp;1 suppliers, build an initial weighted scorecard and then
+                a refined scorecard with KPIs.
+            </p>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    # --------- Ensure Task 1 has been run ---------
+    task3_history_picker()
+    suppliers, category = task3_context()
+    if not suppliers:
+        st.info("Run **Task 1 – Supplier Market Intelligence** first to identify suppliers.")
+    else:
+        task3_controls(suppliers, category)
+        show_score_job_progress()
+        task3_results(category)
+    task3_bulk_import()
+
+
+# ===================================================================== #
+#                        ADMIN · PERFORMANCE                            #
+# ===================================================================== #
+
+@st.fragment
+def admin_perf_tab():
+    st.markdown('<div class="section-title">⏱️ Where the time goes</div>', unsafe_allow_html=True)
+    st.caption(
+        f"Last {len(RECORDER.spans):,} spans in this process"
+        + (f" · also written to {RECORDER.path}" if RECORDER.path else "")
+    )
+    if st.button("Refresh", key="admin_refresh"):
+        st.rerun(scope="fragment")
+
+    st.markdown("**Per stage**")
+    st.dataframe(RECORDER.stage_stats(), use_container_width=True)
+
+    llm_spans = RECORDER.snapshot("llm.complete") + RECORDER.snapshot("llm.stream")
+    cached = sum(1 for s in llm_spans if s.get("cached"))
+    coalesced = sum(1 for s in llm_spans if s.get("coalesced"))
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("LLM calls", len(llm_spans))
+    col2.metric("Prompt tokens", f"{sum(s.get('prompt_tokens') or 0 for s in llm_spans):,}")
+    col3.metric("Response tokens", f"{sum(s.get('output_tokens') or 0 for s in llm_spans):,}")
+    col4.metric("Served from cache", f"{cached / len(llm_spans):.0%}" if llm_spans else "–")
+    cache_stats = response_cache.stats()
+    st.caption(
+        f"Response cache hit rate (all processes): {cache_stats['hit_rate']:.0%} · "
+        f"coalesced calls: {coalesced}"
+    )
+
+    st.markdown("**Model tiers**")
+    routes = RECORDER.snapshot("llm.route")
+    if routes:
+        import pandas as pd
+
+        tiers = pd.DataFrame(routes)
+        tiers["ok"] = tiers["ok"].fillna(False).astype(bool) if "ok" in tiers else False
+        for column in ("cost_usd", "output_tokens"):
+            tiers[column] = (pd.to_numeric(tiers[column], errors="coerce")
+                             if column in tiers else float("nan"))
+        per_tier = tiers.groupby(["task", "tier", "model"]).agg(
+            attempts=("ok", "size"),
+            valid=("ok", "mean"),
+            p50_seconds=("duration", "median"),
+            p95_seconds=("duration", lambda d: d.quantile(0.95)),
+            output_tokens=("output_tokens", "mean"),
+            cost_usd=("cost_usd", "sum"),
+        ).reset_index()
+        st.dataframe(
+            per_tier.round({"valid": 2, "p50_seconds": 2, "p95_seconds": 2,
+                            "output_tokens": 0, "cost_usd": 4}),
+            hide_index=True, use_container_width=True,
+        )
+        escalated = (tiers["escalation"] > 0).sum()
+        st.caption(f"Escalations: {escalated} · total routed cost ${tiers['cost_usd'].sum():.4f}")
+    else:
+        st.caption("No routed calls yet.")
+
+    st.markdown("**LLM usage (all processes, last 7 days)**")
+    if LEDGER.enabled:
+        group = st.radio("Group by", LEDGER.GROUPS, horizontal=True, key="usage_group")
+        usage_rows = LEDGER.totals(group, days=7)
+        if usage_rows:
+            st.dataframe(usage_rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No upstream requests recorded yet.")
+        limits = [f"{name} ${usd:.2f}" for name, usd in (
+            ("per session/day", BUDGET.session_usd), ("global/day", BUDGET.global_usd),
+            ("rolling hour", BUDGET.hourly_usd)) if usd]
+        st.caption("Budgets: " + (", ".join(limits) if limits else "none configured"))
+    else:
+        st.caption("Usage ledger disabled (USAGE_STORE_PATH is empty).")
+
+    st.markdown("**Slowest recent LLM calls**")
+    st.dataframe(
+        [
+            {k: s.get(k) for k in ("name", "duration", "format", "prompt_tokens",
+                                   "output_tokens", "tokens_per_second", "cached")}
+            for s in sorted(llm_spans, key=lambda s: s["duration"], reverse=True)[:10]
+        ],
+        use_container_width=True,
+    )
+
+    st.markdown("**Slowest recent reruns**")
+    st.dataframe(
+        [
+            {"started": time.strftime("%H:%M:%S", time.localtime(s["start"])),
+             "seconds": round(s["duration"], 3)}
+            for s in RECORDER.slowest("render.full script")
+        ],
+        use_container_width=True,
+    )
+
+
+if show_admin:
+    with tabs[3]:
+        admin_perf_tab()
+
+record_timing("full script", time.perf_counter() - SCRIPT_STARTED)
@@ -0,0 +1,330 @@
+"""
+Headless batch runs of the three tasks, without the Streamlit UI.
+
+Reads one input per line, runs the task for every line on a worker pool and
+appends one JSON object per line to the output file:
+
+    {"task": "market", "input": "Batteries", "ok": true, "data": {...},
+     "analysis_id": 12, "seconds": 8.4, "finished_at": 1760000000.0}
+
+Failed lines are written with `"ok": false` and an `"error"`. The output
+file doubles as the checkpoint: when it already exists, lines that finished
+successfully are skipped and only failed or missing ones are run again, so
+an interrupted nightly run is simply restarted with the same command.
+Reruns append, so the last record of an input is the current one.
+
+    python batch.py market categories.txt -o market.jsonl
+    python batch.py contract items.txt -o contracts.jsonl --workers 8
+    python batch.py scorecard categories.txt -o scorecards.jsonl --rescore
+
+Inputs per task:
+
+    market     a procurement category
+    contract   comma-separated items, analysed together (one item per line
+               for item-by-item runs); uses the per-item fan-out with reuse
+    scorecard  a category, optionally followed by ": supplier, supplier, ...";
+               without suppliers, the top suppliers of the category's market
+               intelligence are scored (generated first if not stored)
+
+Results are also saved to the analysis store, so the app shows them, unless
+`--no-save` is given. The same functions can be called from Python:
+`run_market`, `run_contract`, `run_scorecards` and `run_batch`.
+
+The API key is read from the OPENAI_API_KEY environment variable.
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+from analysis_store import AnalysisStore
+from contract_fanout import run_contract_fanout
+from contract_reuse import ContractItemReuse, canonical_item
+from llm import LLM_MODEL, complete_json, make_client
+from llm_cache import ResponseCache
+from market_store import MarketIntelStore
+from market_warmup import generate_market_intelligence
+from model_router import complete_json_routed, model_label, recording_models
+from prompts import (
+    INITIAL_WEIGHTS,
+    REFINED_WEIGHTS,
+    market_intelligence_prompt,
+    scorecard_dimension_refinement_prompt,
+    scorecard_initial_prompt,
+    scorecard_refined_prompt,
+)
+from schemas import (
+    SCORECARD_DIMENSION_REFINEMENT_FORMAT,
+    SCORECARD_INITIAL_FORMAT,
+    SCORECARD_RESCORE_FORMAT,
+)
+from scorecard_jobs import merge_refinement
+from usage_ledger import set_session
+
+DEFAULT_MAX_WORKERS = 4
+SCORECARD_MAX_TOKENS = 3500  # as ScorecardJob, so cached app responses are reused
+
+
+# ---------------------------------------------------------
+# TASKS
+# ---------------------------------------------------------
+def run_market(category: str, client, cache=None, market_store=None, force: bool = False,
+               usage: dict = None) -> dict:
+    """
+    Task 1 market intelligence; a fresh stored result is reused unless `force`.
+    `usage["model"]` is set to the model that produced it, if `usage` is given.
+    """
+    usage = {} if usage is None else usage
+    if market_store is not None and not force:
+        entry = market_store.get(category)
+        if entry is not None and not entry["stale"]:
+            usage["model"] = entry["model"]
+            return entry["data"]
+    data = generate_market_intelligence(category, client, cache=cache, usage=usage)
+    if market_store is not None:
+        market_store.put(category, data, model=usage.get("model", LLM_MODEL))
+    return data
+
+
+def run_contract(items: list, client, cache=None, reuse=None,
+                 max_workers: int = DEFAULT_MAX_WORKERS, models: set = None) -> dict:
+    """
+    Task 2 contract analysis of `items`, one request per item. Raises
+    ValueError if any item (or the contract-type summary) failed. The models
+    that answered are added to `models`, if given.
+    """
+    complete = partial(complete_json_routed, client, cache=cache)
+    contract_data, failures = run_contract_fanout(
+        items, complete_json=recording_models(complete, set() if models is None else models),
+        max_workers=max_workers, reuse=reuse,
+    )
+    if failures:
+        raise ValueError("; ".join(f"{item}: {error}" for item, error in failures))
+    return contract_data
+
+
+def run_scorecards(category: str, suppliers: list, client, cache=None,
+                   rescore: bool = False, models: dict = None) -> dict:
+    """
+    Task 3 initial and refined scorecards, as `{"initial": ..., "refined": ...}`.
+
+    By default the refined scorecard reuses the initial scores with the
+    refined weights and only asks for KPI text; `rescore` asks the model to
+    score the suppliers again, like the app's rescore toggle. The model that
+    answered each stage is put in `models`, if given.
+    """
+    from scorecard import compute_weighted_totals_and_ratings
+
+    models = {} if models is None else models
+    asked = []
+
+    def ask(prompt, text_format):
+        usage = {}
+        data = complete_json(client, prompt, text_format, SCORECARD_MAX_TOKENS, cache=cache,
+                             usage=usage)
+        asked.append(usage.get("model"))
+        return data
+
+    initial = compute_weighted_totals_and_ratings(
+        ask(scorecard_initial_prompt(suppliers, category), SCORECARD_INITIAL_FORMAT)
+    )
+    models["initial"] = asked[-1]
+    if rescore:
+        refinement = ask(scorecard_refined_prompt(initial), SCORECARD_RESCORE_FORMAT)
+    else:
+        refinement = ask(
+            scorecard_dimension_refinement_prompt(category, list(INITIAL_WEIGHTS)),
+            SCORECARD_DIMENSION_REFINEMENT_FORMAT,
+        )
+    refined = compute_weighted_totals_and_ratings(
+        merge_refinement(initial, refinement, REFINED_WEIGHTS)
+    )
+    models["refined"] = asked[-1]
+    return {"initial": initial, "refined": refined}
+
+
+def parse_scorecard_input(line: str) -> tuple:
+    """`category[: supplier, supplier, ...]` -> (category, suppliers or None)."""
+    category, _, suppliers = line.partition(":")
+    names = [s.strip() for s in suppliers.split(",") if s.strip()]
+    return category.strip(), names or None
+
+
+def parse_items(line: str) -> list:
+    """Canonical, de-duplicated items of a comma-separated line."""
+    return list(dict.fromkeys(canonical_item(i) for i in line.split(",") if i.strip()))
+
+
+# ---------------------------------------------------------
+# BATCH RUNNER
+# ---------------------------------------------------------
+def read_inputs(path: str) -> list:
+    """Non-empty lines of `path` (or stdin for "-"), without comments and duplicates."""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with f:
+        lines = [line.strip() for line in f]
+    return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+
+
+def completed(output_path: str) -> set:
+    """Inputs with a successful record in an existing output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut off by a crash
+            if record.get("ok"):
+                done.add(record["input"])
+    return done
+
+
+def run_batch(task: str, inputs: list, fn, output_path: str,
+              max_workers: int = DEFAULT_MAX_WORKERS, resume: bool = True, on_record=None) -> dict:
+    """
+    Run `fn(input) -> data` (or `(data, analysis_id)`) for every input on a
+    thread pool, appending one JSON record per input to `output_path` as it
+    finishes. With `resume`, inputs already recorded as successful are
+    skipped. `on_record(record)` is called for every record written.
+
+    Returns counts: {"ok", "failed", "skipped", "seconds"}.
+    """
+    done = completed(output_path) if resume else set()
+    pending = [i for i in inputs if i not in done]
+    counts = {"ok": 0, "failed": 0, "skipped": len(inputs) - len(pending)}
+    lock = threading.Lock()
+    t0 = time.time()
+
+    def run_one(item):
+        started = time.time()
+        record = {"task": task, "input": item}
+        try:
+            result = fn(item)
+            data, analysis_id = result if isinstance(result, tuple) else (result, None)
+            record.update(ok=True, data=data, analysis_id=analysis_id)
+        except Exception as e:
+            record.update(ok=False, error=f"{type(e).__name__}: {e}")
+        record.update(seconds=round(time.time() - started, 2), finished_at=time.time())
+        return record
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="batch") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, run_one, item) for item in pending]
+        for future in as_completed(futures):
+            record = future.result()
+            with lock:
+                out.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+                out.flush()  # each finished input is a checkpoint
+                counts["ok" if record["ok"] else "failed"] += 1
+            if on_record is not None:
+                on_record(record)
+
+    counts["seconds"] = round(time.time() - t0, 1)
+    return counts
+
+
+def task_runner(task: str, client, cache, analysis_store=None, market_store=None,
+                force: bool = False, rescore: bool = False, item_workers: int = DEFAULT_MAX_WORKERS):
+    """`fn(input)` for `run_batch`; results are saved to `analysis_store` when given."""
+    reuse = ContractItemReuse(analysis_store) if analysis_store is not None else None
+
+    def save(kind, data, model, **kwargs):
+        if analysis_store is None:
+            return None
+        return analysis_store.save(kind, data, model=model, **kwargs)
+
+    def market(category):
+        usage = {}
+        data = run_market(category, client, cache, market_store, force=force, usage=usage)
+        return data, save("market", data, usage.get("model"), category=category,
+                          prompt=market_intelligence_prompt(category))
+
+    def contract(line):
+        items = parse_items(line)
+        models = set()
+        data = run_contract(items, client, cache, reuse=reuse, max_workers=item_workers,
+                            models=models)
+        return data, save("contract", data, model_label(models), products=items)
+
+    def scorecard(line):
+        category, suppliers = parse_scorecard_input(line)
+        parent_id = None
+        if suppliers is None:
+            market_data, parent_id = market(category)
+            suppliers = [
+                s.get("name", f"Supplier {i + 1}")
+                for i, s in enumerate(market_data.get("topSuppliers", []))
+            ]
+        if not suppliers:
+            raise ValueError(f"no suppliers for {category}")
+        models = {}
+        result = run_scorecards(category, suppliers, client, cache, rescore=rescore, models=models)
+        initial_id = save("score_initial", result["initial"], models["initial"],
+                          category=category, parent_id=parent_id)
+        save("score_refined", result["refined"], models["refined"], category=category,
+             parent_id=parent_id)
+        return result, initial_id
+
+    return {"market": market, "contract": contract, "scorecard": scorecard}[task]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run Task 1, 2 or 3 for every line of a file.")
+    parser.add_argument("task", choices=["market", "contract", "scorecard"])
+    parser.add_argument("inputs", help="file with one input per line, or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output and checkpoint file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="inputs processed concurrently")
+    parser.add_argument("--item-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="concurrent item requests within one contract analysis")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore the existing output and run every input again")
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate market intelligence even if the stored result is fresh")
+    parser.add_argument("--rescore", action="store_true",
+                        help="ask the model to rescore the refined scorecard")
+    parser.add_argument("--no-save", action="store_true",
+                        help="do not save results to the analysis store")
+    parser.add_argument("--session", default="batch",
+                        help="name the LLM usage of this run is recorded under")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    set_session(args.session)
+
+    inputs = read_inputs(args.inputs)
+    fn = task_runner(
+        args.task, make_client(), ResponseCache(),
+        analysis_store=None if args.no_save else AnalysisStore(),
+        market_store=None if args.no_save else MarketIntelStore(),
+        force=args.force, rescore=args.rescore, item_workers=args.item_workers,
+    )
+
+    def report(record):
+        if not args.quiet:
+            status = "ok" if record["ok"] else f"FAILED {record['error']}"
+            print(f"{record['input']}: {status} ({record['seconds']:.1f}s)", file=sys.stderr)
+
+    counts = run_batch(args.task, inputs, fn, args.output, max_workers=args.workers,
+                       resume=not args.restart, on_record=report)
+    print(
+        f"{args.task}: {counts['ok']} ok, {counts['failed']} failed, "
+        f"{counts['skipped']} already done in {counts['seconds']:.1f}s"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Headless latency / throughput benchmark for app.py.
+
+Drives the Task 1, 2 and 3 flows through Streamlit's AppTest against the
+offline LLM stand-in (fake_llm.py), with several simulated sessions running
+concurrently (one process each, sharing the SQLite stores and response
+cache), and reports p50/p95 end-to-end latency per flow, the cost of a plain
+script rerun (wall clock, and as timed inside app.py), and upstream requests
+per second.
+
+    python benchmarks/bench_app.py
+    python benchmarks/bench_app.py --sessions 8 --iterations 5 --latency-ms 1500
+    python benchmarks/bench_app.py --warm          # keep the response cache
+
+Nothing here talks to OpenAI.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Shared with the session processes, which import this module again
+_TMP = os.environ.get("PROCUREMENT_BENCH_TMP") or tempfile.mkdtemp(prefix="procurement-bench-")
+os.environ["PROCUREMENT_BENCH_TMP"] = _TMP
+os.environ["LLM_BACKEND"] = "fake"
+# Every store the app writes, so a run never touches (or is skewed by) real data
+for _var, _name in [("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+                    ("MARKET_STORE_PATH", "market_intel.sqlite3"),
+                    ("ANALYSIS_STORE_PATH", "analyses.sqlite3"),
+                    ("USAGE_STORE_PATH", "usage.sqlite3"),
+                    ("RISK_STORE_DIR", "risk_store"),
+                    ("SUPPLIER_IMPORT_DIR", "imports"),
+                    ("EXPORT_DIR", "exports")]:
+    os.environ.setdefault(_var, os.path.join(_TMP, _name))
+os.environ.setdefault("PERF_SPANS_PATH", "")
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _button(at, prefix: str):
+    return next(b for b in at.button if b.label.startswith(prefix))
+
+
+def _checkbox(at, prefix: str):
+    return next(c for c in at.checkbox if c.label.startswith(prefix))
+
+
+def new_session():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=300)
+    at.secrets["OPENAI_API_KEY"] = "fake"
+    at.run()
+    return at
+
+
+def flow_task1(at, category: str):
+    at.selectbox[0].select(category)
+    _checkbox(at, "Regenerate").check()
+    _button(at, "🔍").click().run()
+    assert at.session_state["market_data"], "Task 1 produced no data"
+
+
+def flow_task2(at, items: list, timeout: float = 300.0):
+    # The analysis runs on the JobQueue; show_contract_jobs collects it on a
+    # later rerun, so poll like flow_task3 instead of checking right away.
+    at.session_state["contract_data"] = None
+    at.multiselect[0].set_value(items)
+    _button(at, "📑").click().run()
+    deadline = time.time() + timeout
+    while not at.session_state["contract_data"]:
+        errors = [e.value for e in at.error if "analys" in e.value]
+        if errors:
+            raise RuntimeError(f"Task 2 failed: {errors[0]}")
+        if time.time() > deadline:
+            raise TimeoutError("Task 2 job did not finish")
+        time.sleep(0.05)
+        at.run()
+
+
+def flow_task3(at, timeout: float = 300.0):
+    _button(at, "🏅").click().run()
+    deadline = time.time() + timeout
+    while True:
+        job = at.session_state["score_job"]
+        if job is not None and job.collected:
+            break
+        if time.time() > deadline:
+            raise TimeoutError("Task 3 job did not finish")
+        time.sleep(0.05)
+        at.run()
+    assert at.session_state["score_refined"], "Task 3 produced no refined scorecard"
+
+
+def run_session(index: int, iterations: int) -> tuple:
+    """
+    One simulated session, in its own process: AppTest swaps Streamlit's
+    process-wide runtime in and out around every run, so two AppTests
+    running on threads of one process break each other.
+
+    Returns (timings per stage, upstream requests, error or None).
+    """
+    import fake_llm
+
+    results = {}
+    try:
+        _run_flows(index, iterations, results)
+        error = None
+    except Exception as e:
+        error = repr(e)
+    return results, fake_llm.CONFIG.requests, error
+
+
+def _run_flows(index: int, iterations: int, results: dict):
+    from catalog import task1_categories, task2_products
+
+    at = new_session()
+    for i in range(iterations):
+        n = index * iterations + i
+        timings = {}
+
+        t0 = time.perf_counter()
+        at.run()
+        timings["rerun"] = time.perf_counter() - t0
+        # Script time as measured by the app itself (no AppTest overhead)
+        timings["script"] = at.session_state["render_timings"]["full script"]
+
+        t0 = time.perf_counter()
+        flow_task1(at, task1_categories[n % len(task1_categories)])
+        timings["task1"] = time.perf_counter() - t0
+
+        items = [task2_products[(n + k) % len(task2_products)] for k in range(5)]
+        t0 = time.perf_counter()
+        flow_task2(at, items)
+        timings["task2"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        flow_task3(at)
+        timings["task3"] = time.perf_counter() - t0
+
+        for name, value in timings.items():
+            results.setdefault(name, []).append(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent simulated sessions")
+    parser.add_argument("--iterations", type=int, default=3, help="flow runs per session")
+    parser.add_argument("--latency-ms", type=float, default=None)
+    parser.add_argument("--jitter-ms", type=float, default=None)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--failure-rate", type=float, default=None)
+    parser.add_argument("--warm", action="store_true",
+                        help="keep cached responses between runs (default: cold cache)")
+    args = parser.parse_args(argv)
+
+    if not args.warm:
+        os.environ["LLM_CACHE_TTL_SECONDS"] = "0"  # every lookup misses
+    # Read by fake_llm when the session processes import it
+    for name in ("latency_ms", "jitter_ms", "tokens_per_second", "failure_rate"):
+        value = getattr(args, name)
+        if value is not None:
+            os.environ[f"FAKE_LLM_{name.upper()}"] = str(value)
+
+    import fake_llm
+
+    results, requests, errors = {}, 0, []
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.sessions,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(run_session, i, args.iterations) for i in range(args.sessions)]
+        for future in futures:
+            timings, session_requests, error = future.result()
+            for name, values in timings.items():
+                results.setdefault(name, []).extend(values)
+            requests += session_requests
+            if error:
+                errors.append(error)
+    wall = time.perf_counter() - t0
+
+    print(f"sessions={args.sessions} iterations={args.iterations} "
+          f"latency={fake_llm.CONFIG.latency_ms:.0f}ms±{fake_llm.CONFIG.jitter_ms:.0f} "
+          f"cache={'warm' if args.warm else 'cold'}")
+    print(f"{'stage':<8}{'n':>5}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for name in ("rerun", "script", "task1", "task2", "task3"):
+        values = results.get(name, [])
+        print(f"{name:<8}{len(values):>5}{percentile(values, 50):>10.3f}{percentile(values, 95):>10.3f}")
+    print(f"upstream requests: {requests} in {wall:.1f}s ({requests / wall:.1f} req/s)")
+    for e in errors:
+        print(f"session error: {e}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
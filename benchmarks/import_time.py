@@ -0,0 +1,158 @@
+"""
+Cold-start import profile of app.py, as a regression check.
+
+Imports exactly the modules app.py imports at top level, in a fresh
+interpreter with `-X importtime`, and reports the slowest imports. Then runs
+the whole script once through Streamlit's AppTest (against the offline LLM
+stand-in and throwaway stores), since code at module level or in the tabs can
+import things too. It fails if any of the heavy optional libraries is pulled
+in before the first page is drawn (they are imported where a table, a
+generation or an upload first needs them), or if the total exceeds the budget.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 2500 --top 25
+    python benchmarks/import_time.py --no-script              # imports only
+    python benchmarks/import_time.py --raw > importtime.txt   # full -X importtime log
+
+Streamlit itself is part of the total; compare runs on the same machine.
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Must not be imported at app start-up
+DEFERRED = ("pandas", "numpy", "pyarrow", "openai", "httpx")
+
+
+def top_level_imports(path: Path) -> list:
+    """Module names imported at module level (not inside functions) by `path`."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def profile(modules: list) -> str:
+    """stderr of `python -X importtime` importing `modules`."""
+    env = dict(os.environ, LLM_BACKEND="fake", PERF_SPANS_PATH="")
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-2000:])
+        raise SystemExit(f"importing {modules} failed")
+    return result.stderr
+
+
+# Runs app.py once in a fresh interpreter and prints the modules it added to
+# those loaded by an empty script (AppTest and Streamlit load some themselves)
+SCRIPT_RUN = """
+import os
+import sys
+from streamlit.testing.v1 import AppTest
+
+AppTest.from_string("").run()
+before = set(sys.modules)
+at = AppTest.from_file(os.path.abspath("app.py"), default_timeout=120)
+at.secrets["OPENAI_API_KEY"] = "fake"
+at.run()
+if at.exception:
+    sys.exit(at.exception[0].message)
+print("\\n".join(sorted(set(sys.modules) - before)))
+"""
+
+
+def script_run_imports() -> set:
+    """Modules loaded by a first page load of app.py."""
+    with tempfile.TemporaryDirectory(prefix="procurement-import-") as tmp:
+        env = dict(os.environ, LLM_BACKEND="fake", PERF_SPANS_PATH="")
+        for var, name in [("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+                          ("MARKET_STORE_PATH", "market_intel.sqlite3"),
+                          ("ANALYSIS_STORE_PATH", "analyses.sqlite3"),
+                          ("USAGE_STORE_PATH", "usage.sqlite3"),
+                          ("RISK_STORE_DIR", "risk"),
+                          ("SUPPLIER_IMPORT_DIR", "supplier_imports"),
+                          ("EXPORT_DIR", "exports")]:
+            env[var] = os.path.join(tmp, name)
+        result = subprocess.run(
+            [sys.executable, "-c", SCRIPT_RUN], cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-2000:])
+        raise SystemExit("running app.py failed")
+    return set(result.stdout.split())
+
+
+def parse(log: str) -> list:
+    """(module, self µs, cumulative µs, depth) per line of an importtime log."""
+    rows = []
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="fail if the total import time exceeds this")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--raw", action="store_true", help="print the raw -X importtime log")
+    parser.add_argument("--no-script", action="store_true",
+                        help="only profile the imports, do not run the script once")
+    args = parser.parse_args(argv)
+
+    modules = top_level_imports(ROOT / "app.py")
+    log = profile(modules)
+    if args.raw:
+        sys.stdout.write(log)
+        return 0
+
+    rows = parse(log)
+    # Top-level entries (depth 0) add up to the whole import
+    total_ms = sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000
+    loaded = {name for name, *_ in rows}
+    pulled_in = sorted(m for m in DEFERRED if m in loaded)
+
+    print(f"app.py top-level imports: {', '.join(modules)}")
+    print(f"total import time: {total_ms:.0f} ms\n")
+    print(f"{'module':<40}{'self ms':>10}{'cumul. ms':>12}")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{name:<40}{self_us / 1000:>10.1f}{cumulative_us / 1000:>12.1f}")
+
+    failed = False
+    if pulled_in:
+        print(f"\nFAIL: imported at start-up: {', '.join(pulled_in)}")
+        failed = True
+    if not args.no_script:
+        run_loaded = script_run_imports()
+        pulled_in = sorted(m for m in DEFERRED if m in run_loaded)
+        if pulled_in:
+            print(f"\nFAIL: imported by the first page load: {', '.join(pulled_in)}")
+            failed = True
+        else:
+            print(f"\nfirst page load: {len(run_loaded)} more modules, none of {', '.join(DEFERRED)}")
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nFAIL: {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Input / output token sizes of the Task 3 refinement call, before and after
+the delta-style protocol.
+
+Before: the whole initial scorecard was sent back verbatim and the model
+re-emitted all of it with KPIs added and totals recalculated. After: only
+dimension names, weights and (for a rescore) a compact score table go in,
+and only KPIs and scores come out; the rest is merged locally.
+
+    python benchmarks/prompt_tokens.py
+    python benchmarks/prompt_tokens.py --suppliers 10
+
+Token counts use tiktoken (o200k_base) when it is installed, otherwise the
+~4 characters per token estimate from telemetry.py. Responses are the
+offline stand-in's payloads (fake_llm.py), which have realistic shapes.
+"""
+
+import argparse
+import copy
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fake_llm import _COMPANIES, payload_for  # noqa: E402
+from prompts import (  # noqa: E402
+    INITIAL_WEIGHTS,
+    REFINED_WEIGHTS,
+    scorecard_dimension_refinement_prompt,
+    scorecard_initial_prompt,
+    scorecard_refined_prompt,
+)
+from telemetry import estimate_tokens  # noqa: E402
+
+
+def token_counter():
+    try:
+        import tiktoken
+    except ImportError:
+        return estimate_tokens, "estimate (~4 chars/token)"
+    encoding = tiktoken.get_encoding("o200k_base")
+    return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+
+
+def legacy_refined_prompt(score_initial: dict) -> str:
+    """The refinement prompt as it was before the delta protocol."""
+    weights = "\n".join(f"- {name} {w}" for name, w in REFINED_WEIGHTS.items())
+    return f"""
+Refine the following supplier evaluation scorecard for Dell.
+Adjust the weights and add 2–3 concrete KPIs for each dimension.
+
+Original scorecard JSON:
+{json.dumps(score_initial)}
+
+New weights:
+{weights}
+
+For each dimension, add a `kpis` array with objects:
+  "kpis":[{{"name":"KPI name","description":"what it measures","importance":"why it matters for Dell"}}]
+
+Recalculate `weightedTotal` scores based on the new weights.
+
+Return **ONLY valid JSON** with the same top-level structure as before,
+plus the `kpis` field inside each dimension. Do not include any explanation text
+or markdown.
+    """.strip()
+
+
+def legacy_refined_output(score_initial: dict, kpis: dict) -> str:
+    """What the model re-emitted: the full scorecard, plus KPIs."""
+    refined = copy.deepcopy(score_initial)
+    refined["evaluationTitle"] = "Refined Scorecard"
+    for dim in refined["dimensions"]:
+        dim["weight"] = REFINED_WEIGHTS.get(dim["name"], dim["weight"])
+        dim["kpis"] = kpis.get(dim["name"], [])
+    return json.dumps(refined)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--suppliers", type=int, default=5)
+    parser.add_argument("--category", default="Semiconductors & Microprocessors")
+    args = parser.parse_args(argv)
+
+    count, method = token_counter()
+    suppliers = _COMPANIES[: args.suppliers]
+    score_initial = payload_for(scorecard_initial_prompt(suppliers, args.category))
+
+    kpi_prompt = scorecard_dimension_refinement_prompt(args.category, list(INITIAL_WEIGHTS))
+    kpi_output = json.dumps(payload_for(kpi_prompt))
+    kpis = {d["name"]: d["kpis"] for d in json.loads(kpi_output)["dimensions"]}
+
+    rescore_prompt = scorecard_refined_prompt(score_initial)
+    rescore_output = json.dumps(payload_for(rescore_prompt))
+
+    old_prompt = legacy_refined_prompt(score_initial)
+    old_output = legacy_refined_output(score_initial, kpis)
+
+    rows = [
+        ("before: full scorecard round trip", old_prompt, old_output),
+        ("after: rescore (delta)", rescore_prompt, rescore_output),
+        ("after: KPIs only (default)", kpi_prompt, kpi_output),
+    ]
+    base_in, base_out = count(old_prompt), count(old_output)
+
+    print(f"suppliers={args.suppliers} tokens={method}")
+    print(f"{'refinement call':<36}{'input':>8}{'output':>8}{'Δ output':>10}")
+    for label, prompt, output in rows:
+        n_in, n_out = count(prompt), count(output)
+        print(f"{label:<36}{n_in:>8}{n_out:>8}{(n_out - base_out) / base_out:>10.0%}")
+    print(f"(input baseline {base_in}, output baseline {base_out})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Static category and product lists offered in the dashboard.
+"""
+
+task1_categories = [
+    "Electronics & Semiconductors",
+    "Packaging Materials",
+    "Logistics & Transportation",
+    "Chemicals & Materials",
+    "IT Services & Software",
+    "Hardware Components (ODM)",
+    "Cloud Computing Services",
+    "Network Equipment",
+    "Data Storage Solutions",
+    "Manufacturing Equipment",
+    "Office Supplies",
+    "Energy & Utilities",
+    "Laptop Components (Displays, Batteries)",
+    "Server Processors (CPUs)",
+    "Semiconductor & Microchips",
+    "Standard Cables & Connectors",
+    "Cooling Systems & Thermal Solutions",
+    "Power Supply Units",
+    "Networking Equipment (Switches/Routers)",
+    "Data Storage Devices (SSDs)",
+]
+
+task2_products = [
+    "Laptop Components (Displays, Batteries, Keyboards)",
+    "Server Components (Processors, Memory, Storage)",
+    "Semiconductor & Microchips",
+    "Printed Circuit Boards (PCBs)",
+    "Standard Cables & Connectors",
+    "Cooling Systems & Thermal Solutions",
+    "Power Supply Units",
+    "Networking Equipment",
+    "Data Storage Devices (SSDs)",
+    "Graphics Processing Units (GPUs)",
+    "Packaging Materials",
+    "Logistics & Freight Services",
+    "Green/Sustainable Materials",
+    "Cloud Infrastructure Services",
+    "IT Support & Consulting",
+    "Security & Compliance Solutions",
+    "Manufacturing Equipment & Tools",
+    "Testing & Quality Assurance Equipment",
+    "Raw Materials (Plastics, Metals, Composites)",
+]
@@ -0,0 +1,119 @@
+"""
+Per-item fan-out for the Task 2 contract analysis.
+
+Instead of one large prompt covering every selected item, each item gets its
+own request on a bounded thread pool and the `items` arrays are merged. The
+static contract-type cheat sheet is requested once, in parallel, rather than
+being regenerated inside every item response. A failed or unparseable item
+is reported on its own and does not discard the others.
+
+With a `ContractItemReuse` (contract_reuse.py), items and the cheat sheet
+that were analysed before are taken from the store and only the rest is
+requested; new results are stored for next time.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from prompts import contract_prompt, contract_summary_prompt
+from schemas import CONTRACT_ITEMS_FORMAT, CONTRACT_SUMMARY_FORMAT
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def run_contract_fanout(
+    items: list,
+    complete_json,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    on_progress=None,
+    on_item=None,
+    reuse=None,
+):
+    """
+    Analyse `items` with one request each.
+
+    `complete_json(prompt, text_format) -> dict` performs one schema-checked
+    LLM call (see `llm.complete_json`). `on_progress(done, total)` is called
+    after every finished request and `on_item(item_row)` receives each
+    analysed item as soon as it arrives (stored items first).
+
+    Returns `(contract_data, failures)` where `failures` is a list of
+    `(item, error)` tuples.
+    """
+    results = {}
+    failures = []
+    summary = {}
+    total = len(items) + 1
+    done = 0
+
+    need_summary = True
+    if reuse is not None:
+        for item in items:
+            rows = reuse.lookup(item)
+            if rows:
+                results[item] = rows
+                if on_item is not None:
+                    for row in rows:
+                        on_item(row)
+        summary = reuse.summary() or {}
+        need_summary = not summary
+        done = len(results) + (not need_summary)
+        if on_progress is not None and done:
+            on_progress(done, total)
+
+    prompts_by_item = {
+        item: contract_prompt([item], include_summary=False) for item in items if item not in results
+    }
+    if not prompts_by_item and not need_summary:
+        return _merge(items, results, summary), failures
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total - done))) as pool:
+        # Each request runs in a copy of the caller's context (usage attribution)
+        def submit(*args):
+            return pool.submit(contextvars.copy_context().run, complete_json, *args)
+
+        futures = {}
+        if need_summary:
+            futures[submit(contract_summary_prompt(), CONTRACT_SUMMARY_FORMAT)] = None
+        for item, prompt in prompts_by_item.items():
+            futures[submit(prompt, CONTRACT_ITEMS_FORMAT)] = item
+
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                parsed = future.result()
+                if item is None:
+                    summary = parsed.get("contractTypeSummary", {}) or {}
+                    if reuse is not None and summary:
+                        reuse.save_summary(summary)
+                else:
+                    item_rows = parsed.get("items", []) or []
+                    if not item_rows:
+                        raise ValueError("response contained no items")
+                    results[item] = item_rows
+                    if reuse is not None:
+                        reuse.save(item, item_rows)
+                    if on_item is not None:
+                        for row in item_rows:
+                            on_item(row)
+            except Exception as e:
+                failures.append((item or "Contract type summary", e))
+
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total)
+
+    return _merge(items, results, summary), failures
+
+
+def _merge(items: list, results: dict, summary: dict) -> dict:
+    merged_items = []
+    for item in items:  # keep the user's selection order
+        merged_items.extend(results.get(item, []))
+
+    return {
+        "analysisDate": date.today().isoformat(),
+        "items": merged_items,
+        "contractTypeSummary": summary,
+    }
@@ -0,0 +1,178 @@
+"""
+Per-item reuse of Task 2 contract analyses.
+
+The per-item fan-out (contract_fanout.py) analyses each procurement item on
+its own, but an exact prompt cache still misses whenever the date in the
+prompt changes. Here every analysed item is stored on its own, under a
+canonical item name, in the analysis store (kind "contract_item"). A
+request is then assembled from stored items, and the model is only called
+for items that have not been seen yet.
+
+Catalog items canonicalise to their catalog spelling, so case, spacing and
+selection order do not matter. Free-text items are matched with a small
+local vector index: hashed character-trigram vectors, compared by cosine
+similarity with NumPy. This catches close variants ("Power supply units",
+"Power Supply Unit (PSU)"). It needs no embedding model or API call, which
+keeps it usable offline and in the fake backend. NumPy and the index are
+only loaded when a free-text item first needs a similarity lookup.
+
+    ITEM_REUSE_MAX_AGE_DAYS    reuse stored items up to this age (default 30)
+    ITEM_REUSE_MIN_SIMILARITY  cosine threshold for free-text matches (default 0.82)
+"""
+
+import copy
+import os
+import re
+import threading
+import time
+import zlib
+
+from catalog import task2_products
+
+MAX_AGE_SECONDS = float(os.environ.get("ITEM_REUSE_MAX_AGE_DAYS", 30)) * 86400
+MIN_SIMILARITY = float(os.environ.get("ITEM_REUSE_MIN_SIMILARITY", 0.82))
+EMBEDDING_DIM = 1024
+
+ITEM_KIND = "contract_item"
+SUMMARY_KIND = "contract_summary"
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9&]+", " ", text.casefold())).strip()
+
+
+_CATALOG = {normalize(p): p for p in task2_products}
+
+
+def canonical_item(item: str) -> str:
+    """Catalog spelling for catalog items, tidied-up text for anything else."""
+    key = normalize(item)
+    return _CATALOG.get(key) or re.sub(r"\s+", " ", item).strip()
+
+
+def embed(texts: list):
+    """
+    L2-normalised hashed character-trigram counts, one row per text.
+    Words are padded with spaces so word starts and ends get trigrams too.
+    """
+    import numpy as np
+
+    vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f"  {normalize(text)}  "
+        grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+        buckets = [zlib.crc32(g.encode("utf-8")) % EMBEDDING_DIM for g in grams]
+        np.add.at(vectors[row], buckets, 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class VectorIndex:
+    """Names and their embeddings; nearest neighbours by cosine similarity."""
+
+    def __init__(self, names=()):
+        import numpy as np
+
+        self._lock = threading.Lock()
+        self.names = []
+        self._known = set()  # membership of `names`, which keeps the row order
+        self.matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self.add(names)
+
+    def add(self, names):
+        import numpy as np
+
+        with self._lock:
+            new = [n for n in dict.fromkeys(names) if n not in self._known]
+            if new:
+                self.names.extend(new)
+                self._known.update(new)
+                self.matrix = np.vstack([self.matrix, embed(new)])
+
+    def nearest(self, text: str, k: int = 1) -> list:
+        """Up to `k` `(name, similarity)` pairs, most similar first."""
+        import numpy as np
+
+        with self._lock:
+            if not self.names:
+                return []
+            scores = self.matrix @ embed([text])[0]
+            top = np.argsort(-scores)[:k]
+            return [(self.names[i], float(scores[i])) for i in top]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class ContractItemReuse:
+    def __init__(self, store, max_age_seconds: float = MAX_AGE_SECONDS,
+                 min_similarity: float = MIN_SIMILARITY):
+        self.store = store
+        self.max_age_seconds = max_age_seconds
+        self.min_similarity = min_similarity
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._stats_lock = threading.Lock()  # lookups come from the fan-out threads
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @property
+    def index(self) -> VectorIndex:
+        with self._index_lock:
+            if self._index is None:
+                self._index = VectorIndex(self.store.products(ITEM_KIND))
+            return self._index
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _fresh(self, entry) -> bool:
+        return entry is not None and time.time() - entry["created_at"] <= self.max_age_seconds
+
+    def lookup(self, item: str):
+        """
+        Stored rows for `item`, or None. Rows reused from a close variant
+        keep the requested name and record the original in `reusedFrom`.
+        """
+        canonical = canonical_item(item)
+        entry = self.store.latest(ITEM_KIND, product=canonical)
+        if self._fresh(entry):
+            self._count("hits")
+            return entry["data"]["items"]
+
+        # Catalog items are distinct products; only free text matches variants
+        near = [] if canonical in task2_products else self.index.nearest(canonical, k=3)
+        for name, similarity in near:
+            if similarity < self.min_similarity:
+                break
+            entry = self.store.latest(ITEM_KIND, product=name)
+            if self._fresh(entry):
+                self._count("near_hits")
+                rows = copy.deepcopy(entry["data"]["items"])
+                for row in rows:
+                    row["name"] = item
+                    row["reusedFrom"] = name
+                return rows
+        self._count("misses")
+        return None
+
+    def save(self, item: str, rows: list):
+        canonical = canonical_item(item)
+        self.store.save(ITEM_KIND, {"items": rows}, products=[canonical])
+        if self._index is not None:
+            self._index.add([canonical])
+
+    def summary(self):
+        entry = self.store.latest(SUMMARY_KIND)
+        return entry["data"] if self._fresh(entry) else None
+
+    def save_summary(self, summary: dict):
+        self.store.save(SUMMARY_KIND, summary)
+
+    def stats(self) -> dict:
+        indexed = len(self._index) if self._index is not None else None
+        with self._stats_lock:
+            return {"indexed": indexed, "hits": self.hits,
+                    "near_hits": self.near_hits, "misses": self.misses}
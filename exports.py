@@ -0,0 +1,484 @@
+"""
+Flat-table and report exports of generated analyses.
+
+Every analysis kind (see analysis_store.py) is flattened into one or more
+tables with fixed columns:
+
+    market            suppliers, country_risks
+    contract          contract_items, contract_comparison, contract_types
+    contract_item     contract_items, contract_comparison
+    score_initial /   scorecard_totals, scorecard_scores, scorecard_kpis
+    score_refined
+
+A table is a `Table(name, columns, rows)` where `rows` is a zero-argument
+callable returning an iterator of row tuples, so the data is produced while
+it is written, and bulk exports re-read the store table by table rather
+than holding every payload at once.
+
+Writers:
+
+    write_csv_zip     one CSV per table in a ZIP (`iter_csv` streams one table)
+    write_xlsx        one sheet per table (openpyxl write-only mode, optional;
+                      `available_formats` leaves Excel out without it)
+    write_parquet_zip one Parquet file per table, written in row batches
+    iter_pdf          a formatted text report; a small built-in PDF writer,
+                      no extra dependency
+
+All writers take a binary file object. `export_to_file` writes an export
+under `EXPORT_DIR` (default .cache/exports), which the app hands to
+`st.download_button` as an open file, like the Task 3 bulk import results.
+Files older than `KEEP_SECONDS` are removed on the next export.
+"""
+
+import csv
+import importlib.util
+import io
+import itertools
+import os
+import re
+import textwrap
+import time
+import zipfile
+from collections import namedtuple
+
+Table = namedtuple("Table", "name columns rows")
+
+FORMATS = {
+    "CSV (zip)": ("zip", "application/zip"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "Parquet (zip)": ("zip", "application/zip"),
+    "PDF report": ("pdf", "application/pdf"),
+}
+# format -> module it needs beyond the app's requirements
+OPTIONAL_MODULES = {"Excel": "openpyxl"}
+BATCH_ROWS = 5_000
+EXPORT_DIR = os.environ.get("EXPORT_DIR", ".cache/exports")
+KEEP_SECONDS = 86400
+
+_META = [("Analysis ID", int), ("Created", str), ("Category", str)]
+
+TABLE_COLUMNS = {
+    "suppliers": _META + [
+        ("Rank", int), ("Supplier", str), ("Headquarters", str), ("Market Share", str),
+        ("Key Capabilities", str), ("Differentiators", str), ("Dell Relevance", str),
+    ],
+    "country_risks": _META + [
+        ("Country", str), ("Supplier Concentration", str),
+        ("Political", float), ("Logistics", float), ("Compliance", float), ("ESG", float),
+        ("Overall Risk Level", str), ("Mitigation", str),
+    ],
+    "contract_items": _META + [
+        ("Item", str), ("Cost Predictability", str), ("Market Volatility", str),
+        ("Duration & Volume", str), ("Recommended Contract", str),
+        ("Alternative Contract", str), ("Final Decision", str),
+    ],
+    "contract_comparison": _META + [
+        ("Item", str), ("Contract Type", str), ("Suitability", str), ("Pros", str), ("Cons", str),
+    ],
+    "contract_types": _META + [("Contract Type", str), ("When To Use", str), ("Key Risks", str)],
+    "scorecard_totals": _META + [
+        ("Stage", str), ("Supplier", str), ("Weighted Total", float), ("Rating", str),
+        ("Strengths", str), ("Weaknesses", str),
+    ],
+    "scorecard_scores": _META + [
+        ("Stage", str), ("Supplier", str), ("Dimension", str), ("Weight", float), ("Score", float),
+    ],
+    "scorecard_kpis": _META + [
+        ("Stage", str), ("Dimension", str), ("KPI", str), ("Description", str), ("Importance", str),
+    ],
+}
+
+KIND_TABLES = {
+    "market": ["suppliers", "country_risks"],
+    "contract": ["contract_items", "contract_comparison", "contract_types"],
+    "contract_item": ["contract_items", "contract_comparison"],
+    "score_initial": ["scorecard_totals", "scorecard_scores", "scorecard_kpis"],
+    "score_refined": ["scorecard_totals", "scorecard_scores", "scorecard_kpis"],
+}
+
+
+def available_formats() -> list:
+    """The `FORMATS` that can be written here, i.e. whose optional module is installed."""
+    return [
+        fmt for fmt in FORMATS
+        if fmt not in OPTIONAL_MODULES or importlib.util.find_spec(OPTIONAL_MODULES[fmt])
+    ]
+
+
+def _num(value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _join(values) -> str:
+    return "; ".join(str(v) for v in values or [])
+
+
+def _kpis(dimension: dict) -> list:
+    # The model sometimes returns KPIs as plain strings (see render.kpis_md)
+    return [k if isinstance(k, dict) else {"name": str(k)} for k in dimension.get("kpis") or []]
+
+
+# ---------------------------------------------------------
+# FLATTENING
+# ---------------------------------------------------------
+def _rows(table: str, entry: dict):
+    """Rows of `table` for one analysis entry (`id`, `kind`, `category`, `created_at`, `data`)."""
+    data = entry["data"] or {}
+    meta = (
+        entry.get("id"),
+        time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created_at"]))
+        if entry.get("created_at") else "",
+        entry.get("category") or data.get("category") or "",
+    )
+    stage = entry.get("kind", "").replace("score_", "")
+
+    if table == "suppliers":
+        for s in data.get("topSuppliers", []) or []:
+            yield meta + (
+                _num(s.get("rank"), int), s.get("name", ""), s.get("headquarters", ""),
+                s.get("marketShare", ""), _join(s.get("keyCapabilities")),
+                s.get("differentiators", ""), s.get("dellRelevance", ""),
+            )
+    elif table == "country_risks":
+        for r in data.get("countryRisks", []) or []:
+            scores = tuple(
+                _num((r.get(key) or {}).get("score"))
+                for key in ("politicalRisk", "logisticsRisk", "complianceRisk", "esgRisk")
+            )
+            yield meta + (r.get("country", ""), r.get("supplierConcentration", "")) + scores + (
+                r.get("overallRiskLevel", ""), r.get("mitigation", ""),
+            )
+    elif table == "contract_items":
+        for item in data.get("items", []) or []:
+            assess = item.get("assessment", {}) or {}
+            yield meta + (
+                item.get("name", ""),
+                (assess.get("costPredictability") or {}).get("level", ""),
+                (assess.get("marketVolatility") or {}).get("level", ""),
+                (assess.get("durationAndVolume") or {}).get("profile", ""),
+                item.get("recommendedContract", ""), item.get("alternativeContract", ""),
+                item.get("finalDecision", ""),
+            )
+    elif table == "contract_comparison":
+        for item in data.get("items", []) or []:
+            for cc in item.get("contractComparison", []) or []:
+                yield meta + (
+                    item.get("name", ""), cc.get("type", ""), cc.get("suitability", ""),
+                    _join(cc.get("pros")), _join(cc.get("cons")),
+                )
+    elif table == "contract_types":
+        for ctype, info in (data.get("contractTypeSummary") or {}).items():
+            yield meta + (ctype, (info or {}).get("whenToUse", ""), (info or {}).get("keyRisks", ""))
+    elif table == "scorecard_totals":
+        for s in data.get("supplierScores", []) or []:
+            yield meta + (
+                stage, s.get("supplierName", ""), _num(s.get("weightedTotal")), s.get("rating", ""),
+                _join(s.get("strengths")), _join(s.get("weaknesses")),
+            )
+    elif table == "scorecard_scores":
+        weights = {d.get("name"): _num(d.get("weight")) for d in data.get("dimensions", []) or []}
+        for s in data.get("supplierScores", []) or []:
+            for dimension, score in (s.get("scores") or {}).items():
+                yield meta + (stage, s.get("supplierName", ""), dimension,
+                              weights.get(dimension), _num(score))
+    elif table == "scorecard_kpis":
+        for d in data.get("dimensions", []) or []:
+            for kpi in _kpis(d):
+                yield meta + (stage, d.get("name", ""), kpi.get("name", ""),
+                              kpi.get("description", ""), kpi.get("importance", ""))
+
+
+def tables_for(entries_by_kind: dict) -> list:
+    """
+    Tables for `{kind: callable returning an iterator of entries}`. Kinds
+    that share a table (e.g. both scorecard stages) are written into it
+    one after the other.
+    """
+    names = {}
+    for kind, entries in entries_by_kind.items():
+        for name in KIND_TABLES.get(kind, []):
+            names.setdefault(name, []).append(entries)
+
+    def rows(name, sources):
+        return lambda: (row for entries in sources for entry in entries() for row in _rows(name, entry))
+
+    return [Table(name, TABLE_COLUMNS[name], rows(name, sources)) for name, sources in names.items()]
+
+
+def entry_tables(entries: list) -> list:
+    """Tables for in-session analyses, given as entries like `AnalysisStore.get` returns."""
+    by_kind = {}
+    for entry in entries:
+        by_kind.setdefault(entry["kind"], []).append(entry)
+    return tables_for({kind: (lambda group=group: iter(group)) for kind, group in by_kind.items()})
+
+
+def stored_tables(store, kinds, limit: int = 500) -> list:
+    """Tables for the newest `limit` stored analyses of each of `kinds`, read one at a time."""
+    def entries(kind):
+        def read():
+            for meta in store.history(kind=kind, limit=limit):
+                entry = store.get(meta["id"])
+                if entry is not None:
+                    yield entry
+        return read
+
+    return tables_for({kind: entries(kind) for kind in kinds})
+
+
+def stored_reports(store, kinds, limit: int = 500):
+    """`(kind, data, category)` of the same analyses, for the PDF report."""
+    for kind in kinds:
+        for meta in store.history(kind=kind, limit=limit):
+            entry = store.get(meta["id"])
+            if entry is not None:
+                yield kind, entry["data"], entry["category"]
+
+
+# ---------------------------------------------------------
+# WRITERS
+# ---------------------------------------------------------
+def iter_csv(table: Table, batch_rows: int = 1_000):
+    """UTF-8 CSV of one table, yielded in chunks of about `batch_rows` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in table.columns])
+    rows = table.rows()
+    while True:
+        batch = list(itertools.islice(rows, batch_rows))
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        if len(batch) < batch_rows:
+            return
+
+
+def write_csv_zip(tables: list, fileobj):
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for table in tables:
+            with zf.open(f"{table.name}.csv", "w") as f:
+                for chunk in iter_csv(table):
+                    f.write(chunk)
+
+
+def write_xlsx(tables: list, fileobj):
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise RuntimeError("Excel export needs openpyxl (pip install openpyxl)") from e
+
+    workbook = Workbook(write_only=True)
+    for table in tables:
+        sheet = workbook.create_sheet(table.name[:31])
+        sheet.append([name for name, _ in table.columns])
+        for row in table.rows():
+            sheet.append(list(row))
+    workbook.save(fileobj)
+
+
+def _arrow_schema(table: Table):
+    import pyarrow as pa
+
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    return pa.schema([(name, types[kind]) for name, kind in table.columns])
+
+
+def write_parquet_zip(tables: list, fileobj, batch_rows: int = BATCH_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as zf:
+        for table in tables:
+            schema = _arrow_schema(table)
+            with zf.open(f"{table.name}.parquet", "w", force_zip64=True) as f:
+                writer = pq.ParquetWriter(f, schema, compression="zstd")
+                rows = table.rows()
+                while True:
+                    batch = list(itertools.islice(rows, batch_rows))
+                    if batch:
+                        columns = list(zip(*batch))
+                        writer.write_batch(pa.record_batch(
+                            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                            schema=schema,
+                        ))
+                    if len(batch) < batch_rows:
+                        break
+                writer.close()
+
+
+# ---------------------------------------------------------
+# REPORT
+# ---------------------------------------------------------
+def report_blocks(kind: str, data: dict, category: str = None):
+    """(style, text) blocks of a readable report; style is "h1", "h2" or "p"."""
+    data = data or {}
+    if kind == "market":
+        yield "h1", f"Market Intelligence: {category or data.get('category', '')}"
+        yield "p", data.get("marketOverview", "")
+        yield "h2", "Top Suppliers"
+        for s in data.get("topSuppliers", []) or []:
+            yield "p", (f"{s.get('rank', '')}. {s.get('name', '')} ({s.get('headquarters', '')}), "
+                        f"market share {s.get('marketShare', '')}. {s.get('differentiators', '')}")
+        yield "h2", "Country Risks"
+        for r in data.get("countryRisks", []) or []:
+            scores = ", ".join(
+                f"{label} {(r.get(key) or {}).get('score', '-')}"
+                for key, label in (("politicalRisk", "political"), ("logisticsRisk", "logistics"),
+                                   ("complianceRisk", "compliance"), ("esgRisk", "ESG"))
+            )
+            yield "p", (f"{r.get('country', '')}: {r.get('overallRiskLevel', '')} overall ({scores}). "
+                        f"Mitigation: {r.get('mitigation', '')}")
+    elif kind in ("contract", "contract_item"):
+        yield "h1", "Contract Recommendations"
+        for item in data.get("items", []) or []:
+            yield "h2", item.get("name", "")
+            yield "p", (f"Recommended: {item.get('recommendedContract', '')}; "
+                        f"alternative: {item.get('alternativeContract', '')}.")
+            yield "p", item.get("finalDecision", "")
+    elif kind.startswith("score_"):
+        yield "h1", f"{data.get('evaluationTitle') or kind.replace('_', ' ').title()}: " \
+                    f"{category or data.get('category', '')}"
+        dims = ", ".join(f"{d.get('name')} {d.get('weight')}%" for d in data.get("dimensions", []) or [])
+        yield "p", f"Dimensions: {dims}"
+        yield "h2", "Supplier Scores"
+        for s in sorted(data.get("supplierScores", []) or [],
+                        key=lambda s: _num(s.get("weightedTotal")) or 0, reverse=True):
+            yield "p", f"{s.get('supplierName', '')}: {s.get('weightedTotal', '')} ({s.get('rating', '')})"
+        for d in data.get("dimensions", []) or []:
+            if d.get("kpis"):
+                yield "h2", f"KPIs: {d.get('name', '')}"
+                for kpi in _kpis(d):
+                    description = kpi.get("description", "")
+                    yield "p", f"{kpi.get('name', '')}: {description}" if description else kpi.get("name", "")
+        if data.get("conclusion"):
+            yield "h2", "Conclusion"
+            yield "p", data["conclusion"]
+
+
+_PAGE_W, _PAGE_H, _MARGIN = 595, 842, 50  # A4, points
+_STYLES = {"h1": ("F2", 15, 60), "h2": ("F2", 12, 80), "p": ("F1", 9.5, 105)}  # font, size, wrap
+
+
+def _pdf_text(text: str) -> str:
+    text = text.encode("cp1252", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def iter_pdf(blocks, title: str = "Procurement report"):
+    """
+    Stream a text PDF of `blocks` ((style, text) pairs). Pages are emitted
+    as soon as they are full; only the byte offsets are kept for the xref.
+    Text outside Windows-1252 is replaced with "?".
+    """
+    offsets = []
+    position = 0
+
+    def obj(number, body: bytes) -> bytes:
+        nonlocal position
+        offsets.append((number, position))
+        chunk = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        position += len(chunk)
+        return chunk
+
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    position = len(header)
+    yield header
+    # 1 catalog, 2 pages (written last), 3-4 fonts, then page/content pairs
+    yield obj(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    yield obj(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold "
+                 b"/Encoding /WinAnsiEncoding >>")
+
+    pages = []
+    next_number = 5
+
+    def page(lines) -> bytes:
+        nonlocal next_number
+        content = "BT\n" + "\n".join(lines) + "\nET"
+        stream = content.encode("latin-1")
+        page_no, content_no = next_number, next_number + 1
+        next_number += 2
+        pages.append(page_no)
+        return (
+            obj(content_no, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+            + obj(page_no, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_PAGE_W} {_PAGE_H}] "
+                            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> "
+                            f"/Contents {content_no} 0 R >>").encode())
+        )
+
+    lines, y = [], _PAGE_H - _MARGIN
+    for style, text in itertools.chain([("h1", title)], blocks):
+        font, size, width = _STYLES[style]
+        wrapped = textwrap.wrap(str(text or ""), width) or [""]
+        y -= size * (0.8 if style != "p" else 0.3)  # space before the block
+        for line in wrapped:
+            if y - size < _MARGIN:
+                yield page(lines)
+                lines, y = [], _PAGE_H - _MARGIN
+            y -= size * 1.3
+            lines.append(f"/{font} {size} Tf 1 0 0 1 {_MARGIN} {y:.1f} Tm ({_pdf_text(line)}) Tj")
+    yield page(lines)
+
+    kids = " ".join(f"{n} 0 R" for n in pages)
+    yield obj(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    yield obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    xref_at = position
+    entries = dict(offsets)
+    xref = [f"xref\n0 {len(entries) + 1}\n", "0000000000 65535 f \n"]
+    xref += [f"{entries[n]:010d} 00000 n \n" for n in range(1, len(entries) + 1)]
+    yield "".join(xref).encode()
+    yield f"trailer\n<< /Size {len(entries) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n".encode()
+
+
+def write_pdf(reports, fileobj, title: str = "Procurement report"):
+    """`reports` is an iterable of `(kind, data, category)`."""
+    blocks = (block for kind, data, category in reports
+              for block in report_blocks(kind, data, category))
+    for chunk in iter_pdf(blocks, title):
+        fileobj.write(chunk)
+
+
+def write_export(fmt: str, tables: list, reports, fileobj, title: str = "Procurement report"):
+    """Write one of `FORMATS` to `fileobj`; `reports` is only used for the PDF."""
+    if fmt == "CSV (zip)":
+        write_csv_zip(tables, fileobj)
+    elif fmt == "Excel":
+        write_xlsx(tables, fileobj)
+    elif fmt == "Parquet (zip)":
+        write_parquet_zip(tables, fileobj)
+    elif fmt == "PDF report":
+        write_pdf(reports, fileobj, title)
+    else:
+        raise ValueError(f"unknown export format {fmt!r}")
+
+
+def _prune(directory: str):
+    cutoff = time.time() - KEEP_SECONDS
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def export_to_file(fmt: str, tables: list, reports, stem: str,
+                   title: str = "Procurement report", directory: str = EXPORT_DIR) -> str:
+    """Write an export to `<directory>/<stem>.<ext>` and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    _prune(directory)
+    extension = FORMATS[fmt][0]
+    path = os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9_.-]+', '-', stem)}.{extension}")
+    partial = os.path.join(directory, f".{os.path.basename(path)}.part")
+    try:
+        with open(partial, "wb") as f:
+            write_export(fmt, tables, reports, f, title)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return path
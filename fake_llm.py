@@ -0,0 +1,310 @@
+"""
+In-process stand-in for the OpenAI client, for offline runs and benchmarks.
+
+Enable it with `LLM_BACKEND=fake`; `llm.make_client` / `llm.make_async_client`
+then return these classes instead of the real SDK clients. Responses are
+realistic, schema-valid payloads for each of the dashboard's prompts,
+generated deterministically from the prompt text. Latency, jitter, output
+speed and failure rate are configurable through environment variables:
+
+    FAKE_LLM_LATENCY_MS         base time to first token   (default 800)
+    FAKE_LLM_JITTER_MS          +/- uniform jitter          (default 200)
+    FAKE_LLM_TOKENS_PER_SECOND  streaming speed             (default 250)
+    FAKE_LLM_FAILURE_RATE       fraction of calls raising   (default 0)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from prompts import CONTRACT_TYPES, INITIAL_WEIGHTS, REFINED_WEIGHTS
+
+
+class FakeLLMError(RuntimeError):
+    """Raised for simulated upstream failures."""
+
+    status_code = 500
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = float(os.environ.get("FAKE_LLM_LATENCY_MS", 800))
+    jitter_ms: float = float(os.environ.get("FAKE_LLM_JITTER_MS", 200))
+    tokens_per_second: float = float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", 250))
+    failure_rate: float = float(os.environ.get("FAKE_LLM_FAILURE_RATE", 0))
+    requests: int = field(default=0)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+
+# Shared by every fake client in the process so benchmarks can read it
+CONFIG = FakeLLMConfig()
+
+
+# ---------------------------------------------------------
+# PAYLOADS
+# ---------------------------------------------------------
+_COMPANIES = [
+    "Intel", "AMD", "TSMC", "Samsung Electronics", "Micron", "SK hynix", "Foxconn",
+    "Quanta Computer", "Compal", "Wistron", "Delta Electronics", "Lite-On",
+    "Broadcom", "Cisco", "Juniper Networks", "Western Digital", "Seagate", "Kioxia",
+    "Amphenol", "TE Connectivity", "Smurfit Westrock", "DHL", "Kuehne+Nagel", "Accenture",
+]
+_COUNTRIES = [
+    ("Taiwan", "Hsinchu"), ("China", "Shenzhen"), ("South Korea", "Seoul"),
+    ("United States", "Santa Clara"), ("Japan", "Tokyo"), ("Vietnam", "Hanoi"),
+    ("Malaysia", "Penang"), ("Mexico", "Guadalajara"), ("Germany", "Munich"),
+]
+_LEVELS = ["High", "Medium", "Low"]
+
+
+def _rng(prompt: str) -> random.Random:
+    return random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+
+def _sentence(rng: random.Random, subject: str) -> str:
+    verbs = ["drives", "constrains", "shapes", "underpins", "stabilises"]
+    objs = ["supply continuity", "unit cost", "lead times", "quality yields", "ESG exposure"]
+    return f"{subject} {rng.choice(verbs)} {rng.choice(objs)} for Dell's portfolio."
+
+
+def _risk(rng):
+    return {
+        "score": rng.randint(2, 9),
+        "assessment": _sentence(rng, "Regional policy"),
+        "keyFactors": rng.sample(["tariffs", "port congestion", "export controls",
+                                  "labour standards", "energy supply", "currency"], 2),
+    }
+
+
+def market_payload(prompt: str) -> dict:
+    rng = _rng(prompt)
+    m = re.search(r'"category": "([^"]*)"', prompt)
+    category = m.group(1) if m else "Category"
+    suppliers = rng.sample(_COMPANIES, 5)
+    shares = sorted((rng.randint(5, 30) for _ in suppliers), reverse=True)
+    return {
+        "category": category,
+        "marketOverview": f"The {category} market is consolidated among a few global leaders. "
+                          + _sentence(rng, "Capacity concentration in Asia"),
+        "topSuppliers": [
+            {
+                "rank": i + 1,
+                "name": name,
+                "headquarters": ", ".join(reversed(rng.choice(_COUNTRIES))),
+                "marketShare": f"~{share}%",
+                "keyCapabilities": rng.sample(["scale", "R&D", "quality", "logistics",
+                                               "custom design", "cost leadership"], 3),
+                "differentiators": _sentence(rng, name),
+                "dellRelevance": _sentence(rng, "This supplier"),
+            }
+            for i, (name, share) in enumerate(zip(suppliers, shares))
+        ],
+        "countryRisks": [
+            {
+                "country": country,
+                "supplierConcentration": rng.choice(_LEVELS),
+                "politicalRisk": _risk(rng),
+                "logisticsRisk": _risk(rng),
+                "complianceRisk": _risk(rng),
+                "esgRisk": _risk(rng),
+                "overallRiskLevel": rng.choice(_LEVELS),
+                "mitigation": "Dual-source critical parts and hold regional buffer stock.",
+            }
+            for country, _ in rng.sample(_COUNTRIES, rng.randint(3, 4))
+        ],
+    }
+
+
+def _contract_summary(rng) -> dict:
+    return {
+        ctype: {"whenToUse": _sentence(rng, ctype), "keyRisks": _sentence(rng, "Misaligned incentives")}
+        for ctype in CONTRACT_TYPES
+    }
+
+
+def contract_payload(prompt: str) -> dict:
+    rng = _rng(prompt)
+    if "Evaluate the most suitable contract types" not in prompt:
+        return {"contractTypeSummary": _contract_summary(rng)}
+
+    m = re.search(r"procurement items:\n(.*)\.\n", prompt)
+    items = [i.strip() for i in (m.group(1) if m else "Item").split(", ")]
+    out = {"analysisDate": date.today().isoformat(), "items": []}
+    for item in items:
+        compared = rng.sample(CONTRACT_TYPES, 3)
+        out["items"].append({
+            "name": item,
+            "assessment": {
+                "costPredictability": {"level": rng.choice(_LEVELS), "explanation": _sentence(rng, "Pricing")},
+                "marketVolatility": {"level": rng.choice(_LEVELS), "explanation": _sentence(rng, "Demand")},
+                "durationAndVolume": {"profile": "Long term; High volume",
+                                      "explanation": _sentence(rng, "Volume")},
+            },
+            "contractComparison": [
+                {"type": c, "suitability": rng.choice(_LEVELS),
+                 "pros": ["aligns incentives", "predictable cost"], "cons": ["admin overhead"]}
+                for c in compared
+            ],
+            "recommendedContract": compared[0],
+            "alternativeContract": compared[1],
+            "finalDecision": _sentence(rng, compared[0]),
+        })
+    if "contractTypeSummary" in prompt:
+        out["contractTypeSummary"] = _contract_summary(rng)
+    return out
+
+
+def _kpis(rng, dim):
+    return [
+        {"name": f"{dim} KPI {k + 1}", "description": _sentence(rng, "This KPI"),
+         "importance": _sentence(rng, "Tracking it")}
+        for k in range(rng.randint(2, 3))
+    ]
+
+
+def _refined_dimensions(rng) -> list:
+    return [{"name": d, "weight": w, "kpis": _kpis(rng, d)} for d, w in REFINED_WEIGHTS.items()]
+
+
+def scorecard_payload(prompt: str) -> dict:
+    rng = _rng(prompt)
+    if prompt.lstrip().startswith("You are refining"):
+        return {"dimensions": _refined_dimensions(rng)}
+
+    if prompt.lstrip().startswith("Refine a supplier"):
+        names = re.findall(r"^([^\n:]+): Technical Capability", prompt, flags=re.M) or ["Supplier"]
+        return {
+            "dimensions": _refined_dimensions(rng),
+            "supplierScores": [
+                {"supplierName": name, "scores": {d: rng.randint(4, 10) for d in INITIAL_WEIGHTS}}
+                for name in names
+            ],
+        }
+
+    m = re.search(r"Suppliers: (.*)\n", prompt)
+    names = m.group(1).split(", ") if m else ["Supplier"]
+    cm = re.search(r"Category: (.*)\n", prompt)
+
+    rows = []
+    for name in names:
+        scores = {d: rng.randint(4, 10) for d in INITIAL_WEIGHTS}
+        total = round(sum(scores[d] * w for d, w in INITIAL_WEIGHTS.items()) / sum(INITIAL_WEIGHTS.values()), 2)
+        rows.append({
+            "supplierName": name, "scores": scores, "weightedTotal": total,
+            "rating": "Excellent" if total >= 8.5 else "Good" if total >= 7 else "Average" if total >= 5.5 else "Poor",
+            "strengths": ["scale", "quality"], "weaknesses": ["cost"],
+        })
+    best = max(rows, key=lambda r: r["weightedTotal"])
+    return {
+        "evaluationTitle": "Initial Scorecard",
+        "category": cm.group(1) if cm else "Category",
+        "evaluationDate": date.today().isoformat(),
+        "dimensions": [
+            {"name": d, "weight": w, "description": _sentence(rng, d)}
+            for d, w in INITIAL_WEIGHTS.items()
+        ],
+        "supplierScores": rows,
+        "bestSupplier": {"name": best["supplierName"], "score": best["weightedTotal"],
+                         "reasoning": _sentence(rng, best["supplierName"])},
+        "conclusion": _sentence(rng, "The scorecard"),
+    }
+
+
+def payload_for(prompt: str) -> dict:
+    m = re.search(r"containing just these top-level keys: (.*)\.\s*$", prompt)
+    if "topSuppliers" in prompt:
+        payload = market_payload(prompt)
+    elif "supply-chain contract expert" in prompt:
+        payload = contract_payload(prompt)
+    else:
+        payload = scorecard_payload(prompt)
+    if m:  # follow-up for missing sub-trees
+        keys = m.group(1).split(", ")
+        payload = {k: v for k, v in payload.items() if k in keys}
+    return payload
+
+
+# ---------------------------------------------------------
+# CLIENTS
+# ---------------------------------------------------------
+@dataclass
+class _Response:
+    output_text: str
+
+
+@dataclass
+class _Event:
+    type: str
+    delta: str = ""
+
+
+def _plan(prompt: str, config: FakeLLMConfig):
+    """(delay before first token, text, seconds per chunk) for one call."""
+    config.count()
+    if config.failure_rate and random.random() < config.failure_rate:
+        raise FakeLLMError("simulated upstream failure (HTTP 500)")
+    text = json.dumps(payload_for(prompt), indent=2)
+    delay = max(0.0, (config.latency_ms + random.uniform(-1, 1) * config.jitter_ms) / 1000)
+    # ~4 characters per token, streamed in 16-character chunks
+    per_chunk = 4 / config.tokens_per_second if config.tokens_per_second else 0.0
+    return delay, text, per_chunk
+
+
+def _chunks(text: str, size: int = 16):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class _FakeResponses:
+    def __init__(self, config):
+        self.config = config
+
+    def create(self, model=None, input="", max_output_tokens=None, stream=False, **kwargs):
+        delay, text, per_chunk = _plan(input, self.config)
+        time.sleep(delay)
+        if not stream:
+            time.sleep(per_chunk * len(text) / 16)
+            return _Response(text)
+
+        def events():
+            for chunk in _chunks(text):
+                time.sleep(per_chunk)
+                yield _Event("response.output_text.delta", chunk)
+            yield _Event("response.completed")
+        return events()
+
+
+class _FakeAsyncResponses:
+    def __init__(self, config):
+        self.config = config
+
+    async def create(self, model=None, input="", max_output_tokens=None, **kwargs):
+        delay, text, per_chunk = _plan(input, self.config)
+        await asyncio.sleep(delay + per_chunk * len(text) / 16)
+        return _Response(text)
+
+
+class FakeOpenAI:
+    def __init__(self, api_key=None, config: FakeLLMConfig = None, **kwargs):
+        self.responses = _FakeResponses(config or CONFIG)
+
+
+class FakeAsyncOpenAI:
+    def __init__(self, api_key=None, config: FakeLLMConfig = None, **kwargs):
+        self.responses = _FakeAsyncResponses(config or CONFIG)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
@@ -0,0 +1,148 @@
+"""
+Process-wide queue for long analyses that must outlive a script run.
+
+A Streamlit rerun (any widget change) stops the running script, and with it
+any LLM call made inline. Work submitted here runs on a worker pool owned by
+the server process instead; the script only submits, then polls.
+
+- Jobs are keyed by analysis (`kind` + `key`, e.g. the Task 2 prompt
+  parameters). Submitting a key that is already queued or running returns
+  the existing job, so a double click or a second tab does not start a
+  duplicate generation.
+- Each job remembers the sessions that asked for it; a session lists its own
+  jobs with `for_session` and collects them when they finish.
+- `on_done(result)` runs on the worker as soon as the job succeeds, so the
+  result is written back (e.g. to the analysis store) even if every session
+  that asked for it is gone.
+- Finished jobs are kept for `keep_seconds` so late pollers still find them.
+
+    JOB_WORKERS   concurrent jobs per process (default 4)
+"""
+
+import contextvars
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+KEEP_SECONDS = 3600
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job:
+    def __init__(self, job_id: int, kind: str, key: str, label: str):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.label = label
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.progress = (0, 0)  # (done, total)
+        self.partial = []  # rows produced so far, for live display
+        self.sessions = set()
+        self.collected = set()  # sessions that have taken the result
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    # Called from the job function on the worker thread
+    def report(self, done: int, total: int):
+        self.progress = (done, total)
+
+    def emit(self, row):
+        self.partial.append(row)
+
+
+class JobQueue:
+    def __init__(self, max_workers: int = MAX_WORKERS, keep_seconds: int = KEEP_SECONDS):
+        self.keep_seconds = keep_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}  # id -> Job
+        self._active = {}  # (kind, key) -> Job, while queued or running
+        self.deduplicated = 0
+
+    def submit(self, session: str, kind: str, key: str, fn, label: str = "", on_done=None) -> Job:
+        """
+        Run `fn(job)` on the pool unless the same (kind, key) is already
+        queued or running, and subscribe `session` to the job either way.
+        """
+        with self._lock:
+            self._prune()
+            job = self._active.get((kind, key))
+            if job is not None:
+                self.deduplicated += 1
+            else:
+                job = Job(next(self._ids), kind, key, label or kind)
+                self._jobs[job.id] = job
+                self._active[(kind, key)] = job
+                # In the submitter's context, so LLM usage is attributed to its session
+                self._pool.submit(contextvars.copy_context().run, self._run, job, fn, on_done)
+            job.sessions.add(session)
+            return job
+
+    def _run(self, job: Job, fn, on_done):
+        job.state = RUNNING
+        job.started_at = time.time()
+        try:
+            result = fn(job)
+            if on_done is not None:
+                on_done(result)
+            job.result = result
+            job.state = DONE
+        except Exception as e:
+            job.error = e
+            job.state = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active.pop((job.kind, job.key), None)
+
+    def get(self, job_id: int):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def for_session(self, session: str, kind: str = None, uncollected: bool = True) -> list:
+        """The session's jobs, oldest first; by default only those not yet collected."""
+        with self._lock:
+            return [
+                job for job in self._jobs.values()
+                if session in job.sessions
+                and (kind is None or job.kind == kind)
+                and not (uncollected and session in job.collected)
+            ]
+
+    def collect(self, session: str, job: Job):
+        """Mark a finished job as taken by `session`."""
+        with self._lock:
+            job.collected.add(session)
+
+    def _prune(self):
+        cutoff = time.time() - self.keep_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            states = [j.state for j in self._jobs.values()]
+            return {
+                "queued": states.count(QUEUED),
+                "running": states.count(RUNNING),
+                "finished": states.count(DONE) + states.count(FAILED),
+                "deduplicated": self.deduplicated,
+            }
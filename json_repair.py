@@ -0,0 +1,141 @@
+"""
+Local repair of almost-valid JSON returned by the model.
+
+Handles the failure modes we actually see: markdown fences or prose around
+the object, trailing commas, and output cut off by `max_output_tokens`.
+Truncated output is cut back to the last complete value and the open
+containers are closed; the top-level key that was being written when the
+text stopped is reported so the caller can re-request just that sub-tree.
+"""
+
+import json
+
+_LITERAL_CHARS = set("-+0123456789.eEtrufalsn")
+
+
+def _strip_trailing_commas(text: str) -> str:
+    out = []
+    in_string = False
+    escape = False
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "}]":
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+        out.append(ch)
+    return "".join(out)
+
+
+def _closers(stack: list) -> str:
+    return "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+
+def _scan(text: str):
+    """
+    Walk `text` (which starts at the root "{") and return
+    `(end, last_ok, truncated_key)`:
+
+    - end: index just past the root object if it closes, else None;
+    - last_ok: (index, closers) after the last complete value, used to
+      rebuild a truncated document;
+    - truncated_key: top-level key being written when the text ran out.
+    """
+    stack = []
+    expect_key = False
+    in_string = False
+    escape = False
+    string_is_key = False
+    string_start = 0
+    top_key = None
+    last_ok = None
+    i, n = 0, len(text)
+
+    while i < n:
+        ch = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if string_is_key:
+                    if len(stack) == 1:
+                        try:
+                            top_key = json.loads(text[string_start:i + 1])
+                        except ValueError:
+                            top_key = None
+                else:
+                    last_ok = (i + 1, _closers(stack))
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+            string_start = i
+            string_is_key = bool(stack) and stack[-1] == "{" and expect_key
+        elif ch in "{[":
+            in_array = bool(stack) and stack[-1] == "["
+            stack.append(ch)
+            expect_key = ch == "{"
+            if not in_array:
+                # an empty container is a usable value for an object key, but
+                # a half-written array element is better dropped entirely
+                last_ok = (i + 1, _closers(stack))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            expect_key = False
+            if not stack:
+                return i + 1, last_ok, None
+            last_ok = (i + 1, _closers(stack))
+        elif ch == ",":
+            expect_key = bool(stack) and stack[-1] == "{"
+        elif ch == ":":
+            expect_key = False
+        elif ch in _LITERAL_CHARS:
+            j = i
+            while j < n and text[j] in _LITERAL_CHARS:
+                j += 1
+            if j < n:
+                last_ok = (j, _closers(stack))
+            i = j
+            continue
+        i += 1
+
+    return None, last_ok, top_key if len(stack) > 1 else None
+
+
+def repair_json(raw: str):
+    """
+    Parse `raw`, repairing it if needed. Returns `(data, truncated_key)`;
+    `truncated_key` is None unless the text was cut off inside a top-level
+    value. Raises ValueError if nothing usable can be recovered.
+    """
+    first = raw.find("{")
+    if first == -1:
+        raise ValueError("LLM did not return valid JSON.")
+    text = _strip_trailing_commas(raw[first:])
+
+    end, last_ok, truncated_key = _scan(text)
+    if end is not None:
+        return json.loads(text[:end]), None
+
+    if last_ok is None:
+        raise ValueError("LLM did not return valid JSON.")
+    index, closers = last_ok
+    return json.loads(text[:index] + closers), truncated_key
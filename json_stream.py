@@ -0,0 +1,128 @@
+"""
+Incremental JSON parsing for streamed LLM output.
+
+`JsonStreamParser` is fed text deltas as they arrive and reports pieces of
+the document as soon as they are complete, long before the closing brace of
+the whole response:
+
+- ("item", key, obj) for every element of a watched array
+  (e.g. each entry of "topSuppliers") once its closing brace arrives;
+- ("field", key, value) for every top-level string value
+  (e.g. "marketOverview") once its closing quote arrives.
+
+Anything before the first "{" (such as a markdown fence) is ignored.
+"""
+
+import json
+
+
+class JsonStreamParser:
+    def __init__(self, watch_arrays=()):
+        self.watch_arrays = set(watch_arrays)
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        # stack of [container_type, key_in_parent, element_start]
+        self._stack = []
+        self._pending_key = None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, delta: str) -> list:
+        """Consume a chunk of text and return the events it completed."""
+        self._text += delta
+        events = []
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append(["object", None, None])
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string_end(text, i, events)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                self._on_value_start(i)
+            elif ch == "{" or ch == "[":
+                self._on_value_start(i)
+                kind = "object" if ch == "{" else "array"
+                self._stack.append([kind, self._pending_key, None])
+                self._pending_key = None
+            elif ch == "}" or ch == "]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                self._on_value_end(text, i, events)
+            elif ch == ":":
+                if self._stack and self._stack[-1][0] == "object":
+                    self._pending_key = self._last_string
+            elif ch == ",":
+                self._pending_key = None
+
+        self._pos = len(text)
+        return events
+
+    # -------------------------------------------------------------
+    # internals
+    # -------------------------------------------------------------
+    def _watched_array(self):
+        if len(self._stack) >= 1:
+            kind, key, _ = self._stack[-1]
+            if kind == "array" and key in self.watch_arrays:
+                return self._stack[-1]
+        return None
+
+    def _on_value_start(self, i: int):
+        arr = self._watched_array()
+        if arr is not None and arr[2] is None:
+            arr[2] = i
+
+    def _on_value_end(self, text: str, i: int, events: list):
+        arr = self._watched_array()
+        if arr is None or arr[2] is None:
+            return
+        start, arr[2] = arr[2], None
+        try:
+            events.append(("item", arr[1], json.loads(text[start:i + 1])))
+        except ValueError:
+            pass
+
+    def _on_string_end(self, text: str, i: int, events: list):
+        raw = text[self._string_start:i + 1]
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw[1:-1]
+
+        top = self._stack[-1] if self._stack else None
+        if top is None:
+            return
+
+        if top[0] == "array":
+            self._on_value_end(text, i, events)
+        elif self._pending_key is not None:
+            if len(self._stack) == 1:
+                events.append(("field", self._pending_key, value))
+            self._pending_key = None
+        else:
+            self._last_string = value
@@ -0,0 +1,325 @@
+"""
+LLM call helpers shared by the Streamlit app and the command-line tools.
+
+Nothing in here touches Streamlit, so the same code path is used by the
+dashboard, background jobs and batch scripts. The OpenAI SDK is imported
+when the first client is built, not with this module, to keep the app's
+cold start short.
+"""
+
+import os
+import time
+
+from json_repair import repair_json
+from llm_cache import make_cache_key
+from llm_client import AsyncPooledClient, PooledClient, http_limits, http_timeout
+from prompts import missing_subtree_prompt
+from schemas import response_format, subschema, top_level_keys, validate
+from single_flight import FLIGHTS, CallAbandoned
+from telemetry import RECORDER, estimate_tokens, span, traced
+from usage_ledger import BUDGET, LEDGER
+
+LLM_MODEL = "gpt-4.1-mini"
+DEFAULT_MAX_TOKENS = 3500
+
+# USD per million (input, output) tokens; unknown models count as free
+MODEL_PRICES = {
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+CACHED_INPUT_FACTOR = 0.25  # prompt-cached input tokens are billed at a quarter
+
+# "openai" (default) or "fake" for the offline stand-in in fake_llm.py
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "openai")
+
+
+def _api_key(api_key: str = None) -> str:
+    api_key = api_key or os.environ.get("OPENAI_API_KEY")
+    if not api_key and LLM_BACKEND != "fake":
+        raise RuntimeError("OPENAI_API_KEY is not set.")
+    return api_key
+
+
+def make_client(api_key: str = None) -> PooledClient:
+    """
+    Rate-limited, retrying client with a keep-alive connection pool. Build
+    it once per process (the app caches it with `st.cache_resource`).
+    """
+    if LLM_BACKEND == "fake":
+        from fake_llm import FakeOpenAI
+        return PooledClient(FakeOpenAI())
+    import httpx
+    from openai import OpenAI
+
+    http_client = httpx.Client(limits=http_limits(), timeout=http_timeout())
+    # Retries are handled by PooledClient so they share the process-wide limits
+    return PooledClient(OpenAI(api_key=_api_key(api_key), http_client=http_client,
+                               timeout=http_timeout(), max_retries=0))
+
+
+def make_async_client(api_key: str = None) -> AsyncPooledClient:
+    """Async client bound to the current event loop; shares the process-wide limits."""
+    if LLM_BACKEND == "fake":
+        from fake_llm import FakeAsyncOpenAI
+        return AsyncPooledClient(FakeAsyncOpenAI())
+    import httpx
+    from openai import AsyncOpenAI
+
+    http_client = httpx.AsyncClient(limits=http_limits(), timeout=http_timeout())
+    return AsyncPooledClient(AsyncOpenAI(api_key=_api_key(api_key), http_client=http_client,
+                                         timeout=http_timeout(), max_retries=0))
+
+
+def _variant(text_format) -> str:
+    return text_format["name"] if text_format else ""
+
+
+def _request_kwargs(model: str, prompt: str, max_tokens: int, text_format) -> dict:
+    kwargs = {"model": model, "input": prompt, "max_output_tokens": max_tokens}
+    if text_format:
+        kwargs["text"] = {"format": text_format}
+    return kwargs
+
+
+def request_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    billed_in = input_tokens - cached_tokens + cached_tokens * CACHED_INPUT_FACTOR
+    return (billed_in * price_in + output_tokens * price_out) / 1_000_000
+
+
+def record_usage(attrs: dict, response, text: str, seconds: float, latency: float = None):
+    """
+    Token counts from the API's usage block, estimated when it is missing,
+    and the request's entry in the usage ledger (usage_ledger.py).
+    `seconds` is the generation time; `latency` the whole request, if longer.
+    """
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "input_tokens_details", None)
+    attrs["prompt_tokens"] = getattr(usage, "input_tokens", None) or attrs["prompt_tokens"]
+    attrs["cached_tokens"] = getattr(details, "cached_tokens", None) or 0
+    attrs["output_tokens"] = getattr(usage, "output_tokens", None) or estimate_tokens(text)
+    attrs["tokens_per_second"] = round(attrs["output_tokens"] / seconds, 1) if seconds else 0.0
+    attrs["cost_usd"] = round(
+        request_cost(attrs.get("model"), attrs["prompt_tokens"], attrs["output_tokens"],
+                     attrs["cached_tokens"]), 6
+    )
+    LEDGER.add(attrs.get("model"), attrs.get("format"), attrs["prompt_tokens"],
+               attrs["output_tokens"], attrs["cost_usd"], cached_tokens=attrs["cached_tokens"],
+               latency=round(latency or seconds, 3))
+
+
+def budget_model(cache, model: str, prompt: str, max_tokens: int, text_format) -> str:
+    """
+    The model to request on a cache miss: `model`, or the budget model when
+    the daily budget is nearly used up (see usage_ledger.py). A response
+    already cached for `model` is still served as is.
+    """
+    if not BUDGET.enabled:
+        return model
+    if cache is not None and cache.contains(make_cache_key(model, prompt, max_tokens, _variant(text_format))):
+        return model
+    return BUDGET.model_for(model)
+
+
+def _add_usage(usage: dict, attrs: dict):
+    # Totals over the upstream requests made on behalf of one caller
+    if usage is not None:
+        for key in ("prompt_tokens", "output_tokens", "cost_usd"):
+            usage[key] = usage.get(key, 0) + (attrs.get(key) or 0)
+
+
+def complete(client, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, cache=None,
+             model: str = LLM_MODEL, text_format: dict = None, usage: dict = None) -> str:
+    """
+    One LLM call, served from `cache` when possible. `text_format` is an
+    optional structured-output format from schemas.py. Identical calls that
+    are already in flight in this process are joined rather than repeated.
+    Tokens and cost of an upstream request are added to `usage`, if given,
+    and `usage["model"]` is set to the model actually used (see `budget_model`).
+    """
+    model = budget_model(cache, model, prompt, max_tokens, text_format)
+    if usage is not None:
+        usage["model"] = model
+    key = make_cache_key(model, prompt, max_tokens, _variant(text_format))
+    with span("llm.complete", model=model, format=_variant(text_format) or "text",
+              prompt_tokens=estimate_tokens(prompt)) as attrs:
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                attrs.update(cached=True, output_tokens=estimate_tokens(cached))
+                return cached
+        attrs["cached"] = False
+
+        def fetch():
+            # A leader that finished just before we joined may have cached it;
+            # the lookup above already counted as a miss
+            if cache is not None:
+                cached = cache.get(key, count=False)
+                if cached is not None:
+                    return cached
+            t0 = time.perf_counter()
+            response = client.responses.create(**_request_kwargs(model, prompt, max_tokens, text_format))
+            text = (response.output_text or "").strip()
+            record_usage(attrs, response, text, time.perf_counter() - t0)
+            _add_usage(usage, attrs)
+            attrs["coalesced"] = False
+            if text and cache is not None:
+                cache.set(key, text)
+            return text
+
+        # Checked for this caller before joining, so one session's refusal
+        # is never handed to coalesced callers from other sessions
+        BUDGET.admit()
+        text = FLIGHTS.do(key, fetch)
+        attrs.setdefault("coalesced", True)
+        return text
+
+
+def complete_stream(client, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, cache=None,
+                    model: str = LLM_MODEL, text_format: dict = None, usage: dict = None):
+    """
+    Streaming variant of `complete`: yields output text deltas as the model
+    produces them. Cached responses, and responses to an identical call that
+    was already in flight, are yielded in a single piece.
+    """
+    model = budget_model(cache, model, prompt, max_tokens, text_format)
+    if usage is not None:
+        usage["model"] = model
+    key = make_cache_key(model, prompt, max_tokens, _variant(text_format))
+    # Recorded by hand: a span context must not stay open across yields
+    record = {"name": "llm.stream", "start": time.time(), "model": model,
+              "format": _variant(text_format) or "text", "prompt_tokens": estimate_tokens(prompt)}
+    t0 = time.perf_counter()
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            RECORDER.record(dict(record, duration=time.perf_counter() - t0, cached=True,
+                                 output_tokens=estimate_tokens(cached)))
+            yield cached
+            return
+
+    BUDGET.admit()  # before joining; see `complete`
+    while True:
+        call, leader = FLIGHTS.join(key)
+        if leader:
+            break
+        try:
+            text = call.wait()
+        except CallAbandoned:
+            continue  # the leader's session went away; try to lead
+        RECORDER.record(dict(record, duration=time.perf_counter() - t0, cached=False,
+                             coalesced=True, output_tokens=estimate_tokens(text or "")))
+        if text:
+            yield text
+        return
+
+    try:
+        parts = []
+        first_token = None
+        final = None
+        stream = client.responses.create(
+            **_request_kwargs(model, prompt, max_tokens, text_format), stream=True
+        )
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                if first_token is None:
+                    first_token = time.perf_counter() - t0
+                parts.append(event.delta)
+                yield event.delta
+            elif event.type == "response.completed":
+                final = getattr(event, "response", None)
+
+        text = "".join(parts).strip()
+        duration = time.perf_counter() - t0
+        generating = duration - (first_token or 0.0)
+        record_usage(record, final, text, max(generating, 0.0), latency=duration)
+        record.update(duration=duration, cached=False, coalesced=False,
+                      time_to_first_token=first_token)
+        RECORDER.record(record)
+        _add_usage(usage, record)
+        if text and cache is not None:
+            cache.set(key, text)
+    except Exception as e:
+        FLIGHTS.fail(key, call, e)
+        raise
+    except BaseException:
+        # Closed early (GeneratorExit) or the script run was stopped
+        FLIGHTS.abandon(key, call)
+        raise
+    FLIGHTS.resolve(key, call, text)
+
+
+def forget(cache, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS, model: str = LLM_MODEL,
+           text_format: dict = None):
+    """Drop a cached response, e.g. when it turned out not to be valid JSON."""
+    if cache is not None:
+        cache.delete(make_cache_key(model, prompt, max_tokens, _variant(text_format)))
+
+
+@traced("json.parse")
+def parse_json_from_text(raw: str):
+    return repair_json(raw)[0]
+
+
+def finish_json(client, prompt: str, raw: str, text_format: dict, cache=None,
+                max_tokens: int = DEFAULT_MAX_TOKENS, model: str = LLM_MODEL,
+                usage: dict = None) -> dict:
+    """
+    Turn a raw response into schema-valid JSON without regenerating it:
+
+    1. repair locally (fences, trailing commas, truncation);
+    2. re-request only the top-level keys that are missing, invalid or were
+       cut off, and merge them in;
+    3. raise ValueError if the result still does not match the schema. The
+       cached raw response is dropped in that case so a retry starts fresh.
+    """
+    schema = text_format["schema"]
+    follow_up = partial_format = None
+    try:
+        with span("json.repair", format=text_format["name"], chars=len(raw or "")):
+            data, truncated_key = repair_json(raw)
+        problems = validate(data, schema)
+        if problems and problems[0][0] == "$":
+            raise ValueError(problems[0][1])
+
+        keys = top_level_keys(problems)
+        if truncated_key and truncated_key not in keys:
+            keys.append(truncated_key)
+
+        if keys and client is not None:
+            RECORDER.record({"name": "json.follow_up", "start": time.time(), "duration": 0.0,
+                             "format": text_format["name"], "keys": ",".join(keys)})
+            follow_up = missing_subtree_prompt(prompt, keys)
+            partial_format = response_format(
+                f"{text_format['name']}_partial", subschema(schema, keys)
+            )
+            partial, _ = repair_json(
+                complete(client, follow_up, max_tokens, cache=cache, model=model,
+                         text_format=partial_format, usage=usage)
+            )
+            for key in keys:
+                if key in partial:
+                    data[key] = partial[key]
+            problems = validate(data, schema)
+
+        if problems:
+            path, problem = problems[0]
+            more = f" (+{len(problems) - 1} more)" if len(problems) > 1 else ""
+            raise ValueError(f"{path}: {problem}{more}")
+        return data
+    except ValueError:
+        forget(cache, prompt, max_tokens, model, text_format)
+        if follow_up:
+            forget(cache, follow_up, max_tokens, model, partial_format)
+        raise
+
+
+def complete_json(client, prompt: str, text_format: dict, max_tokens: int = DEFAULT_MAX_TOKENS,
+                  cache=None, model: str = LLM_MODEL, usage: dict = None) -> dict:
+    usage = {} if usage is None else usage
+    raw = complete(client, prompt, max_tokens, cache=cache, model=model, text_format=text_format,
+                   usage=usage)
+    # Repair and eviction must use the model that answered, which may be the budget model
+    return finish_json(client, prompt, raw, text_format, cache=cache, max_tokens=max_tokens,
+                       model=usage.get("model", model), usage=usage)
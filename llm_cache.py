@@ -0,0 +1,254 @@
+"""
+Disk-backed response cache for LLM calls.
+
+Responses are keyed by a SHA-256 hash of (model, prompt, max_tokens) and kept
+in a small SQLite file, so every Streamlit session and every server process on
+the same host shares one cache. Entries expire after a TTL and the least
+recently used ones are evicted once the stored text exceeds a size budget.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+DEFAULT_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", 24 * 3600))
+DEFAULT_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+FLUSH_SECONDS = 5.0   # batched hit/miss counts and access times are written this often
+SWEEP_SECONDS = 60.0  # expired entries are purged this often (or when over budget)
+
+
+def make_cache_key(model: str, prompt: str, max_tokens: int, variant: str = "") -> str:
+    # `variant` distinguishes e.g. structured-output formats; it is left out
+    # of the payload when empty so plain-text keys stay stable.
+    parts = [model, prompt, int(max_tokens)] + ([variant] if variant else [])
+    payload = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed key/value cache with TTL and size-based LRU eviction.
+
+    The database runs in WAL mode so readers in other processes are never
+    blocked by a writer, and a cache hit does not write at all: hit/miss
+    counts (kept for this process and persistently for all processes) and
+    the access times that drive LRU eviction are buffered and written in one
+    transaction at most every `FLUSH_SECONDS`. The total stored size is a
+    running counter, so an insert does not scan the table; expired entries
+    are purged every `SWEEP_SECONDS` or when the budget is exceeded.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {"hits": 0, "misses": 0}
+        self._accessed = {}  # key -> last access time, not yet written
+        self._last_flush = time.monotonic()
+        self._last_sweep = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                value       TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        # Running total of `size`, kept up to date by every write
+        conn.execute(
+            "INSERT OR IGNORE INTO counters(name, value) "
+            "SELECT 'bytes', COALESCE(SUM(size), 0) FROM responses"
+        )
+        atexit.register(self.flush)
+
+    # -------------------------------------------------------------
+    # connection handling (sqlite connections are per-thread)
+    # -------------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _bump(self, conn: sqlite3.Connection, name: str, delta: int = 1):
+        conn.execute(
+            "INSERT INTO counters(name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, delta),
+        )
+
+    @staticmethod
+    @contextmanager
+    def _transaction(conn: sqlite3.Connection):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # -------------------------------------------------------------
+    # public API
+    # -------------------------------------------------------------
+    def get(self, key: str, count: bool = True):
+        """
+        The cached value, or None. Counts as a hit or miss for `stats` unless
+        `count` is false (a re-check of a lookup that was already counted).
+        A read does not write: the counters and the access time used for LRU
+        eviction are written in batches by `flush`.
+        """
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None and now - row[1] > self.ttl_seconds:
+            row = None  # removed by the next sweep (see `_evict`)
+
+        with self._lock:
+            if count:
+                name = "misses" if row is None else "hits"
+                setattr(self, name, getattr(self, name) + 1)
+                self._pending[name] += 1
+            if row is not None:
+                self._accessed[key] = now
+        if time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+            self.flush()
+        return None if row is None else row[0]
+
+    def flush(self):
+        """Write the batched hit/miss counts and access times, in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {"hits": 0, "misses": 0}
+            accessed, self._accessed = self._accessed, {}
+            self._last_flush = time.monotonic()
+        if not accessed and not any(pending.values()):
+            return
+        conn = self._conn()
+        with self._transaction(conn):
+            for name, n in pending.items():
+                if n:
+                    self._bump(conn, name, n)
+            conn.executemany(
+                "UPDATE responses SET last_access = MAX(last_access, ?) WHERE key = ?",
+                [(ts, key) for key, ts in accessed.items()],
+            )
+
+    def contains(self, key: str) -> bool:
+        """Whether a live entry exists; unlike `get` it does not count as a lookup."""
+        row = self._conn().execute(
+            "SELECT created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl_seconds
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        conn = self._conn()
+        with self._transaction(conn):
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses(key, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._bump(conn, "bytes", size - (old[0] if old else 0))
+            total = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+        if total > self.max_bytes or time.monotonic() - self._last_sweep >= SWEEP_SECONDS:
+            self._evict()
+
+    def delete(self, key: str):
+        conn = self._conn()
+        with self._transaction(conn):
+            row = conn.execute("DELETE FROM responses WHERE key = ? RETURNING size", (key,)).fetchone()
+            if row:
+                self._bump(conn, "bytes", -row[0])
+
+    def clear(self):
+        conn = self._conn()
+        with self._transaction(conn):
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM counters")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self._pending = {"hits": 0, "misses": 0}
+            self._accessed = {}
+
+    def _evict(self):
+        """Drop expired entries, then least-recently-used ones while over the size budget."""
+        self.flush()  # LRU order needs the batched access times
+        self._last_sweep = time.monotonic()
+        conn = self._conn()
+        with self._transaction(conn):
+            freed = sum(size for size, in conn.execute(
+                "DELETE FROM responses WHERE created_at < ? RETURNING size",
+                (time.time() - self.ttl_seconds,),
+            ).fetchall())
+            total = conn.execute(
+                "SELECT value FROM counters WHERE name = 'bytes'"
+            ).fetchone()[0] - freed
+            victims = []
+            if total > self.max_bytes:
+                for key, size in conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access ASC"
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                    freed += size
+                conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+            if freed:
+                self._bump(conn, "bytes", -freed)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        shared = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        with self._lock:  # plus this process's counts not flushed yet
+            hits_all = shared.get("hits", 0) + self._pending["hits"]
+            misses_all = shared.get("misses", 0) + self._pending["misses"]
+        lookups = hits_all + misses_all
+        return {
+            "entries": entries,
+            "bytes": shared.get("bytes", 0),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hits_all_processes": hits_all,
+            "misses_all_processes": misses_all,
+            "hit_rate": (hits_all / lookups) if lookups else 0.0,
+        }
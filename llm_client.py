@@ -0,0 +1,246 @@
+"""
+Rate-limited, retrying wrappers around the OpenAI clients.
+
+All LLM traffic in a process goes through one `RequestLimiter`: a token
+bucket caps the request rate and a semaphore caps the number of requests in
+flight, across every Streamlit session, background job and worker thread.
+Calls that fail with 429, 5xx, a timeout or a connection error are retried
+with jittered exponential backoff. The wrappers expose the same
+`client.responses.create(...)` surface as the SDK, so the helpers in llm.py
+work with either.
+
+Tuning (environment variables):
+
+    LLM_RATE_PER_SECOND   sustained request rate            (default 5)
+    LLM_BURST             token bucket size                 (default 10)
+    LLM_MAX_IN_FLIGHT     concurrent requests per process   (default 16)
+    LLM_TIMEOUT_SECONDS   per-request timeout               (default 90)
+    LLM_MAX_RETRIES       retries after the first attempt   (default 4)
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+from telemetry import span
+
+RATE_PER_SECOND = float(os.environ.get("LLM_RATE_PER_SECOND", 5))
+BURST = int(os.environ.get("LLM_BURST", 10))
+MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", 16))
+TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 90))
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 4))
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+
+
+# ---------------------------------------------------------
+# LIMITS
+# ---------------------------------------------------------
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity`."""
+
+    def __init__(self, rate: float = RATE_PER_SECOND, capacity: int = BURST):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0 or self.rate <= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RequestLimiter:
+    """Token bucket plus a global in-flight cap, shared by sync and async callers."""
+
+    def __init__(self, rate: float = RATE_PER_SECOND, burst: int = BURST,
+                 max_in_flight: int = MAX_IN_FLIGHT):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+    def _enter(self, waited: float):
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.throttled_seconds += waited
+
+    def acquire(self):
+        t0 = time.monotonic()
+        self._slots.acquire()
+        time.sleep(self.bucket.reserve())
+        self._enter(time.monotonic() - t0)
+
+    async def acquire_async(self):
+        t0 = time.monotonic()
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(self.bucket.reserve())
+        self._enter(time.monotonic() - t0)
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def count_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+            }
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter() -> RequestLimiter:
+    """The process-wide limiter used by every client wrapper by default."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RequestLimiter()
+        return _shared_limiter
+
+
+# ---------------------------------------------------------
+# RETRIES
+# ---------------------------------------------------------
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    try:
+        import openai
+    except ImportError:  # pragma: no cover - fake backend without the SDK
+        return False
+    return isinstance(error, (openai.APITimeoutError, openai.APIConnectionError))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+# ---------------------------------------------------------
+# CLIENTS
+# ---------------------------------------------------------
+class _Responses:
+    def __init__(self, inner, limiter: RequestLimiter, max_retries: int):
+        self._inner = inner
+        self._limiter = limiter
+        self._max_retries = max_retries
+
+    def create(self, **kwargs):
+        for attempt in range(self._max_retries + 1):
+            with span("llm.queue_wait"):
+                self._limiter.acquire()
+            try:
+                with span("llm.network", attempt=attempt, stream=bool(kwargs.get("stream"))):
+                    result = self._inner.create(**kwargs)
+            except Exception as e:
+                self._limiter.release()
+                if attempt >= self._max_retries or not is_retryable(e):
+                    raise
+                self._limiter.count_retry()
+                time.sleep(backoff_delay(attempt))
+                continue
+            if kwargs.get("stream"):
+                # Keep the slot until the stream has been consumed
+                return self._release_after(result)
+            self._limiter.release()
+            return result
+
+    def _release_after(self, stream):
+        try:
+            yield from stream
+        finally:
+            self._limiter.release()
+
+
+class _AsyncResponses:
+    def __init__(self, inner, limiter: RequestLimiter, max_retries: int):
+        self._inner = inner
+        self._limiter = limiter
+        self._max_retries = max_retries
+
+    async def create(self, **kwargs):
+        for attempt in range(self._max_retries + 1):
+            with span("llm.queue_wait"):
+                await self._limiter.acquire_async()
+            try:
+                with span("llm.network", attempt=attempt, stream=False):
+                    return await self._inner.create(**kwargs)
+            except Exception as e:
+                if attempt >= self._max_retries or not is_retryable(e):
+                    raise
+                self._limiter.count_retry()
+            finally:
+                self._limiter.release()
+            await asyncio.sleep(backoff_delay(attempt))
+
+
+class PooledClient:
+    """Wraps an `OpenAI`-like client; `responses.create` is limited and retried."""
+
+    def __init__(self, inner, limiter: RequestLimiter = None, max_retries: int = MAX_RETRIES):
+        self.inner = inner
+        self.limiter = limiter or shared_limiter()
+        self.responses = _Responses(inner.responses, self.limiter, max_retries)
+
+
+class AsyncPooledClient:
+    """Async counterpart of `PooledClient`; usable as an async context manager."""
+
+    def __init__(self, inner, limiter: RequestLimiter = None, max_retries: int = MAX_RETRIES):
+        self.inner = inner
+        self.limiter = limiter or shared_limiter()
+        self.responses = _AsyncResponses(inner.responses, self.limiter, max_retries)
+
+    async def __aenter__(self):
+        await self.inner.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self.inner.__aexit__(*exc)
+
+
+def http_limits():
+    """Connection pool / keep-alive settings for the SDK's httpx client."""
+    import httpx
+
+    return httpx.Limits(
+        max_connections=MAX_IN_FLIGHT,
+        max_keepalive_connections=MAX_IN_FLIGHT,
+        keepalive_expiry=60.0,
+    )
+
+
+def http_timeout():
+    import httpx
+
+    return httpx.Timeout(TIMEOUT_SECONDS, connect=10.0)
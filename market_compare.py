@@ -0,0 +1,190 @@
+"""
+Side-by-side Task 1 market intelligence for several categories.
+
+The categories are generated concurrently (fresh entries come straight from
+the `MarketIntelStore`; the rest go through `generate_market_intelligence`
+on a bounded thread pool, like the warm-up job) and the results are
+flattened into two normalised tables:
+
+    suppliers   Category, Rank, Supplier, Headquarters, Market Share, Share (%)
+    risks       Category, Country, Political, Logistics, Compliance, ESG,
+                Mean Risk, Overall Level
+
+Heatmaps and cross-category aggregates are plain pandas pivots / group-bys
+over those tables.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from llm import LLM_MODEL
+from market_warmup import generate_market_intelligence
+
+DEFAULT_MAX_WORKERS = 4
+
+RISK_DIMENSIONS = {
+    "politicalRisk": "Political",
+    "logisticsRisk": "Logistics",
+    "complianceRisk": "Compliance",
+    "esgRisk": "ESG",
+}
+LEVEL_ORDER = ["Low", "Medium", "High"]
+
+# (upper bound of the score band, cell style) for the 1–10 risk heatmaps
+RISK_BANDS = [
+    (4.0, "background-color:#dcfce7;color:#166534"),
+    (6.5, "background-color:#fef9c3;color:#854d0e"),
+    (np.inf, "background-color:#fee2e2;color:#991b1b"),
+]
+
+
+def generate_categories(categories, client, store, cache=None,
+                        max_workers: int = DEFAULT_MAX_WORKERS, force: bool = False,
+                        on_progress=None):
+    """
+    Market intelligence for every category in `categories`.
+
+    Fresh store entries are reused unless `force` is set; the others are
+    generated in parallel and written back to the store.
+    `on_progress(done, total)` is called as each category finishes.
+
+    Returns `(results, failures)`: `results` maps category -> store-style
+    entry (`data`, `generated_at`, `stale`) in the order given, `failures`
+    is a list of `(category, error)` tuples.
+    """
+    categories = list(dict.fromkeys(categories))
+    found = {}
+    if not force:
+        for category in categories:
+            entry = store.get(category)
+            if entry and not entry["stale"]:
+                found[category] = entry
+    todo = [c for c in categories if c not in found]
+    failures = []
+    total = len(categories)
+    done = len(found)
+    if on_progress is not None and done:
+        on_progress(done, total)
+
+    def generate(category):
+        usage = {}
+        data = generate_market_intelligence(category, client, cache, usage=usage)
+        return data, usage.get("model", LLM_MODEL)
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo)))) as pool:
+            futures = {
+                pool.submit(contextvars.copy_context().run, generate, category): category
+                for category in todo
+            }
+            for future in as_completed(futures):
+                category = futures[future]
+                try:
+                    data, model = future.result()
+                    store.put(category, data, model=model)
+                    found[category] = store.get(category)
+                except Exception as e:
+                    failures.append((category, e))
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, total)
+
+    results = {c: found[c] for c in categories if c in found}
+    return results, failures
+
+
+# ---------------------------------------------------------
+# NORMALISED TABLES
+# ---------------------------------------------------------
+def suppliers_frame(market_by_category: dict) -> pd.DataFrame:
+    """One row per (category, supplier); `market_by_category` maps category -> market data."""
+    rows = [
+        {
+            "Category": category,
+            "Rank": s.get("rank"),
+            "Supplier": s.get("name", ""),
+            "Headquarters": s.get("headquarters", ""),
+            "Market Share": s.get("marketShare", ""),
+        }
+        for category, data in market_by_category.items()
+        for s in data.get("topSuppliers", []) or []
+    ]
+    frame = pd.DataFrame(rows, columns=["Category", "Rank", "Supplier", "Headquarters", "Market Share"])
+    frame["Rank"] = pd.to_numeric(frame["Rank"], errors="coerce").astype("Int64")
+    # "~25%", "20-25 %" -> first number
+    frame["Share (%)"] = pd.to_numeric(
+        frame["Market Share"].astype(str).str.extract(r"(\d+(?:\.\d+)?)", expand=False),
+        errors="coerce",
+    )
+    return frame
+
+
+def risks_frame(market_by_category: dict) -> pd.DataFrame:
+    """One row per (category, country) with the four risk scores and their mean."""
+    dims = list(RISK_DIMENSIONS.values())
+    rows = []
+    for category, data in market_by_category.items():
+        for r in data.get("countryRisks", []) or []:
+            row = {"Category": category, "Country": r.get("country", "")}
+            for key, label in RISK_DIMENSIONS.items():
+                risk = r.get(key)
+                row[label] = risk.get("score") if isinstance(risk, dict) else None
+            row["Overall Level"] = r.get("overallRiskLevel", "")
+            rows.append(row)
+    frame = pd.DataFrame(rows, columns=["Category", "Country", *dims, "Overall Level"])
+    frame[dims] = frame[dims].apply(pd.to_numeric, errors="coerce").astype(float)
+    frame.insert(len(dims) + 2, "Mean Risk", frame[dims].mean(axis=1).round(2))
+    frame["Overall Level"] = pd.Categorical(
+        frame["Overall Level"].astype(str).str.strip().str.capitalize(),
+        categories=LEVEL_ORDER, ordered=True,
+    )
+    return frame
+
+
+# ---------------------------------------------------------
+# AGGREGATES
+# ---------------------------------------------------------
+def country_heatmap(risks: pd.DataFrame, value: str = "Mean Risk") -> pd.DataFrame:
+    """Country × category matrix of `value`, riskiest countries first."""
+    heat = risks.pivot_table(index="Country", columns="Category", values=value, aggfunc="mean")
+    order = heat.mean(axis=1).sort_values(ascending=False).index
+    return heat.loc[order].round(1)
+
+
+def dimension_heatmap(risks: pd.DataFrame) -> pd.DataFrame:
+    """Category × risk dimension matrix of mean scores across the category's countries."""
+    dims = list(RISK_DIMENSIONS.values())
+    return risks.groupby("Category", sort=False)[dims + ["Mean Risk"]].mean().round(1)
+
+
+def level_counts(risks: pd.DataFrame) -> pd.DataFrame:
+    """Number of countries per overall risk level, per category."""
+    return pd.crosstab(risks["Category"], risks["Overall Level"]).reindex(
+        columns=LEVEL_ORDER, fill_value=0
+    )
+
+
+def shared_suppliers(suppliers: pd.DataFrame) -> pd.DataFrame:
+    """Suppliers that appear in more than one category, with their share per category."""
+    key = suppliers["Supplier"].str.casefold().str.replace(r"[^a-z0-9]+", "", regex=True)
+    keyed = suppliers.assign(_key=key)
+    shared = keyed[keyed.groupby("_key")["Category"].transform("nunique") > 1]
+    if shared.empty:
+        return pd.DataFrame(columns=["Supplier", "Categories"])
+    table = shared.pivot_table(index="_key", columns="Category", values="Share (%)", aggfunc="first")
+    names = shared.groupby("_key")["Supplier"].first()
+    table.insert(0, "Categories", shared.groupby("_key")["Category"].nunique())
+    table.insert(0, "Supplier", names)
+    return table.sort_values("Categories", ascending=False).reset_index(drop=True)
+
+
+def risk_styles(frame: pd.DataFrame) -> pd.DataFrame:
+    """CSS per cell for a numeric risk matrix (use with `Styler.apply(..., axis=None)`)."""
+    values = frame.to_numpy(dtype=float)
+    bounds = np.array([b for b, _ in RISK_BANDS])
+    styles = np.array([s for _, s in RISK_BANDS] + [""], dtype=object)
+    band = np.where(np.isnan(values), len(RISK_BANDS), np.searchsorted(bounds, values))
+    return pd.DataFrame(styles[band], index=frame.index, columns=frame.columns)
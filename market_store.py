@@ -0,0 +1,101 @@
+"""
+Local store of precomputed Task 1 market intelligence, one row per category.
+
+Written by the warm-up job (`market_warmup.py`) and read by the Task 1 tab,
+so a category that has been warmed is shown without any LLM call. Every row
+carries the time it was generated, which is used to decide staleness.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STORE_PATH = os.environ.get("MARKET_STORE_PATH", ".cache/market_intel.sqlite3")
+DEFAULT_MAX_AGE_SECONDS = int(os.environ.get("MARKET_MAX_AGE_SECONDS", 24 * 3600))
+
+
+class MarketIntelStore:
+    def __init__(self, path: str = DEFAULT_STORE_PATH, max_age_seconds: int = DEFAULT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS market_intel (
+                category     TEXT PRIMARY KEY,
+                data         TEXT NOT NULL,
+                model        TEXT,
+                generated_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _entry(self, category: str, data: str, model: str, generated_at: float) -> dict:
+        age = time.time() - generated_at
+        return {
+            "category": category,
+            "data": json.loads(data),
+            "model": model,
+            "generated_at": generated_at,
+            "age_seconds": age,
+            "stale": age > self.max_age_seconds,
+        }
+
+    def get(self, category: str):
+        row = self._conn().execute(
+            "SELECT category, data, model, generated_at FROM market_intel WHERE category = ?",
+            (category,),
+        ).fetchone()
+        return self._entry(*row) if row else None
+
+    def put(self, category: str, data: dict, model: str = None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO market_intel(category, data, model, generated_at) "
+            "VALUES (?, ?, ?, ?)",
+            (category, json.dumps(data, separators=(",", ":")), model, time.time()),
+        )
+
+    def categories(self) -> list:
+        return [r[0] for r in self._conn().execute("SELECT category FROM market_intel")]
+
+    def needs_refresh(self, categories) -> list:
+        """Categories from `categories` that are missing or stale."""
+        cutoff = time.time() - self.max_age_seconds
+        fresh = {
+            r[0]
+            for r in self._conn().execute(
+                "SELECT category FROM market_intel WHERE generated_at >= ?", (cutoff,)
+            )
+        }
+        return [c for c in categories if c not in fresh]
+
+    def summary(self) -> list:
+        now = time.time()
+        return [
+            {
+                "category": category,
+                "model": model,
+                "generated_at": generated_at,
+                "age_seconds": now - generated_at,
+                "stale": now - generated_at > self.max_age_seconds,
+            }
+            for category, model, generated_at in self._conn().execute(
+                "SELECT category, model, generated_at FROM market_intel ORDER BY category"
+            )
+        ]
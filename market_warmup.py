@@ -0,0 +1,196 @@
+"""
+Batch warm-up of Task 1 market intelligence.
+
+Generates the market-intelligence JSON for every procurement category ahead
+of time, validates it and writes it to the `MarketIntelStore` that the Task 1
+tab reads. Run it once (e.g. from cron before office hours) or keep it
+running on an interval:
+
+    python market_warmup.py                       # warm missing / stale categories
+    python market_warmup.py --force --workers 8   # regenerate everything
+    python market_warmup.py --every-minutes 60    # keep refreshing
+
+The API key is read from the OPENAI_API_KEY environment variable.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from catalog import task1_categories
+from llm import LLM_MODEL, make_client
+from llm_cache import ResponseCache
+from market_store import MarketIntelStore
+from model_router import complete_json_routed, forget_all
+from prompts import market_intelligence_prompt
+from schemas import MARKET_FORMAT
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def validate_market_data(data: dict) -> dict:
+    if not isinstance(data, dict):
+        raise ValueError("market intelligence must be a JSON object")
+    if not isinstance(data.get("marketOverview"), str) or not data["marketOverview"].strip():
+        raise ValueError("missing marketOverview")
+    for key in ("topSuppliers", "countryRisks"):
+        rows = data.get(key)
+        if not isinstance(rows, list) or not rows or not all(isinstance(r, dict) for r in rows):
+            raise ValueError(f"missing or empty {key}")
+    return data
+
+
+def generate_market_intelligence(category: str, client, cache=None, attempts: int = 2,
+                                 usage: dict = None) -> dict:
+    """
+    Call the model for one category, escalating through the routing tiers
+    (model_router.py); output that fails validation even then is retried.
+    Any cached response is dropped first: the store is the cache for these
+    prompts, and a refresh must produce new content. `usage["model"]` is
+    set to the model that answered, if `usage` is given.
+    """
+    prompt = market_intelligence_prompt(category)
+    error = None
+    for _ in range(attempts):
+        forget_all(cache, prompt, MARKET_FORMAT)
+        try:
+            data = complete_json_routed(client, prompt, MARKET_FORMAT, cache=cache, usage=usage)
+            data = validate_market_data(data)
+            data["category"] = data.get("category") or category
+            return data
+        except ValueError as e:  # json.JSONDecodeError is a ValueError
+            error = e
+    raise ValueError(f"{category}: {error}")
+
+
+def warm_market_intelligence(
+    categories,
+    client,
+    store: MarketIntelStore,
+    cache=None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    force: bool = False,
+    log=print,
+) -> dict:
+    """
+    Generate and store market intelligence for `categories` with at most
+    `max_workers` requests in flight. Fresh entries are skipped unless
+    `force` is set. Returns a summary of refreshed / skipped / failed names.
+    """
+    categories = list(categories)
+    todo = categories if force else store.needs_refresh(categories)
+    summary = {
+        "refreshed": [],
+        "skipped": [c for c in categories if c not in todo],
+        "failed": [],
+    }
+    if not todo:
+        return summary
+
+    def generate(category):
+        usage = {}
+        data = generate_market_intelligence(category, client, cache, usage=usage)
+        return data, usage.get("model", LLM_MODEL)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo)))) as pool:
+        futures = {pool.submit(generate, category): category for category in todo}
+        for future in as_completed(futures):
+            category = futures[future]
+            try:
+                data, model = future.result()
+                store.put(category, data, model=model)
+                summary["refreshed"].append(category)
+                log(f"✓ {category}")
+            except Exception as e:
+                summary["failed"].append(category)
+                log(f"✗ {category}: {e}")
+    return summary
+
+
+class BackgroundRefresher:
+    """
+    Daemon thread that periodically re-generates stale entries. By default it
+    only refreshes categories already in the store, so it keeps warmed data
+    fresh without generating categories nobody has asked for.
+    """
+
+    def __init__(self, client, store, cache=None, interval_seconds: int = 3600,
+                 categories=None, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.client = client
+        self.store = store
+        self.cache = cache
+        self.interval_seconds = interval_seconds
+        self.categories = categories
+        self.max_workers = max_workers
+        self.last_run = None
+        self.last_summary = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def refresh_now(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            categories = self.categories or self.store.categories()
+            try:
+                self.last_summary = warm_market_intelligence(
+                    categories, self.client, self.store, cache=self.cache,
+                    max_workers=self.max_workers, log=lambda msg: None,
+                )
+            except Exception as e:  # keep the thread alive on unexpected errors
+                self.last_summary = {"error": str(e)}
+            self.last_run = time.time()
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Precompute Task 1 market intelligence.")
+    parser.add_argument("--categories", nargs="*", default=None,
+                        help="categories to warm (default: all Task 1 categories)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="maximum concurrent LLM requests")
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate even if the stored result is still fresh")
+    parser.add_argument("--max-age-hours", type=float, default=None,
+                        help="age after which a stored result is considered stale")
+    parser.add_argument("--every-minutes", type=float, default=None,
+                        help="keep running and refresh on this interval")
+    args = parser.parse_args(argv)
+
+    store = MarketIntelStore()
+    if args.max_age_hours is not None:
+        store.max_age_seconds = int(args.max_age_hours * 3600)
+    client = make_client()
+    cache = ResponseCache()
+    categories = args.categories or task1_categories
+
+    while True:
+        t0 = time.time()
+        summary = warm_market_intelligence(
+            categories, client, store, cache=cache, max_workers=args.workers, force=args.force
+        )
+        print(
+            f"refreshed {len(summary['refreshed'])}, skipped {len(summary['skipped'])}, "
+            f"failed {len(summary['failed'])} in {time.time() - t0:.1f}s"
+        )
+        if args.every_minutes is None:
+            return 1 if summary["failed"] else 0
+        args.force = False
+        time.sleep(args.every_minutes * 60)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Per-task model tiers with escalation on validation failure.
+
+Every JSON task used to go to `LLM_MODEL` with the full `DEFAULT_MAX_TOKENS`
+budget, although most of them need far less. Here each response format has
+an ordered list of tiers (model + output budget). A call starts on the
+cheapest tier; only if the output still fails schema validation after local
+repair and the missing-key follow-up (see `llm.finish_json`) does it move on
+to the next tier.
+
+Each attempt is recorded as an "llm.route" span (task, tier, model, ok,
+tokens, cost), which the admin performance tab summarises per tier.
+
+    LLM_ROUTING=off       always use the last tier (the pre-routing behaviour)
+    LLM_SMALL_MODEL       cheapest tier's model       (default gpt-4.1-nano)
+    LLM_LARGE_MODEL       last-resort model           (default gpt-4.1)
+"""
+
+import os
+from dataclasses import dataclass
+
+from llm import DEFAULT_MAX_TOKENS, LLM_MODEL, complete_json, finish_json, forget
+from llm_cache import make_cache_key
+from telemetry import span
+
+ROUTING_ENABLED = os.environ.get("LLM_ROUTING", "on").lower() != "off"
+SMALL_MODEL = os.environ.get("LLM_SMALL_MODEL", "gpt-4.1-nano")
+LARGE_MODEL = os.environ.get("LLM_LARGE_MODEL", "gpt-4.1")
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    model: str
+    max_tokens: int
+
+
+STANDARD = Tier("standard", LLM_MODEL, DEFAULT_MAX_TOKENS)
+
+# response format name -> tiers, cheapest first
+ROUTES = {
+    # ~20 lines of JSON; a tight budget is plenty unless the model rambles
+    "market_intelligence": [
+        Tier("fast", LLM_MODEL, 1800),
+        STANDARD,
+        Tier("large", LARGE_MODEL, DEFAULT_MAX_TOKENS),
+    ],
+    # one item of the Task 2 fan-out
+    "contract_items": [
+        Tier("fast", LLM_MODEL, 1200),
+        STANDARD,
+    ],
+    # static cheat sheet of contract types
+    "contract_type_summary": [
+        Tier("small", SMALL_MODEL, 800),
+        Tier("fast", LLM_MODEL, 1500),
+    ],
+    # the full single-prompt Task 2 matrix
+    "contract_analysis": [
+        STANDARD,
+        Tier("large", LARGE_MODEL, 6000),
+    ],
+}
+
+
+def tiers_for(text_format: dict) -> list:
+    tiers = ROUTES.get(text_format["name"], [STANDARD])
+    return tiers if ROUTING_ENABLED else tiers[-1:]
+
+
+def first_tier(text_format: dict) -> Tier:
+    return tiers_for(text_format)[0]
+
+
+def forget_all(cache, prompt: str, text_format: dict):
+    """Drop the cached response of every tier for this prompt."""
+    for tier in tiers_for(text_format):
+        forget(cache, prompt, tier.max_tokens, tier.model, text_format)
+
+
+def _start_tier(tiers: list, prompt: str, text_format: dict, cache) -> int:
+    # Start where a response is already cached: an escalated prompt goes
+    # straight to the tier that answered it last time.
+    if cache is not None:
+        for i in range(len(tiers) - 1, -1, -1):
+            key = make_cache_key(tiers[i].model, prompt, tiers[i].max_tokens, text_format["name"])
+            if cache.contains(key):
+                return i
+    return 0
+
+
+def complete_json_routed(client, prompt: str, text_format: dict, cache=None, tiers: list = None,
+                         raw: str = None, raw_usage: dict = None, usage: dict = None) -> dict:
+    """
+    Schema-valid JSON for `prompt`, escalating through `tiers` (default:
+    `tiers_for(text_format)`) while validation fails.
+
+    `raw` is an already-streamed response from the first tier; it is
+    repaired and validated instead of being requested again, and
+    `raw_usage` (from `complete_stream(..., usage=...)`) is counted
+    against that tier. `usage["model"]`, if `usage` is given, is set to the
+    model whose output was returned (a tier's, or the budget model).
+
+    Raises the last ValueError if no tier produced valid output. API
+    errors are not escalated; the client has already retried them.
+    """
+    tiers = tiers or tiers_for(text_format)
+    start = 0 if raw is not None else _start_tier(tiers, prompt, text_format, cache)
+    error = None
+    for i in range(start, len(tiers)):
+        tier = tiers[i]
+        with span("llm.route", task=text_format["name"], tier=tier.name, model=tier.model,
+                  max_tokens=tier.max_tokens, escalation=i - start) as attrs:
+            tier_usage = dict(raw_usage or {}) if raw is not None and i == start else {}
+            try:
+                if raw is not None and i == start:
+                    # The stream may have been answered by the budget model (llm.budget_model)
+                    data = finish_json(client, prompt, raw, text_format, cache=cache,
+                                       max_tokens=tier.max_tokens,
+                                       model=tier_usage.get("model", tier.model), usage=tier_usage)
+                else:
+                    data = complete_json(client, prompt, text_format, tier.max_tokens,
+                                         cache=cache, model=tier.model, usage=tier_usage)
+                attrs["ok"] = True
+                if usage is not None:
+                    usage["model"] = tier_usage.get("model", tier.model)
+                return data
+            except ValueError as e:  # json.JSONDecodeError is a ValueError
+                attrs["ok"] = False
+                error = e
+            finally:
+                attrs.update(tier_usage)
+    raise error
+
+
+def recording_models(complete_json, models: set):
+    """
+    `complete_json(prompt, text_format)` (which must accept `usage=`) that
+    adds the model of every answer to `models`, for results built from
+    several calls, e.g. the Task 2 fan-out.
+    """
+    def wrapper(prompt, text_format):
+        usage = {}
+        data = complete_json(prompt, text_format, usage=usage)
+        models.add(usage.get("model"))
+        return data
+    return wrapper
+
+
+def model_label(models) -> str:
+    """Provenance of a result built by several models: "a, b", or None if none answered."""
+    return ", ".join(sorted(m for m in models if m)) or None
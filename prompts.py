@@ -0,0 +1,339 @@
+"""
+Prompt templates used by the dashboard.
+
+Kept outside app.py so background jobs can build follow-up prompts without
+importing the Streamlit script.
+"""
+
+from datetime import date
+
+# ---------------------------------------------------------
+# TASK 1 · MARKET INTELLIGENCE
+# ---------------------------------------------------------
+def market_intelligence_prompt(category: str) -> str:
+    return f"""
+Return ONLY valid JSON. No explanations.
+
+JSON MUST contain these keys:
+- "marketOverview"
+- "topSuppliers" (list of 5)
+- "countryRisks" (list of 3–4)
+
+If uncertain, provide placeholder text instead of removing a field.
+
+Structure:
+{{
+  "category": "{category}",
+  "marketOverview": "2-3 sentence overview.",
+  "topSuppliers": [
+    {{
+      "rank": 1,
+      "name": "Company",
+      "headquarters": "City, Country",
+      "marketShare": "~25%",
+      "keyCapabilities": ["cap1", "cap2", "cap3"],
+      "differentiators": "text",
+      "dellRelevance": "text"
+    }}
+  ],
+  "countryRisks": [
+    {{
+      "country": "Country",
+      "supplierConcentration": "High/Medium/Low",
+      "politicalRisk": {{"score": 5, "assessment": "text", "keyFactors": ["f1","f2"]}},
+      "logisticsRisk":  {{"score": 6, "assessment": "text", "keyFactors": ["f1","f2"]}},
+      "complianceRisk": {{"score": 7, "assessment": "text", "keyFactors": ["f1","f2"]}},
+      "esgRisk":        {{"score": 8, "assessment": "text", "keyFactors": ["f1","f2"]}},
+      "overallRiskLevel": "High/Medium/Low",
+      "mitigation": "text"
+    }}
+  ]
+}}
+"""
+
+
+# ---------------------------------------------------------
+# TASK 2 · CONTRACTS
+# ---------------------------------------------------------
+CONTRACT_TYPES = [
+    "Buy-back Contract",
+    "Revenue-Sharing Contract",
+    "Wholesale Price Contract",
+    "Quantity Flexibility Contract",
+    "Option Contract",
+    "VMI (Vendor Managed Inventory)",
+    "Cost-Sharing or Incentive Contracts",
+]
+
+_CONTRACT_PREAMBLE = """
+You are a supply-chain contract expert for Dell Technologies.
+
+Your ONLY allowed contract types are:
+1. "Buy-back Contract"
+2. "Revenue-Sharing Contract"
+3. "Wholesale Price Contract"
+4. "Quantity Flexibility Contract"
+5. "Option Contract"
+6. "VMI (Vendor Managed Inventory)"
+7. "Cost-Sharing or Incentive Contracts"
+
+Do NOT invent any new contract names. Always use one of the exact names above.
+""".strip()
+
+_CONTRACT_ITEM_INSTRUCTIONS = """
+For each item you must:
+1. Assess:
+   - costPredictability: level ("High" / "Medium" / "Low") + 1–2 line explanation
+   - marketVolatility: level ("High" / "Medium" / "Low") + explanation
+   - durationAndVolume: profile ("Short / Medium / Long term; Low / Medium / High volume") + explanation
+
+2. Compare the RELEVANT contract types (from the 7 allowed types) for this item.
+   For each compared contract type give:
+   - suitability: "High" / "Medium" / "Low"
+   - pros: 2–3 bullet points
+   - cons: 1–2 bullet points
+
+3. Select:
+   - recommendedContract: ONE best contract type from the list
+   - alternativeContract: ONE second-best contract type
+   - finalDecision: 2–3 sentence justification referring explicitly to cost predictability,
+     market volatility, and duration/volume fit.
+""".strip()
+
+_CONTRACT_SUMMARY_INSTRUCTIONS = """
+Finally, provide a short generic summary for each contract type explaining:
+- whenToUse: typical use case (1–2 sentences)
+- keyRisks: main risks/pitfalls (1–2 sentences)
+""".strip()
+
+_CONTRACT_ITEMS_JSON = """
+  "items": [
+    {
+      "name": "Item name exactly as in input",
+      "assessment": {
+        "costPredictability": {
+          "level": "High",
+          "explanation": "text"
+        },
+        "marketVolatility": {
+          "level": "Medium",
+          "explanation": "text"
+        },
+        "durationAndVolume": {
+          "profile": "Long term; High volume",
+          "explanation": "text"
+        }
+      },
+      "contractComparison": [
+        {
+          "type": "Wholesale Price Contract",
+          "suitability": "High",
+          "pros": ["point 1","point 2"],
+          "cons": ["point 1"]
+        }
+      ],
+      "recommendedContract": "Wholesale Price Contract",
+      "alternativeContract": "Quantity Flexibility Contract",
+      "finalDecision": "2-3 sentence justification"
+    }
+  ]""".strip("\n")
+
+_CONTRACT_SUMMARY_JSON = (
+    '  "contractTypeSummary": {\n'
+    + ",\n".join(
+        f'    "{ctype}": {{\n'
+        f'      "whenToUse": "short text",\n'
+        f'      "keyRisks": "short text"\n'
+        f"    }}"
+        for ctype in CONTRACT_TYPES
+    )
+    + "\n  }"
+)
+
+
+def contract_prompt(items: list, include_summary: bool = True) -> str:
+    """
+    Contract analysis for one or more items. With `include_summary=False`
+    the static per-contract-type cheat sheet is left out, so per-item
+    requests do not each regenerate it (see `contract_summary_prompt`).
+    """
+    sections = [
+        _CONTRACT_PREAMBLE,
+        f"Evaluate the most suitable contract types for the following Dell procurement items:\n"
+        f"{', '.join(items)}.",
+        _CONTRACT_ITEM_INSTRUCTIONS,
+    ]
+    body = [f'  "analysisDate": "{date.today().isoformat()}"', _CONTRACT_ITEMS_JSON]
+    if include_summary:
+        sections.append(_CONTRACT_SUMMARY_INSTRUCTIONS)
+        body.append(_CONTRACT_SUMMARY_JSON)
+
+    sections.append(
+        "Return ONLY valid JSON (no markdown, no commentary) with EXACTLY this structure:"
+    )
+    sections.append("{\n" + ",\n".join(body) + "\n}")
+    return "\n\n".join(sections)
+
+
+def contract_summary_prompt() -> str:
+    return "\n\n".join([
+        _CONTRACT_PREAMBLE,
+        "Provide a short generic summary for each of the 7 allowed contract types explaining:\n"
+        "- whenToUse: typical use case (1–2 sentences)\n"
+        "- keyRisks: main risks/pitfalls (1–2 sentences)",
+        "Return ONLY valid JSON (no markdown, no commentary) with EXACTLY this structure:",
+        "{\n" + _CONTRACT_SUMMARY_JSON + "\n}",
+    ])
+
+
+# ---------------------------------------------------------
+# TASK 3 · SCORECARDS
+# ---------------------------------------------------------
+INITIAL_WEIGHTS = {
+    "Technical Capability": 25,
+    "Quality Performance": 20,
+    "Financial Health": 20,
+    "ESG Compliance": 20,
+    "Innovation Capability": 15,
+}
+
+REFINED_WEIGHTS = {
+    "Technical Capability": 30,
+    "Quality Performance": 25,
+    "ESG Compliance": 25,
+    "Financial Health": 15,
+    "Innovation Capability": 5,
+}
+
+
+def _weight_lines(weights: dict) -> str:
+    return "\n".join(f"- {name} {w}" for name, w in weights.items())
+
+
+def scorecard_initial_prompt(suppliers: list, category: str) -> str:
+    return f"""
+You are designing a **supplier evaluation scorecard** for Dell Technologies.
+
+Suppliers: {", ".join(suppliers)}
+Category: {category}
+
+Create an initial scorecard with **5 evaluation dimensions**:
+- Technical Capability (weight 25)
+- Quality Performance (weight 20)
+- Financial Health (weight 20)
+- ESG Compliance (weight 20)
+- Innovation Capability (weight 15)
+
+For each supplier, assign 0–10 scores on each dimension, and compute a numeric
+`weightedTotal` score using the weights above. Also assign a textual `rating`
+("Excellent", "Good", "Average", "Poor").
+
+Return **ONLY valid JSON**, no prose, with this structure:
+
+{{
+  "evaluationTitle": "Initial Scorecard",
+  "category": "{category}",
+  "evaluationDate": "{date.today().isoformat()}",
+  "dimensions": [
+    {{"name":"Technical Capability","weight":25,"description":"1 sentence"}},
+    {{"name":"Quality Performance","weight":20,"description":"1 sentence"}},
+    {{"name":"Financial Health","weight":20,"description":"1 sentence"}},
+    {{"name":"ESG Compliance","weight":20,"description":"1 sentence"}},
+    {{"name":"Innovation Capability","weight":15,"description":"1 sentence"}}
+  ],
+  "supplierScores": [
+    {{
+      "supplierName": "Supplier name from this list: {", ".join(suppliers)}",
+      "scores": {{
+        "Technical Capability": 0,
+        "Quality Performance": 0,
+        "Financial Health": 0,
+        "ESG Compliance": 0,
+        "Innovation Capability": 0
+      }},
+      "weightedTotal": 0,
+      "rating": "Excellent / Good / Average / Poor",
+      "strengths": ["strength1","strength2"],
+      "weaknesses": ["weak1"]
+    }}
+  ],
+  "bestSupplier": {{
+    "name": "Supplier name",
+    "score": 0,
+    "reasoning": "2-3 sentence explanation"
+  }},
+  "conclusion": "2-3 sentence recommendation for Dell"
+}}
+    """.strip()
+
+
+_KPI_SHAPE = '{"name":"...","description":"what it measures","importance":"why it matters for Dell"}'
+
+
+def scorecard_refined_prompt(score_initial: dict) -> str:
+    """
+    Delta-style rescoring prompt. Only the dimension names and weights and a
+    compact table of the current scores are sent. Only KPIs and the new
+    scores come back. Descriptions, strengths and weaknesses are kept from
+    `score_initial` and totals are recomputed locally
+    (see scorecard_jobs.merge_refinement).
+    """
+    dims = [d.get("name") for d in score_initial.get("dimensions", []) if d.get("name")]
+    rows = "\n".join(
+        f"{s.get('supplierName', '')}: "
+        + ", ".join(f"{d} {(s.get('scores') or {}).get(d, 0)}" for d in dims)
+        for s in score_initial.get("supplierScores", [])
+    )
+    return f"""
+Refine a supplier evaluation scorecard for Dell Technologies.
+
+Category: {score_initial.get("category", "")}
+
+New dimension weights:
+{_weight_lines({d: REFINED_WEIGHTS.get(d, 0) for d in dims})}
+
+Current 0–10 scores:
+{rows}
+
+For each dimension, add 2–3 concrete KPIs. Re-assess each supplier's 0–10 scores
+against those KPIs; keep a score unchanged if the KPIs do not change your view.
+
+Return ONLY valid JSON, no prose:
+{{"dimensions":[{{"name":"...","weight":0,"kpis":[{_KPI_SHAPE}]}}],
+ "supplierScores":[{{"supplierName":"...","scores":{{"<dimension>":0}}}}]}}
+    """.strip()
+
+
+def scorecard_dimension_refinement_prompt(category: str, dimensions: list) -> str:
+    """
+    Refinement prompt that only needs the dimension names, not the supplier
+    scores, so it can be sent before the initial scorecard has come back.
+    Weighted totals are recomputed locally afterwards.
+    """
+    weights = {d: REFINED_WEIGHTS.get(d, 0) for d in dimensions}
+    return f"""
+You are refining a supplier evaluation scorecard for Dell Technologies.
+
+Category: {category}
+
+Dimensions and their new weights:
+{_weight_lines(weights)}
+
+For each dimension, add 2–3 concrete KPIs.
+
+Return ONLY valid JSON, no prose:
+{{"dimensions":[{{"name":"...","weight":0,"kpis":[{_KPI_SHAPE}]}}]}}
+    """.strip()
+
+
+# ---------------------------------------------------------
+# REPAIR
+# ---------------------------------------------------------
+def missing_subtree_prompt(original_prompt: str, keys: list) -> str:
+    """Follow-up asking only for the top-level keys that came back broken."""
+    return f"""
+{original_prompt.strip()}
+
+Your previous answer was cut off or incomplete. Do NOT repeat the whole answer.
+Return ONLY valid JSON containing just these top-level keys: {", ".join(keys)}.
+    """.strip()
@@ -0,0 +1,121 @@
+"""
+Markdown builders for the dashboard's result sections.
+
+Each function turns one payload (a supplier, a country risk, a contract item,
+...) into a single Markdown string, so a whole section is drawn with one
+`st.markdown` call instead of dozens. They are pure and deterministic; the app
+memoises them with `st.cache_data`, which keys each call by a hash of the
+payload, so an unchanged section costs a cache lookup on rerun.
+"""
+
+
+def supplier_md(s: dict) -> str:
+    # Two trailing spaces = Markdown line break
+    return "  \n".join([
+        f"**{s.get('rank','?')}. {s.get('name','Unknown Supplier')}**",
+        f"*{s.get('headquarters','N/A')}*",
+        "",
+        f"**Market Share:** {s.get('marketShare','N/A')}",
+        f"**Capabilities:** {', '.join(s.get('keyCapabilities', []))}",
+        f"**Differentiators:** {s.get('differentiators','N/A')}",
+        f"**Dell Relevance:** {s.get('dellRelevance','N/A')}",
+    ]) + "\n\n---\n"
+
+
+def country_risk_md(r: dict) -> str:
+    def score(key):
+        return (r.get(key) or {}).get("score", "?")
+
+    return f"""
+### {r.get("country", "Unknown Country")}
+
+Supplier Concentration: **{r.get('supplierConcentration','N/A')}**
+
+{r.get("mitigation", "")}
+
+*Political: {score('politicalRisk')} · Logistics: {score('logisticsRisk')} · \
+Compliance: {score('complianceRisk')} · ESG: {score('esgRisk')}*
+
+---
+"""
+
+
+def contract_item_md(item: dict) -> str:
+    assess = item.get("assessment", {}) or {}
+    cp = assess.get("costPredictability", {}) or {}
+    mv = assess.get("marketVolatility", {}) or {}
+    dv = assess.get("durationAndVolume", {}) or {}
+
+    lines = [
+        f"### 🔹 {item.get('name', 'Item')}",
+        "",
+    ]
+    if item.get("reusedFrom"):
+        lines += [f"*Reused from the stored analysis of “{item['reusedFrom']}”.*", ""]
+    lines += [
+        "**1. Demand & risk assessment**",
+        "",
+        f"- **Cost predictability:** {cp.get('level','')} – {cp.get('explanation','')}",
+        f"- **Market volatility:** {mv.get('level','')} – {mv.get('explanation','')}",
+        f"- **Duration & volume:** {dv.get('profile','')} – {dv.get('explanation','')}",
+        "",
+        "**2. Comparison of relevant contract types**",
+        "",
+    ]
+    for cc in item.get("contractComparison", []):
+        lines.append(f"- **{cc.get('type', '')}** (suitability: {cc.get('suitability', '')})")
+        if cc.get("pros"):
+            lines.append("  - Pros: " + "; ".join(cc["pros"]))
+        if cc.get("cons"):
+            lines.append("  - Cons: " + "; ".join(cc["cons"]))
+    lines += [
+        "",
+        "**3. Final contract selection**",
+        "",
+        f"- ✅ **Recommended contract:** {item.get('recommendedContract','')}",
+        f"- 🔁 **Alternative contract:** {item.get('alternativeContract','')}",
+        "",
+        item.get("finalDecision", ""),
+        "",
+        "---",
+    ]
+    return "\n".join(lines)
+
+
+def contract_summary_md(summary: dict) -> str:
+    lines = []
+    for ctype, info in summary.items():
+        when = (info or {}).get("whenToUse", "")
+        risks = (info or {}).get("keyRisks", "")
+        lines.append(f"**{ctype}**")
+        lines.append("")
+        if when:
+            lines.append(f"- _When to use_: {when}")
+        if risks:
+            lines.append(f"- _Key risks_: {risks}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def kpis_md(dimensions: list) -> str:
+    lines = []
+    for dim in dimensions:
+        kpis = dim.get("kpis", [])
+        if not kpis:
+            continue
+        lines += [f"**{dim.get('name', 'Dimension')}**", ""]
+        for kpi in kpis:
+            if isinstance(kpi, dict):
+                imp = kpi.get("importance", "")
+                extra = f" _(Importance: {imp})_" if imp else ""
+                lines.append(f"- **{kpi.get('name', 'KPI')}** – {kpi.get('description', '')}{extra}")
+            else:
+                # if model returns simple strings instead of objects
+                lines.append(f"- {kpi}")
+        lines += ["", "---", ""]
+    return "\n".join(lines)
+
+
+def section_md(builder, rows: list) -> str:
+    """All rows of one section as a single Markdown string."""
+    return "\n".join(builder(row) for row in rows)
@@ -0,0 +1,279 @@
+"""
+Columnar store of Task 1 country-risk scores.
+
+The risk scores of a market run live inside nested JSON
+(`countryRisks[].politicalRisk.score`, ...), so answering "how risky is
+Taiwan across everything we have analysed" meant loading and parsing every
+payload. Here each run is flattened once into a typed long table, one row
+per (country, dimension):
+
+    run_id, category, country, dimension, score, concentration, level, generated_at
+
+and written as its own Parquet file under `<dir>/runs/`. Two small
+aggregate tables are updated incrementally on every write, so portfolio
+dashboards read a few hundred rows instead of every run:
+
+    by_country    country × dimension: runs, scores, mean, min, max, latest
+    by_dimension  category × dimension: the same
+
+Runs reach the store through `backfill`, which picks up the market runs
+saved to the analysis store since the previous call by any process (the
+app, batch.py); the highest analysis id seen is kept in `<dir>/synced_id`.
+
+Location: RISK_STORE_DIR (default .cache/risk_store).
+"""
+
+import os
+import threading
+import time
+
+import pandas as pd
+
+from market_compare import RISK_DIMENSIONS
+
+DEFAULT_STORE_DIR = os.environ.get("RISK_STORE_DIR", ".cache/risk_store")
+
+# More new runs than this in one backfill: rebuild the aggregates once
+# instead of updating them per run
+INCREMENTAL_RUNS = 20
+
+# aggregate name -> group-by columns
+AGGREGATES = {
+    "by_country": ["country", "dimension"],
+    "by_dimension": ["category", "dimension"],
+}
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("run_id", pa.int64()),
+        ("category", pa.string()),
+        ("country", pa.string()),
+        ("dimension", pa.string()),
+        ("score", pa.float32()),
+        ("concentration", pa.string()),
+        ("level", pa.string()),
+        ("generated_at", pa.timestamp("s")),
+    ])
+
+
+def risk_rows(run_id: int, category: str, data: dict, generated_at: float = None) -> pd.DataFrame:
+    """Flatten the `countryRisks` of one market run into the long table."""
+    generated_at = pd.Timestamp(generated_at or time.time(), unit="s").floor("s")
+    rows = []
+    for r in data.get("countryRisks", []) or []:
+        for key, dimension in RISK_DIMENSIONS.items():
+            risk = r.get(key)
+            rows.append({
+                "run_id": run_id,
+                "category": category,
+                "country": str(r.get("country", "")).strip(),
+                "dimension": dimension,
+                "score": risk.get("score") if isinstance(risk, dict) else None,
+                "concentration": r.get("supplierConcentration", ""),
+                "level": str(r.get("overallRiskLevel", "")).strip().capitalize(),
+                "generated_at": generated_at,
+            })
+    frame = pd.DataFrame(rows, columns=_schema().names)
+    frame["run_id"] = frame["run_id"].astype("int64")
+    frame["score"] = pd.to_numeric(frame["score"], errors="coerce").astype("float32")
+    frame["generated_at"] = pd.to_datetime(frame["generated_at"])
+    return frame
+
+
+def summarise(rows: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Partial aggregate of `rows`; partials combine with `combine`."""
+    scored = rows.dropna(subset=["score"]).sort_values("generated_at")
+    grouped = scored.groupby(keys, sort=False)
+    out = grouped.agg(
+        runs=("run_id", "nunique"),
+        count=("score", "size"),
+        total=("score", "sum"),
+        min=("score", "min"),
+        max=("score", "max"),
+        latest=("score", "last"),
+        latest_at=("generated_at", "last"),
+    )
+    return out.reset_index()
+
+
+def combine(parts: list, keys: list) -> pd.DataFrame:
+    merged = pd.concat(parts, ignore_index=True).sort_values("latest_at")
+    out = merged.groupby(keys, sort=False).agg(
+        runs=("runs", "sum"),
+        count=("count", "sum"),
+        total=("total", "sum"),
+        min=("min", "min"),
+        max=("max", "max"),
+        latest=("latest", "last"),
+        latest_at=("latest_at", "last"),
+    )
+    return out.reset_index()
+
+
+class RiskStore:
+    def __init__(self, directory: str = DEFAULT_STORE_DIR):
+        self.directory = directory
+        self.runs_dir = os.path.join(directory, "runs")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        os.makedirs(self.runs_dir, exist_ok=True)
+
+    def _run_path(self, run_id: int) -> str:
+        return os.path.join(self.runs_dir, f"run-{run_id:08d}.parquet")
+
+    def _aggregate_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.parquet")
+
+    @staticmethod
+    def _write(frame: pd.DataFrame, path: str, schema=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+        # dot-prefixed, so a half-written file is never picked up as a run
+        tmp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".part")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+
+    # ---------------------------------------------------------
+    # WRITE
+    # ---------------------------------------------------------
+    def has(self, run_id: int) -> bool:
+        return os.path.exists(self._run_path(run_id))
+
+    def add(self, run_id: int, category: str, data: dict, generated_at: float = None,
+            update_aggregates: bool = True) -> int:
+        """
+        Store the country risks of one market run; returns the number of rows
+        written. Without `update_aggregates` only the run file is written, for
+        bulk loads that call `rebuild_aggregates` once at the end.
+        """
+        rows = risk_rows(run_id, category, data, generated_at)
+        with self._lock:
+            if rows.empty or self.has(run_id):
+                return 0
+            self._write(rows, self._run_path(run_id), _schema())
+            if not update_aggregates:
+                return len(rows)
+            for name, keys in AGGREGATES.items():
+                parts = [summarise(rows, keys)]
+                existing = self.aggregate(name, raw=True)
+                if existing is not None:
+                    parts.insert(0, existing)
+                self._write(combine(parts, keys), self._aggregate_path(name))
+        return len(rows)
+
+    def _synced_path(self) -> str:
+        return os.path.join(self.directory, "synced_id")
+
+    def synced_id(self) -> int:
+        """Highest analysis id `backfill` has looked at."""
+        try:
+            with open(self._synced_path(), encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _set_synced_id(self, analysis_id: int):
+        tmp_path = self._synced_path() + ".part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(analysis_id))
+        os.replace(tmp_path, self._synced_path())
+
+    def backfill(self, analysis_store, batch: int = 500) -> int:
+        """
+        Add the market runs saved since the last backfill; cheap (one query)
+        when there are none, so it can run whenever the store is read. A few
+        new runs update the aggregates as they are added; a larger catch-up
+        writes the run files first and rebuilds the aggregates once.
+        """
+        with self._sync_lock:
+            synced = start = self.synced_id()
+            added, bulk = 0, False
+            while True:
+                entries = analysis_store.since("market", synced, limit=batch)
+                if not entries:
+                    break
+                bulk = bulk or len(entries) > INCREMENTAL_RUNS
+                for entry in entries:
+                    added += self.add(entry["id"], entry["category"], entry["data"],
+                                      entry["created_at"], update_aggregates=not bulk)
+                synced = entries[-1]["id"]
+            if bulk:
+                self.rebuild_aggregates()
+            if synced != start:
+                # Only now, so an interrupted catch-up is redone and rebuilt
+                self._set_synced_id(synced)
+        return added
+
+    def rebuild_aggregates(self):
+        """Recompute the aggregate tables from the per-run files."""
+        rows = self.table()
+        with self._lock:
+            for name, keys in AGGREGATES.items():
+                if rows.empty:
+                    if os.path.exists(self._aggregate_path(name)):
+                        os.remove(self._aggregate_path(name))
+                    continue
+                self._write(summarise(rows, keys), self._aggregate_path(name))
+
+    # ---------------------------------------------------------
+    # READ
+    # ---------------------------------------------------------
+    def table(self, columns=None, filters=None) -> pd.DataFrame:
+        """
+        The long table across all runs. `filters` is a list of
+        `(column, op, value)` conditions that must all hold, e.g.
+        `[("country", "=", "Taiwan")]`; they are pushed down to the files.
+        """
+        import pyarrow.dataset as ds
+
+        if not any(f.endswith(".parquet") for f in os.listdir(self.runs_dir)):
+            return pd.DataFrame(columns=columns or _schema().names)
+        dataset = ds.dataset(self.runs_dir, format="parquet", schema=_schema())
+        expression = None
+        for column, op, value in filters or ():
+            field = ds.field(column)
+            clause = field.isin(value) if op == "in" else {
+                "=": field == value, "!=": field != value,
+                ">": field > value, ">=": field >= value,
+                "<": field < value, "<=": field <= value,
+            }[op]
+            expression = clause if expression is None else expression & clause
+        return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+    def aggregate(self, name: str, raw: bool = False):
+        """
+        One of the `AGGREGATES` tables, or None before the first write. Unless
+        `raw` is set the running sums are turned into a `mean` column.
+        """
+        import pyarrow.parquet as pq
+
+        path = self._aggregate_path(name)
+        if not os.path.exists(path):
+            return None
+        frame = pq.read_table(path).to_pandas()
+        if raw:
+            return frame
+        keys = AGGREGATES[name]
+        frame.insert(len(keys), "mean", (frame.pop("total") / frame["count"]).round(2))
+        return frame.sort_values(keys).reset_index(drop=True)
+
+    def pivot(self, name: str, value: str = "mean") -> pd.DataFrame:
+        """Aggregate `name` as a matrix: first key down, dimensions across."""
+        frame = self.aggregate(name)
+        if frame is None or frame.empty:
+            return pd.DataFrame()
+        index = AGGREGATES[name][0]
+        heat = frame.pivot(index=index, columns="dimension", values=value)
+        heat = heat.reindex(columns=[d for d in RISK_DIMENSIONS.values() if d in heat.columns])
+        heat["Mean Risk"] = heat.mean(axis=1)
+        return heat.sort_values("Mean Risk", ascending=False).round(1)
+
+    def stats(self) -> dict:
+        files = [f for f in os.listdir(self.runs_dir) if f.endswith(".parquet")]
+        size = sum(os.path.getsize(os.path.join(self.runs_dir, f)) for f in files)
+        return {"runs": len(files), "bytes": size}
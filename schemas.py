@@ -0,0 +1,223 @@
+"""
+JSON schemas for every LLM payload, plus a small local validator.
+
+The schemas are sent to the Responses API as strict structured-output
+formats (`text={"format": response_format(...)}`), which rules out most
+malformed output. Strict mode needs every property listed in `required`
+and `additionalProperties: false` on every object, hence the helpers below.
+`validate` checks the subset of JSON Schema used here and is what the
+repair step relies on to find missing or broken sub-trees.
+"""
+
+from prompts import CONTRACT_TYPES, INITIAL_WEIGHTS
+
+
+def _obj(properties: dict) -> dict:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _arr(items: dict) -> dict:
+    return {"type": "array", "items": items}
+
+
+_STR = {"type": "string"}
+_NUM = {"type": "number"}
+_STR_LIST = _arr(_STR)
+
+# ---------------------------------------------------------
+# TASK 1 · MARKET INTELLIGENCE
+# ---------------------------------------------------------
+_RISK = _obj({"score": _NUM, "assessment": _STR, "keyFactors": _STR_LIST})
+
+MARKET_SCHEMA = _obj({
+    "category": _STR,
+    "marketOverview": _STR,
+    "topSuppliers": _arr(_obj({
+        "rank": {"type": "integer"},
+        "name": _STR,
+        "headquarters": _STR,
+        "marketShare": _STR,
+        "keyCapabilities": _STR_LIST,
+        "differentiators": _STR,
+        "dellRelevance": _STR,
+    })),
+    "countryRisks": _arr(_obj({
+        "country": _STR,
+        "supplierConcentration": _STR,
+        "politicalRisk": _RISK,
+        "logisticsRisk": _RISK,
+        "complianceRisk": _RISK,
+        "esgRisk": _RISK,
+        "overallRiskLevel": _STR,
+        "mitigation": _STR,
+    })),
+})
+
+# ---------------------------------------------------------
+# TASK 2 · CONTRACTS
+# ---------------------------------------------------------
+_LEVEL = {"type": "string", "enum": ["High", "Medium", "Low"]}
+_CONTRACT_NAME = {"type": "string", "enum": list(CONTRACT_TYPES)}
+
+_CONTRACT_ITEM = _obj({
+    "name": _STR,
+    "assessment": _obj({
+        "costPredictability": _obj({"level": _LEVEL, "explanation": _STR}),
+        "marketVolatility": _obj({"level": _LEVEL, "explanation": _STR}),
+        "durationAndVolume": _obj({"profile": _STR, "explanation": _STR}),
+    }),
+    "contractComparison": _arr(_obj({
+        "type": _CONTRACT_NAME,
+        "suitability": _LEVEL,
+        "pros": _STR_LIST,
+        "cons": _STR_LIST,
+    })),
+    "recommendedContract": _CONTRACT_NAME,
+    "alternativeContract": _CONTRACT_NAME,
+    "finalDecision": _STR,
+})
+
+_CONTRACT_SUMMARY = _obj({
+    ctype: _obj({"whenToUse": _STR, "keyRisks": _STR}) for ctype in CONTRACT_TYPES
+})
+
+CONTRACT_SCHEMA = _obj({
+    "analysisDate": _STR,
+    "items": _arr(_CONTRACT_ITEM),
+    "contractTypeSummary": _CONTRACT_SUMMARY,
+})
+
+CONTRACT_ITEMS_SCHEMA = _obj({
+    "analysisDate": _STR,
+    "items": _arr(_CONTRACT_ITEM),
+})
+
+CONTRACT_SUMMARY_SCHEMA = _obj({"contractTypeSummary": _CONTRACT_SUMMARY})
+
+# ---------------------------------------------------------
+# TASK 3 · SCORECARDS
+# ---------------------------------------------------------
+_KPI = _obj({"name": _STR, "description": _STR, "importance": _STR})
+_DIMENSION = _obj({"name": _STR, "weight": _NUM, "description": _STR})
+
+
+def scorecard_schema(dimensions=tuple(INITIAL_WEIGHTS)) -> dict:
+    return _obj({
+        "evaluationTitle": _STR,
+        "category": _STR,
+        "evaluationDate": _STR,
+        "dimensions": _arr(_DIMENSION),
+        "supplierScores": _arr(_obj({
+            "supplierName": _STR,
+            "scores": _obj({d: _NUM for d in dimensions}),
+            "weightedTotal": _NUM,
+            "rating": {"type": "string", "enum": ["Excellent", "Good", "Average", "Poor"]},
+            "strengths": _STR_LIST,
+            "weaknesses": _STR_LIST,
+        })),
+        "bestSupplier": _obj({"name": _STR, "score": _NUM, "reasoning": _STR}),
+        "conclusion": _STR,
+    })
+
+
+SCORECARD_INITIAL_SCHEMA = scorecard_schema()
+
+# Delta-style refinement payloads: only what changes comes back and is
+# merged into the initial scorecard locally (scorecard_jobs.merge_refinement)
+_DIMENSION_KPIS = _obj({"name": _STR, "weight": _NUM, "kpis": _arr(_KPI)})
+
+SCORECARD_DIMENSION_REFINEMENT_SCHEMA = _obj({"dimensions": _arr(_DIMENSION_KPIS)})
+
+
+def scorecard_rescore_schema(dimensions=tuple(INITIAL_WEIGHTS)) -> dict:
+    return _obj({
+        "dimensions": _arr(_DIMENSION_KPIS),
+        "supplierScores": _arr(_obj({
+            "supplierName": _STR,
+            "scores": _obj({d: _NUM for d in dimensions}),
+        })),
+    })
+
+
+SCORECARD_RESCORE_SCHEMA = scorecard_rescore_schema()
+
+
+# ---------------------------------------------------------
+# HELPERS
+# ---------------------------------------------------------
+def response_format(name: str, schema: dict) -> dict:
+    """`text.format` value for the Responses API."""
+    return {"type": "json_schema", "name": name, "schema": schema, "strict": True}
+
+
+def subschema(schema: dict, keys) -> dict:
+    """The same object schema restricted to the top-level `keys`."""
+    return _obj({k: schema["properties"][k] for k in keys})
+
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+
+def validate(data, schema: dict, path: str = "$") -> list:
+    """
+    Return a list of `(path, problem)` tuples; empty means `data` matches.
+    Supports type, enum, properties, required and items.
+    """
+    problems = []
+    expected = schema.get("type")
+    if expected:
+        py_type = _TYPES[expected]
+        if not isinstance(data, py_type) or (expected in ("number", "integer") and isinstance(data, bool)):
+            return [(path, f"expected {expected}")]
+
+    if "enum" in schema and data not in schema["enum"]:
+        problems.append((path, f"not one of {schema['enum']}"))
+
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in data:
+                problems.append((f"{path}.{key}", "missing"))
+        for key, sub in schema.get("properties", {}).items():
+            if key in data:
+                problems.extend(validate(data[key], sub, f"{path}.{key}"))
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(data):
+            problems.extend(validate(item, schema["items"], f"{path}[{i}]"))
+
+    return problems
+
+
+def top_level_keys(problems: list) -> list:
+    """Top-level property names that contain at least one problem."""
+    keys = []
+    for path, _ in problems:
+        key = path[2:].split(".")[0].split("[")[0] if path.startswith("$.") else None
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+# ---------------------------------------------------------
+# RESPONSE FORMATS
+# ---------------------------------------------------------
+MARKET_FORMAT = response_format("market_intelligence", MARKET_SCHEMA)
+CONTRACT_FORMAT = response_format("contract_analysis", CONTRACT_SCHEMA)
+CONTRACT_ITEMS_FORMAT = response_format("contract_items", CONTRACT_ITEMS_SCHEMA)
+CONTRACT_SUMMARY_FORMAT = response_format("contract_type_summary", CONTRACT_SUMMARY_SCHEMA)
+SCORECARD_INITIAL_FORMAT = response_format("scorecard_initial", SCORECARD_INITIAL_SCHEMA)
+SCORECARD_DIMENSION_REFINEMENT_FORMAT = response_format(
+    "scorecard_dimension_kpis", SCORECARD_DIMENSION_REFINEMENT_SCHEMA
+)
+SCORECARD_RESCORE_FORMAT = response_format("scorecard_rescore", SCORECARD_RESCORE_SCHEMA)
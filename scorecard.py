@@ -0,0 +1,206 @@
+"""
+Vectorised supplier scorecard engine.
+
+A scorecard is turned into a supplier × dimension score matrix once; weighted
+totals and ratings are then plain matrix operations, so the same code scores
+the five suppliers from Task 1 or a panel of thousands imported from the
+vendor master, under one or many weight scenarios in a single pass.
+"""
+
+import numpy as np
+import pandas as pd
+
+from telemetry import traced
+
+RATING_LABELS = np.array(["Poor", "Average", "Good", "Excellent"])
+RATING_THRESHOLDS = np.array([5.5, 7.0, 8.5])  # on a 0–10 scale
+
+
+# ---------------------------------------------------------
+# MATRIX CONSTRUCTION
+# ---------------------------------------------------------
+def dimension_weights(scorecard: dict) -> pd.Series:
+    """Dimension name → numeric weight (non-numeric weights count as 0)."""
+    dims = [d for d in scorecard.get("dimensions", []) if d.get("name")]
+    weights = pd.Series([d.get("weight", 0) for d in dims], index=[d["name"] for d in dims], dtype=object)
+    return pd.to_numeric(weights, errors="coerce").fillna(0.0).astype(float)
+
+
+def score_matrix(scorecard: dict, dimensions=None) -> pd.DataFrame:
+    """
+    Supplier × dimension DataFrame of float scores, indexed by supplier name.
+    Missing or non-numeric cells become 0.
+    """
+    if dimensions is None:
+        dimensions = list(dimension_weights(scorecard).index)
+    rows = scorecard.get("supplierScores", [])
+    frame = pd.DataFrame.from_records(
+        [(s.get("scores") or {}) for s in rows],
+        index=[s.get("supplierName", "") for s in rows],
+        columns=list(dimensions),
+    )
+    return frame.apply(pd.to_numeric, errors="coerce").fillna(0.0).astype(float)
+
+
+# ---------------------------------------------------------
+# SCORING
+# ---------------------------------------------------------
+def weighted_totals(scores, weights) -> np.ndarray:
+    """
+    `scores` is (n_suppliers, n_dims); `weights` is (n_dims,) or
+    (n_scenarios, n_dims). Each weight vector is normalised to sum to 1
+    (an all-zero vector is left as is). Returns (n_suppliers,) or
+    (n_suppliers, n_scenarios).
+    """
+    s = np.asarray(scores, dtype=float)
+    w = np.atleast_2d(np.asarray(weights, dtype=float))
+    totals = w.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    result = s @ (w / totals).T
+    return result[:, 0] if np.ndim(weights) == 1 else result
+
+
+def ratings(weighted) -> np.ndarray:
+    """
+    Map weighted totals to rating labels. Works on 0–10 and 0–100 scales:
+    values above 10 are divided by 10 before applying the thresholds.
+    """
+    wt = np.asarray(weighted, dtype=float)
+    norm = np.where(wt <= 10, wt, wt / 10.0)
+    return RATING_LABELS[np.searchsorted(RATING_THRESHOLDS, norm, side="right")]
+
+
+def score_panel(scores: pd.DataFrame, weight_scenarios) -> pd.DataFrame:
+    """
+    Score a supplier × dimension panel under several weight scenarios.
+
+    `weight_scenarios` maps scenario name → {dimension: weight} (dimensions
+    missing from a scenario get weight 0). Returns one "Weighted Total · name"
+    and "Rating · name" column pair per scenario.
+    """
+    names = list(weight_scenarios)
+    w = np.array(
+        [[float(weight_scenarios[n].get(d, 0)) for d in scores.columns] for n in names]
+    ).reshape(len(names), len(scores.columns))
+    totals = np.round(weighted_totals(scores.to_numpy(), w), 3)
+
+    out = {}
+    for j, name in enumerate(names):
+        out[f"Weighted Total · {name}"] = totals[:, j]
+        out[f"Rating · {name}"] = ratings(totals[:, j])
+    return pd.DataFrame(out, index=scores.index)
+
+
+# ---------------------------------------------------------
+# SCORECARD DICTS
+# ---------------------------------------------------------
+@traced("scorecard.weighted_totals")
+def compute_weighted_totals_and_ratings(scorecard: dict) -> dict:
+    """
+    Ensure each supplier row in `scorecard["supplierScores"]` has:
+      - numeric 'weightedTotal' (0–100 scale, or 0–10 – it still works)
+      - text 'rating' based on weighted total.
+
+    If the model already provided these, we keep them but normalise types.
+    """
+    supplier_scores = scorecard.get("supplierScores", [])
+    if not supplier_scores:
+        return scorecard
+
+    weights = dimension_weights(scorecard)
+    scores = score_matrix(scorecard, weights.index)
+    computed = np.round(weighted_totals(scores.to_numpy(), weights.to_numpy()), 3)
+
+    # Keep a numeric weightedTotal from the model, compute the rest
+    given = np.array([
+        float(s["weightedTotal"]) if isinstance(s.get("weightedTotal"), (int, float)) else np.nan
+        for s in supplier_scores
+    ])
+    totals = np.where(np.isnan(given), computed, given)
+    labels = ratings(totals)
+
+    for s, wt, label in zip(supplier_scores, totals.tolist(), labels.tolist()):
+        s["weightedTotal"] = float(wt)
+        s["rating"] = label
+
+    return scorecard
+
+
+@traced("scorecard.dataframe")
+def scorecard_frame(scorecard: dict) -> pd.DataFrame:
+    """
+    The table Task 3 renders: Supplier, one column per dimension, Weighted
+    Total and Rating, best supplier first.
+    """
+    supplier_scores = scorecard.get("supplierScores", [])
+    if not supplier_scores:
+        return pd.DataFrame()
+
+    dims = [d.get("name") for d in scorecard.get("dimensions", []) if d.get("name")]
+    frame = pd.DataFrame.from_records(
+        [(s.get("scores") or {}) for s in supplier_scores], columns=dims
+    )
+    frame.insert(0, "Supplier", [s.get("supplierName", "") for s in supplier_scores])
+    frame["Weighted Total"] = [s.get("weightedTotal") for s in supplier_scores]
+    frame["Rating"] = [s.get("rating") for s in supplier_scores]
+    return frame.sort_values("Weighted Total", ascending=False).reset_index(drop=True)
+
+
+# ---------------------------------------------------------
+# WHAT-IF / SENSITIVITY
+# ---------------------------------------------------------
+def ranks(totals) -> np.ndarray:
+    """1-based rank of each row (highest total = 1), column-wise for 2-D input."""
+    t = np.asarray(totals, dtype=float)
+    order = np.argsort(-t, axis=0, kind="stable")
+    return np.argsort(order, axis=0, kind="stable") + 1
+
+
+def what_if_frame(scores: pd.DataFrame, base_weights: dict, weights: dict) -> pd.DataFrame:
+    """
+    Re-score `scores` under `weights` and compare with `base_weights`:
+    Supplier, Weighted Total, Rating, Rank and Rank Δ (positive = moved up).
+    """
+    panel = score_panel(scores, {"base": base_weights, "what-if": weights})
+    base_rank = ranks(panel["Weighted Total · base"].to_numpy())
+    new_rank = ranks(panel["Weighted Total · what-if"].to_numpy())
+    frame = pd.DataFrame({
+        "Supplier": scores.index,
+        "Weighted Total": panel["Weighted Total · what-if"].to_numpy(),
+        "Rating": panel["Rating · what-if"].to_numpy(),
+        "Rank": new_rank,
+        "Rank Δ": base_rank - new_rank,
+    })
+    return frame.sort_values("Rank").reset_index(drop=True)
+
+
+def weight_grid(base_weights: dict, factors=(0.5, 1.0, 1.5)) -> np.ndarray:
+    """
+    Every combination of scaling each base weight by one of `factors`:
+    a (len(factors) ** n_dims, n_dims) matrix of weight vectors.
+    """
+    base = np.array(list(base_weights.values()), dtype=float)
+    grids = np.meshgrid(*[np.asarray(factors, dtype=float)] * len(base), indexing="ij")
+    return np.stack([g.ravel() for g in grids], axis=1) * base
+
+
+def sensitivity_sweep(scores: pd.DataFrame, base_weights: dict, factors=(0.5, 1.0, 1.5)) -> pd.DataFrame:
+    """
+    Rank stability of each supplier across the `weight_grid` around
+    `base_weights`, scored in a single matrix product.
+    """
+    dims = list(base_weights)
+    grid = weight_grid(base_weights, factors)
+    r = ranks(weighted_totals(scores[dims].to_numpy(), grid))
+    base_rank = ranks(weighted_totals(scores[dims].to_numpy(), np.array(list(base_weights.values()))))
+    frame = pd.DataFrame({
+        "Supplier": scores.index,
+        "Base Rank": base_rank,
+        "Best Rank": r.min(axis=1),
+        "Worst Rank": r.max(axis=1),
+        "Mean Rank": np.round(r.mean(axis=1), 2),
+        "% Ranked #1": np.round(100 * (r == 1).mean(axis=1), 1),
+        "% Same Rank": np.round(100 * (r == base_rank[:, None]).mean(axis=1), 1),
+    })
+    frame.attrs["scenarios"] = len(grid)
+    return frame.sort_values("Base Rank").reset_index(drop=True)
@@ -0,0 +1,272 @@
+"""
+Background pipeline for the Task 3 scorecards.
+
+The initial and refined scorecard calls run on the OpenAI async client inside
+a worker thread, so the Streamlit script thread is free to rerun while they
+are in flight. The job object lives in `st.session_state` and the UI polls
+its per-stage status.
+"""
+
+import asyncio
+import contextvars
+import copy
+import threading
+import time
+
+from llm import budget_model, make_async_client, record_usage
+from llm_cache import make_cache_key
+from schemas import (
+    SCORECARD_DIMENSION_REFINEMENT_FORMAT,
+    SCORECARD_INITIAL_FORMAT,
+    SCORECARD_RESCORE_FORMAT,
+)
+from single_flight import FLIGHTS, CallAbandoned
+from telemetry import estimate_tokens, span
+from usage_ledger import BUDGET
+
+STAGES = ("initial", "refined")
+
+
+def merge_refinement(score_initial: dict, refinement: dict, weights: dict) -> dict:
+    """
+    Build a refined scorecard from the initial one plus a delta-style
+    refinement: new weights and KPIs per dimension and, when the model was
+    asked to rescore, new `supplierScores[].scores`. Everything else is
+    reused from `score_initial`; weighted totals, ratings and the best
+    supplier are left for the caller to recompute locally.
+    """
+    refined = copy.deepcopy(score_initial)
+    by_name = {
+        d.get("name"): d
+        for d in refinement.get("dimensions", []) or []
+        if isinstance(d, dict) and d.get("name")
+    }
+
+    for dim in refined.get("dimensions", []):
+        name = dim.get("name")
+        update = by_name.get(name, {})
+        dim["weight"] = weights.get(name, update.get("weight", dim.get("weight", 0)))
+        dim["kpis"] = update.get("kpis", [])
+
+    rescored = {
+        s.get("supplierName"): s.get("scores") or {}
+        for s in refinement.get("supplierScores", []) or []
+        if isinstance(s, dict)
+    }
+    for s in refined.get("supplierScores", []):
+        s["scores"] = dict(s.get("scores") or {}, **rescored.get(s.get("supplierName"), {}))
+        s.pop("weightedTotal", None)
+        s.pop("rating", None)
+
+    refined["evaluationTitle"] = "Refined Scorecard"
+    refined.pop("bestSupplier", None)
+    refined.pop("conclusion", None)
+    return refined
+
+
+class ScorecardJob:
+    """
+    Runs the two scorecard stages in a background thread.
+
+    - Pipelined mode: the rescoring prompt is built from the parsed initial
+      scorecard as soon as stage 1 finishes.
+    - Speculative mode (`speculative_prompt` given): the refined call only
+      needs the dimensions, so it is started at the same time as the initial
+      call and merged locally once both are back.
+
+    Every stage is requested with its structured-output format.
+    `finish(prompt, raw, text_format, model=...) -> dict` validates and
+    repairs a raw response from `model` (see `llm.finish_json`); it may issue
+    a small follow-up request, so it runs in a worker thread.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        cache,
+        finish,
+        finalize,
+        initial_prompt: str,
+        build_refined_prompt=None,
+        speculative_prompt: str = None,
+        refined_weights: dict = None,
+        max_tokens: int = 3500,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.cache = cache
+        self.finish = finish
+        self.finalize = finalize
+        self.initial_prompt = initial_prompt
+        self.build_refined_prompt = build_refined_prompt
+        self.speculative_prompt = speculative_prompt
+        self.refined_weights = refined_weights or {}
+        self.max_tokens = max_tokens
+
+        self.status = {
+            stage: {"state": "pending", "elapsed": 0.0, "error": None, "raw": None}
+            for stage in STAGES
+        }
+        self.results = {stage: None for stage in STAGES}
+        self.models = {stage: model for stage in STAGES}  # as answered; see llm.budget_model
+        self.started_at = None
+        self.finished_at = None
+        self.collected = False
+        self._thread = None
+
+    # -------------------------------------------------------------
+    # lifecycle
+    # -------------------------------------------------------------
+    def start(self):
+        self.started_at = time.time()
+        # Carry the session over, so usage is attributed to it (usage_ledger.py)
+        context = contextvars.copy_context()
+        self._thread = threading.Thread(target=context.run, args=(self._thread_main,), daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def progress(self) -> float:
+        finished = sum(
+            1 for s in self.status.values() if s["state"] in ("done", "failed", "skipped")
+        )
+        return finished / len(STAGES)
+
+    def _thread_main(self):
+        try:
+            asyncio.run(self._run())
+        except Exception as e:  # pragma: no cover - last-resort guard
+            for stage_status in self.status.values():
+                if stage_status["state"] in ("pending", "running"):
+                    stage_status["state"] = "failed"
+                    stage_status["error"] = str(e)
+        finally:
+            self.finished_at = time.time()
+
+    # -------------------------------------------------------------
+    # stages
+    # -------------------------------------------------------------
+    async def _complete(self, aclient, stage: str, prompt: str, text_format: dict) -> str:
+        stage_status = self.status[stage]
+        stage_status["state"] = "running"
+        t0 = time.time()
+        model = budget_model(self.cache, self.model, prompt, self.max_tokens, text_format)
+        self.models[stage] = model
+        key = make_cache_key(model, prompt, self.max_tokens, text_format["name"])
+        try:
+            text = self.cache.get(key)
+            if text is None:
+                text = await self._fetch(aclient, key, model, prompt, text_format)
+            stage_status["raw"] = text
+            return text
+        finally:
+            stage_status["elapsed"] = time.time() - t0
+
+    async def _fetch(self, aclient, key: str, model: str, prompt: str, text_format: dict) -> str:
+        """Upstream call, joined with any identical call in flight (single_flight.py)."""
+        await asyncio.to_thread(BUDGET.admit)  # before joining, so a refusal stays with us
+        while True:
+            call, leader = FLIGHTS.join(key)
+            if leader:
+                break
+            try:
+                return await asyncio.to_thread(call.wait)
+            except CallAbandoned:
+                continue
+
+        try:
+            with span("llm.complete", model=model, format=text_format["name"],
+                      prompt_tokens=estimate_tokens(prompt), cached=False, coalesced=False) as attrs:
+                t0 = time.perf_counter()
+                response = await aclient.responses.create(
+                    model=model,
+                    input=prompt,
+                    max_output_tokens=self.max_tokens,
+                    text={"format": text_format},
+                )
+                text = (response.output_text or "").strip()
+                record_usage(attrs, response, text, time.perf_counter() - t0)
+            if text:
+                self.cache.set(key, text)
+        except Exception as e:
+            FLIGHTS.fail(key, call, e)
+            raise
+        except BaseException:
+            FLIGHTS.abandon(key, call)  # e.g. the speculative task was cancelled
+            raise
+        FLIGHTS.resolve(key, call, text)
+        return text
+
+    async def _parse_stage(self, stage: str, prompt: str, raw: str, text_format: dict,
+                           merge_with: dict = None):
+        stage_status = self.status[stage]
+        try:
+            parsed = await asyncio.to_thread(self.finish, prompt, raw, text_format,
+                                             model=self.models[stage])
+            if merge_with is not None:
+                parsed = merge_refinement(merge_with, parsed, self.refined_weights)
+            self.results[stage] = self.finalize(parsed)
+            stage_status["state"] = "done"
+        except Exception as e:
+            stage_status["state"] = "failed"
+            stage_status["error"] = f"Could not parse {stage} scorecard JSON: {e}"
+
+    def _fail(self, stage: str, error: Exception):
+        self.status[stage]["state"] = "failed"
+        self.status[stage]["error"] = str(error)
+
+    async def _run(self):
+        async with make_async_client(self.api_key) as aclient:
+            refine_task = None
+            if self.speculative_prompt:
+                refine_task = asyncio.create_task(
+                    self._complete(aclient, "refined", self.speculative_prompt,
+                                   SCORECARD_DIMENSION_REFINEMENT_FORMAT)
+                )
+
+            try:
+                raw_initial = await self._complete(
+                    aclient, "initial", self.initial_prompt, SCORECARD_INITIAL_FORMAT
+                )
+                await self._parse_stage(
+                    "initial", self.initial_prompt, raw_initial, SCORECARD_INITIAL_FORMAT
+                )
+            except Exception as e:
+                self._fail("initial", e)
+
+            score_initial = self.results["initial"]
+            if score_initial is None:
+                if refine_task is not None:
+                    refine_task.cancel()
+                self.status["refined"]["state"] = "skipped"
+                return
+
+            if refine_task is not None:
+                prompt = self.speculative_prompt
+                try:
+                    raw_refined = await refine_task
+                except Exception as e:
+                    self._fail("refined", e)
+                    return
+                await self._parse_stage(
+                    "refined", prompt, raw_refined, SCORECARD_DIMENSION_REFINEMENT_FORMAT,
+                    merge_with=score_initial,
+                )
+            else:
+                prompt = self.build_refined_prompt(score_initial)
+                try:
+                    raw_refined = await self._complete(
+                        aclient, "refined", prompt, SCORECARD_RESCORE_FORMAT
+                    )
+                except Exception as e:
+                    self._fail("refined", e)
+                    return
+                await self._parse_stage(
+                    "refined", prompt, raw_refined, SCORECARD_RESCORE_FORMAT,
+                    merge_with=score_initial,
+                )
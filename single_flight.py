@@ -0,0 +1,118 @@
+"""
+Process-wide request coalescing ("single flight").
+
+When several sessions send the same prompt while the first request for it is
+still in flight, only the first caller (the leader) goes upstream; the others
+wait for its result. Keys are the response-cache keys from llm_cache.py, so
+"the same prompt" means the same model, prompt, token limit and format.
+
+If the leader fails with an ordinary exception, every waiter receives that
+exception. If the leader is cancelled instead (its Streamlit session reran or
+stopped, a stream was closed early, an asyncio task was cancelled), the call
+is abandoned and one of the waiters takes over as the new leader.
+"""
+
+import threading
+
+
+class CallAbandoned(Exception):
+    """The leader of a coalesced call was cancelled before finishing."""
+
+
+class Call:
+    def __init__(self):
+        self.waiters = 0
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+        self._abandoned = False
+
+    def wait(self, timeout: float = None):
+        if not self._event.wait(timeout):
+            raise TimeoutError("timed out waiting for a coalesced request")
+        if self._abandoned:
+            raise CallAbandoned()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+        self.failed = 0
+
+    def join(self, key: str):
+        """Return `(call, is_leader)`. The leader must settle the call."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = Call()
+            self.leaders += 1
+            return call, True
+
+    def _settle(self, key: str, call: Call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call._event.set()
+
+    def resolve(self, key: str, call: Call, result):
+        call._result = result
+        self._settle(key, call)
+
+    def fail(self, key: str, call: Call, error: Exception):
+        call._error = error
+        with self._lock:
+            self.failed += 1
+        self._settle(key, call)
+
+    def abandon(self, key: str, call: Call):
+        if call._event.is_set():
+            return
+        call._abandoned = True
+        with self._lock:
+            self.abandoned += 1
+        self._settle(key, call)
+
+    def do(self, key: str, fn, timeout: float = None):
+        """Run `fn()` once for all concurrent callers with the same `key`."""
+        while True:
+            call, leader = self.join(key)
+            if not leader:
+                try:
+                    return call.wait(timeout)
+                except CallAbandoned:
+                    continue
+
+            try:
+                result = fn()
+            except Exception as e:
+                self.fail(key, call, e)
+                raise
+            except BaseException:
+                self.abandon(key, call)
+                raise
+            self.resolve(key, call, result)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "abandoned": self.abandoned,
+                "failed": self.failed,
+            }
+
+
+# Shared by every client and background job in the process
+FLIGHTS = SingleFlight()
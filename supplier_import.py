@@ -0,0 +1,219 @@
+"""
+Bulk scoring of supplier panels imported from CSV or Parquet.
+
+The file is read in record batches with pyarrow (Parquet files on disk are
+memory-mapped), each batch is scored with the vectorised engine in
+scorecard.py and appended to a Parquet result file, so memory use depends on
+the batch size, not on the file size. Only a running summary (row count,
+rating counts, best suppliers) is kept in memory; tables are paged back out
+of the result file one row group at a time.
+
+Input: one row per supplier, a name column and one numeric column per
+scorecard dimension (empty or non-numeric cells score 0; a missing dimension
+column is an error, so a misspelled header does not silently score 0).
+"""
+
+import heapq
+import os
+
+import numpy as np
+import pandas as pd
+
+from scorecard import RATING_LABELS, ratings, weighted_totals
+
+RESULTS_DIR = os.environ.get("SUPPLIER_IMPORT_DIR", ".cache/imports")
+DEFAULT_BATCH_ROWS = 50_000
+PAGE_ROWS = 1_000  # result row-group size = one table page
+NAME_COLUMNS = ("Supplier", "supplier", "supplierName", "supplier_name", "name", "Name")
+
+
+def _format(name: str) -> str:
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".parquet", ".pq"):
+        return "parquet"
+    if ext in (".csv", ".txt"):
+        return "csv"
+    raise ValueError(f"unsupported file type {ext or name!r}; use CSV or Parquet")
+
+
+def iter_batches(source, name: str = None, batch_rows: int = DEFAULT_BATCH_ROWS, columns=None,
+                 text_columns=()):
+    """
+    Yield pyarrow RecordBatches from a CSV or Parquet `source` (a path or a
+    binary file object). `name` decides the format when `source` is not a path.
+
+    CSV column types are inferred from the first block, so a later cell that
+    does not fit ("n/a" in a number column) would fail the read; columns in
+    `text_columns` are read as strings and left to the caller to convert.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    fmt = _format(name or source)
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(source, memory_map=isinstance(source, str))
+        yield from parquet.iter_batches(batch_size=batch_rows, columns=columns)
+        return
+
+    # ~batch_rows rows per block for typical panel widths
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=max(1 << 20, batch_rows * 128)),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types={c: pa.string() for c in text_columns},
+        ),
+    )
+    yield from reader
+
+
+def peek_columns(source, name: str = None) -> list:
+    """Column names of a panel without reading it."""
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    fmt = _format(name or source)
+    if fmt == "parquet":
+        return pq.ParquetFile(source, memory_map=isinstance(source, str)).schema_arrow.names
+    reader = pa_csv.open_csv(source, read_options=pa_csv.ReadOptions(block_size=1 << 16))
+    names = reader.schema.names
+    reader.close()
+    return names
+
+
+def guess_name_column(columns: list):
+    for c in NAME_COLUMNS:
+        if c in columns:
+            return c
+    return columns[0] if columns else None
+
+
+def check_columns(columns: list, weights: dict):
+    """Raise ValueError if any dimension of `weights` has no column."""
+    missing = [d for d in weights if d not in columns]
+    if missing:
+        raise ValueError(
+            f"missing score column(s): {', '.join(missing)} (found: {', '.join(columns)})"
+        )
+
+
+def score_batch(frame: pd.DataFrame, weights: dict, name_column: str) -> pd.DataFrame:
+    """Supplier, one column per dimension, Weighted Total and Rating for one batch."""
+    check_columns(list(frame.columns), weights)
+    scores = pd.DataFrame(index=frame.index)
+    for d in weights:
+        scores[d] = pd.to_numeric(frame[d], errors="coerce")
+    scores = scores.fillna(0.0).astype(float)
+
+    totals = np.round(weighted_totals(scores.to_numpy(), np.array(list(weights.values()))), 3)
+    out = scores
+    out.insert(0, "Supplier", frame[name_column].astype(str) if name_column in frame else "")
+    out["Weighted Total"] = totals
+    out["Rating"] = ratings(totals)
+    return out.reset_index(drop=True)
+
+
+class PanelSummary:
+    """Running totals over all scored batches, in bounded memory."""
+
+    def __init__(self, top_n: int = 10):
+        self.rows = 0
+        self.rating_counts = dict.fromkeys(RATING_LABELS.tolist(), 0)
+        self.total_sum = 0.0
+        self.top_n = top_n
+        self._top = []  # min-heap of (total, row number, supplier)
+
+    def add(self, scored: pd.DataFrame):
+        for label, count in scored["Rating"].value_counts().items():
+            self.rating_counts[label] += int(count)
+        self.total_sum += float(scored["Weighted Total"].sum())
+        best = scored.nlargest(self.top_n, "Weighted Total")
+        for i, (supplier, total) in enumerate(zip(best["Supplier"], best["Weighted Total"])):
+            item = (float(total), -(self.rows + i), supplier)
+            if len(self._top) < self.top_n:
+                heapq.heappush(self._top, item)
+            else:
+                heapq.heappushpop(self._top, item)
+        self.rows += len(scored)
+
+    @property
+    def mean_total(self) -> float:
+        return self.total_sum / self.rows if self.rows else 0.0
+
+    def top(self) -> pd.DataFrame:
+        ranked = sorted(self._top, reverse=True)
+        return pd.DataFrame(
+            [(s, t) for t, _, s in ranked], columns=["Supplier", "Weighted Total"]
+        )
+
+
+def score_panel_file(source, out_path: str, weights: dict, name: str = None,
+                     name_column: str = None, batch_rows: int = DEFAULT_BATCH_ROWS,
+                     on_progress=None) -> PanelSummary:
+    """
+    Score every row of `source` and write the results to `out_path` (Parquet,
+    one row group per `PAGE_ROWS` rows). `on_progress(rows_done)` is called
+    after each batch. Raises ValueError, before anything is scored, if a
+    dimension column is missing.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = peek_columns(source, name)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    check_columns(columns, weights)
+    if name_column is None:
+        name_column = guess_name_column(columns)
+
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    summary = PanelSummary()
+    writer = None
+    tmp_path = out_path + ".part"
+    try:
+        for batch in iter_batches(source, name, batch_rows,
+                                  text_columns=[*weights, name_column]):
+            scored = score_batch(batch.to_pandas(), weights, name_column)
+            table = pa.Table.from_pandas(scored, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+            writer.write_table(table, row_group_size=PAGE_ROWS)
+            summary.add(scored)
+            if on_progress:
+                on_progress(summary.rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        raise ValueError("the file has no rows")
+    os.replace(tmp_path, out_path)
+    return summary
+
+
+def read_page(path: str, page: int, page_rows: int = PAGE_ROWS) -> pd.DataFrame:
+    """Rows `page * page_rows` .. of a result file, reading only the row groups needed."""
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path, memory_map=True)
+    start, stop = page * page_rows, (page + 1) * page_rows
+    groups, offset, first = [], 0, None
+    for i in range(parquet.num_row_groups):
+        n = parquet.metadata.row_group(i).num_rows
+        if offset + n > start and offset < stop:
+            groups.append(i)
+            first = offset if first is None else first
+        offset += n
+    if not groups:
+        return pd.DataFrame()
+    frame = parquet.read_row_groups(groups).to_pandas()
+    return frame.iloc[start - first:stop - first].reset_index(drop=True)
+
+
+def row_count(path: str) -> int:
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(path).metadata.num_rows
@@ -0,0 +1,189 @@
+"""
+Lightweight timing spans for the hot paths.
+
+    with span("llm.complete", model=model) as attrs:
+        ...
+        attrs["output_tokens"] = n
+
+Every finished span goes to three places:
+
+- an in-memory ring buffer, which the admin performance tab summarises;
+- a local JSONL file, only if `PERF_SPANS_PATH` is set. Spans are queued
+  and written by a background thread about once a second, so recording
+  never waits on the disk; the file is rotated to `<path>.1` once it
+  reaches `PERF_SPANS_MAX_MB` (default 50), so about twice that is kept;
+- OpenTelemetry, when `opentelemetry-api` is installed. Spans are created
+  with the globally configured tracer provider, so they are exported
+  wherever the deployment points OTel (e.g. `opentelemetry-instrument` with
+  the usual OTEL_* environment variables); without a provider they are no-ops.
+"""
+
+import atexit
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # optional dependency
+    otel_trace = None
+
+SPANS_PATH = os.environ.get("PERF_SPANS_PATH", "")
+SPANS_MAX_BYTES = int(float(os.environ.get("PERF_SPANS_MAX_MB", 50)) * 1024 * 1024)
+BUFFER_SIZE = int(os.environ.get("PERF_SPANS_BUFFER", 5000))
+FLUSH_SECONDS = 1.0
+
+
+class SpanRecorder:
+    def __init__(self, path: str = SPANS_PATH, buffer_size: int = BUFFER_SIZE,
+                 max_bytes: int = SPANS_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.spans = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._pending = queue.SimpleQueue()
+        self._write_lock = threading.Lock()
+        self._flusher = None
+        self._file = None
+        self._tracer = otel_trace.get_tracer("procurement_ai") if otel_trace else None
+
+    def record(self, record: dict):
+        with self._lock:
+            self.spans.append(record)
+            if self.path and self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name="span-flusher", daemon=True
+                )
+                self._flusher.start()
+                atexit.register(self.flush)
+        if self.path:
+            self._pending.put(record)
+
+    # ---------------------------------------------------------
+    # JSONL SINK
+    # ---------------------------------------------------------
+    def _flush_loop(self):
+        while True:
+            first = self._pending.get()
+            time.sleep(FLUSH_SECONDS)  # batch whatever arrives meanwhile
+            self.flush([first])
+
+    def flush(self, records: list = None):
+        """Write queued spans to the JSONL file (the flusher does this every second)."""
+        records = list(records or [])
+        while True:
+            try:
+                records.append(self._pending.get_nowait())
+            except queue.Empty:
+                break
+        if not records:
+            return
+        lines = "".join(json.dumps(r, default=str) + "\n" for r in records)
+        with self._write_lock:
+            try:
+                self._write(lines)
+            except OSError:
+                self._file = None  # telemetry must not break the app; retry next time
+
+    def _write(self, lines: str):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(lines)
+        self._file.flush()
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._file.close()
+            self._file = None
+            os.replace(self.path, self.path + ".1")
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        with ExitStack() as stack:
+            otel_span = None
+            if self._tracer is not None:
+                # Current span, so nested spans get their parent in OTel too
+                otel_span = stack.enter_context(self._tracer.start_as_current_span(name))
+            started = time.time()
+            t0 = time.perf_counter()
+            error = None
+            try:
+                yield attrs
+            except BaseException as e:
+                error = type(e).__name__
+                raise
+            finally:
+                record = {
+                    "name": name,
+                    "start": started,
+                    "duration": time.perf_counter() - t0,
+                    "thread": threading.current_thread().name,
+                    **attrs,
+                }
+                if error:
+                    record["error"] = error
+                self.record(record)
+                if otel_span is not None:
+                    for key, value in attrs.items():
+                        if isinstance(value, (str, bool, int, float)):
+                            otel_span.set_attribute(key, value)
+
+    # ---------------------------------------------------------
+    # SUMMARIES
+    # ---------------------------------------------------------
+    def snapshot(self, prefix: str = "") -> list:
+        with self._lock:
+            return [s for s in self.spans if s["name"].startswith(prefix)]
+
+    def stage_stats(self) -> list:
+        """count / p50 / p95 / max duration (ms) per span name."""
+        by_name = {}
+        for s in self.snapshot():
+            by_name.setdefault(s["name"], []).append(s["duration"])
+        rows = []
+        for name, durations in sorted(by_name.items()):
+            durations.sort()
+            rows.append({
+                "stage": name,
+                "count": len(durations),
+                "p50 (ms)": round(_percentile(durations, 50) * 1000, 1),
+                "p95 (ms)": round(_percentile(durations, 95) * 1000, 1),
+                "max (ms)": round(durations[-1] * 1000, 1),
+            })
+        return rows
+
+    def slowest(self, name: str, n: int = 10) -> list:
+        return sorted(self.snapshot(name), key=lambda s: s["duration"], reverse=True)[:n]
+
+
+def _percentile(ordered: list, pct: float) -> float:
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+# Shared by everything in the process
+RECORDER = SpanRecorder()
+span = RECORDER.span
+
+
+def traced(name: str):
+    """Decorator form of `span`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose and JSON
+    return (len(text) + 3) // 4
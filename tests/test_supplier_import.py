@@ -0,0 +1,48 @@
+"""Bulk scoring of supplier panels (supplier_import.py)."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from supplier_import import read_page, score_panel_file  # noqa: E402
+
+WEIGHTS = {"Quality": 0.5, "Cost": 0.5}
+
+
+def test_non_numeric_cell_after_the_first_block_scores_zero(tmp_path):
+    # Well past the first CSV block, whose cells decide the inferred types
+    rows = 60_000
+    panel = tmp_path / "panel.csv"
+    with open(panel, "w", encoding="utf-8") as f:
+        f.write("Supplier,Quality,Cost\n")
+        for i in range(rows):
+            f.write(f"Supplier {i},8,6\n")
+        f.write("Late supplier,n/a,4\n")
+
+    out = tmp_path / "scored.parquet"
+    summary = score_panel_file(str(panel), str(out), WEIGHTS)
+
+    assert summary.rows == rows + 1
+    last = read_page(str(out), rows // 1000)
+    late = last[last["Supplier"] == "Late supplier"].iloc[0]
+    assert late["Quality"] == 0.0
+    assert late["Cost"] == 4.0
+    assert late["Weighted Total"] == 2.0
+
+
+def test_missing_dimension_column_is_an_error(tmp_path):
+    panel = tmp_path / "panel.csv"
+    panel.write_text("Supplier,Quality,Cots\nAcme,8,6\n", encoding="utf-8")
+
+    out = tmp_path / "scored.parquet"
+    with pytest.raises(ValueError, match="Cost"):
+        score_panel_file(str(panel), str(out), WEIGHTS)
+    assert not out.exists()
@@ -0,0 +1,74 @@
+"""LLM usage is booked to the session that started the work (usage_ledger.py)."""
+
+import contextvars
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Before any app module reads its store paths
+_TMP = tempfile.mkdtemp(prefix="procurement-test-")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["FAKE_LLM_LATENCY_MS"] = "0"
+os.environ["FAKE_LLM_JITTER_MS"] = "0"
+os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = "0"
+for name, file in [("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+                   ("MARKET_STORE_PATH", "market_intel.sqlite3"),
+                   ("ANALYSIS_STORE_PATH", "analyses.sqlite3"),
+                   ("USAGE_STORE_PATH", "usage.sqlite3"),
+                   ("RISK_STORE_DIR", "risk_store"),
+                   ("SUPPLIER_IMPORT_DIR", "supplier_import"),
+                   ("EXPORT_DIR", "exports")]:
+    os.environ[name] = os.path.join(_TMP, file)
+os.environ["PERF_SPANS_PATH"] = ""
+
+from job_queue import JobQueue  # noqa: E402
+from usage_ledger import UsageLedger, set_session  # noqa: E402
+
+
+def _wait(job, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while not job.finished:
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.01)
+
+
+def test_job_submitted_from_fresh_context_is_booked_to_its_session(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.sqlite3"))
+    queue = JobQueue(max_workers=1)
+
+    def fragment_run():
+        # A fragment rerun starts from an empty context, like a new thread
+        set_session("session-1")
+        return queue.submit("session-1", "contract", "key",
+                            lambda job: ledger.add("gpt-4.1-mini", "contract_items", 10, 10, 0.01))
+
+    job = contextvars.Context().run(fragment_run)
+    _wait(job)
+    assert job.error is None
+    assert [row["session"] for row in ledger.totals("session")] == ["session-1"]
+
+
+def test_generation_clicked_inside_fragment_is_booked_to_the_session():
+    pytest.importorskip("streamlit")
+    from streamlit.testing.v1 import AppTest
+
+    from catalog import task1_categories
+    from usage_ledger import LEDGER
+
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+    at.secrets["OPENAI_API_KEY"] = "fake"
+    at.run()
+    at.selectbox[0].select(task1_categories[0])
+    next(c for c in at.checkbox if c.label.startswith("Regenerate")).check()
+    next(b for b in at.button if b.label.startswith("🔍")).click().run()
+
+    assert at.session_state["market_data"]
+    sessions = {row["session"] for row in LEDGER.totals("session")}
+    assert sessions == {at.session_state["session_id"]}
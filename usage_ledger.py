@@ -0,0 +1,291 @@
+"""
+Token and cost accounting of LLM requests, with daily and hourly budgets.
+
+Every upstream request (cache hits cost nothing and are not recorded) is a
+row in a SQLite ledger (`USAGE_STORE_PATH`, default .cache/usage.sqlite3;
+WAL mode, one connection per thread, like the other stores; an empty path
+disables it). Each row holds the time, the UTC day, the session, the task
+(the response format name unless set with `attribute`), the model, input,
+cached and output tokens, the cost and the latency. The ledger is shared
+by every process that uses the same file, so budgets hold across the app,
+background jobs and batch runs.
+
+The session is taken from a context variable: the app sets it with
+`set_session` at the start of every script run and of every fragment that
+starts LLM work (a fragment rerun starts from a fresh context), and work
+handed to thread pools carries it along via `contextvars.copy_context()`.
+Anything else is "background".
+
+Budgets in USD (unset or 0 means no limit):
+
+    LLM_SESSION_BUDGET_USD   per session and UTC day
+    LLM_GLOBAL_BUDGET_USD    all sessions and jobs per UTC day
+    LLM_HOURLY_BUDGET_USD    all requests in the last rolling hour
+
+They degrade in steps rather than failing outright:
+
+1. From `LLM_BUDGET_DOWNGRADE_AT` (default 0.8) of a daily budget, requests
+   are sent to `LLM_BUDGET_MODEL` (default gpt-4.1-nano) instead.
+2. While the rolling hour is over budget, requests wait for older spending
+   to age out (up to `LLM_BUDGET_MAX_WAIT` seconds, default 120), so
+   bursts are queued and spread out instead of throttling everyone.
+3. Once a daily budget is used up, upstream requests raise
+   `BudgetExceeded`. Cached responses are still served, and the app falls
+   back to stored analyses.
+"""
+
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+USAGE_STORE_PATH = os.environ.get("USAGE_STORE_PATH", ".cache/usage.sqlite3")
+
+SESSION_BUDGET_USD = float(os.environ.get("LLM_SESSION_BUDGET_USD") or 0)
+GLOBAL_BUDGET_USD = float(os.environ.get("LLM_GLOBAL_BUDGET_USD") or 0)
+HOURLY_BUDGET_USD = float(os.environ.get("LLM_HOURLY_BUDGET_USD") or 0)
+DOWNGRADE_AT = float(os.environ.get("LLM_BUDGET_DOWNGRADE_AT", 0.8))
+BUDGET_MODEL = os.environ.get("LLM_BUDGET_MODEL", os.environ.get("LLM_SMALL_MODEL", "gpt-4.1-nano"))
+MAX_WAIT_SECONDS = float(os.environ.get("LLM_BUDGET_MAX_WAIT", 120))
+
+BACKGROUND = "background"
+OK, DOWNGRADE, EXHAUSTED = "ok", "downgrade", "exhausted"
+
+_SESSION = contextvars.ContextVar("llm_session", default=BACKGROUND)
+_TASK = contextvars.ContextVar("llm_task", default=None)
+
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+
+def set_session(session: str):
+    """Attribute requests made from the current context to `session`."""
+    _SESSION.set(session)
+
+
+def current_session() -> str:
+    return _SESSION.get()
+
+
+@contextmanager
+def attribute(session: str = None, task: str = None):
+    """Attribute requests made inside the block to `session` and/or `task`."""
+    tokens = []
+    if session is not None:
+        tokens.append((_SESSION, _SESSION.set(session)))
+    if task is not None:
+        tokens.append((_TASK, _TASK.set(task)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def _day(ts: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+class UsageLedger:
+    GROUPS = ("day", "session", "task", "model")
+
+    def __init__(self, path: str = USAGE_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialised = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._init_lock:
+                if not self._initialised:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+                if not self._initialised:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS llm_usage (
+                            id             INTEGER PRIMARY KEY AUTOINCREMENT,
+                            ts             REAL NOT NULL,
+                            day            TEXT NOT NULL,
+                            session        TEXT NOT NULL,
+                            task           TEXT NOT NULL,
+                            model          TEXT,
+                            input_tokens   INTEGER NOT NULL,
+                            cached_tokens  INTEGER NOT NULL,
+                            output_tokens  INTEGER NOT NULL,
+                            cost_usd       REAL NOT NULL,
+                            latency        REAL
+                        );
+                        CREATE INDEX IF NOT EXISTS idx_usage_day_session ON llm_usage(day, session);
+                        CREATE INDEX IF NOT EXISTS idx_usage_ts ON llm_usage(ts);
+                        """
+                    )
+                    self._initialised = True
+            self._local.conn = conn
+        return conn
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def add(self, model: str, task: str, input_tokens: int, output_tokens: int, cost_usd: float,
+            cached_tokens: int = 0, latency: float = None, session: str = None):
+        if not self.enabled:
+            return
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO llm_usage(ts, day, session, task, model, input_tokens, cached_tokens, "
+            "output_tokens, cost_usd, latency) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (now, _day(now), session or current_session(), _TASK.get() or task or "text", model,
+             int(input_tokens or 0), int(cached_tokens or 0), int(output_tokens or 0),
+             float(cost_usd or 0.0), latency),
+        )
+
+    def spent_today(self, session: str = None) -> float:
+        if not self.enabled:
+            return 0.0
+        sql = "SELECT COALESCE(SUM(cost_usd), 0) FROM llm_usage WHERE day = ?"
+        params = [_day(time.time())]
+        if session is not None:
+            sql += " AND session = ?"
+            params.append(session)
+        return self._conn().execute(sql, params).fetchone()[0]
+
+    def spent_since(self, since: float) -> float:
+        if not self.enabled:
+            return 0.0
+        return self._conn().execute(
+            "SELECT COALESCE(SUM(cost_usd), 0) FROM llm_usage WHERE ts > ?", (since,)
+        ).fetchone()[0]
+
+    def ages_out(self, since: float, amount: float) -> float:
+        """Seconds until at least `amount` USD of the spending after `since` is an hour old."""
+        rows = self._conn().execute(
+            "SELECT ts, cost_usd FROM llm_usage WHERE ts > ? ORDER BY ts", (since,)
+        )
+        freed = 0.0
+        for ts, cost in rows:
+            freed += cost
+            if freed >= amount:
+                return max(0.0, ts - since)
+        return 3600.0
+
+    def totals(self, group_by: str, days: int = 7, session: str = None) -> list:
+        """Requests, tokens, cost and mean latency per `group_by` over the last `days` days."""
+        if group_by not in self.GROUPS:
+            raise ValueError(f"group_by must be one of {self.GROUPS}")
+        if not self.enabled:
+            return []
+        sql = (
+            f"SELECT {group_by}, COUNT(*), SUM(input_tokens), SUM(cached_tokens), "
+            "SUM(output_tokens), SUM(cost_usd), AVG(latency) FROM llm_usage WHERE day >= ?"
+        )
+        params = [_day(time.time() - (days - 1) * 86400)]
+        if session is not None:
+            sql += " AND session = ?"
+            params.append(session)
+        sql += f" GROUP BY {group_by} ORDER BY SUM(cost_usd) DESC"
+        return [
+            {group_by: key, "requests": n, "input_tokens": inp, "cached_tokens": cached,
+             "output_tokens": out, "cost_usd": cost, "mean_latency": latency}
+            for key, n, inp, cached, out, cost, latency in self._conn().execute(sql, params)
+        ]
+
+
+class Budget:
+    def __init__(self, ledger: UsageLedger, session_usd: float = SESSION_BUDGET_USD,
+                 global_usd: float = GLOBAL_BUDGET_USD, hourly_usd: float = HOURLY_BUDGET_USD,
+                 downgrade_at: float = DOWNGRADE_AT, model: str = BUDGET_MODEL,
+                 max_wait_seconds: float = MAX_WAIT_SECONDS):
+        self.ledger = ledger
+        self.session_usd = session_usd
+        self.global_usd = global_usd
+        self.hourly_usd = hourly_usd
+        self.downgrade_at = downgrade_at
+        self.model = model
+        self.max_wait_seconds = max_wait_seconds
+        self._lock = threading.Lock()
+        self.downgraded = 0
+        self.queued = 0
+        self.waited_seconds = 0.0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ledger.enabled and bool(self.session_usd or self.global_usd or self.hourly_usd)
+
+    def status(self, session: str = None) -> dict:
+        """Spending against each daily budget and the resulting state for `session`."""
+        session = session or current_session()
+        spent_session = self.ledger.spent_today(session) if self.session_usd else 0.0
+        spent_global = self.ledger.spent_today() if self.global_usd else 0.0
+        used = max(
+            spent_session / self.session_usd if self.session_usd else 0.0,
+            spent_global / self.global_usd if self.global_usd else 0.0,
+        )
+        state = EXHAUSTED if used >= 1 else DOWNGRADE if used >= self.downgrade_at else OK
+        return {"state": state, "used": used, "session_usd": spent_session,
+                "global_usd": spent_global}
+
+    def model_for(self, model: str, session: str = None) -> str:
+        """`model`, or the budget model once a daily budget is nearly used up."""
+        if not self.enabled or model == self.model:
+            return model
+        if self.status(session)["state"] == OK:
+            return model
+        with self._lock:
+            self.downgraded += 1
+        return self.model
+
+    def admit(self, session: str = None):
+        """
+        Call before every upstream request. Waits while the rolling hour is
+        over budget and raises `BudgetExceeded` when a daily budget is used up
+        (or the wait would exceed `max_wait_seconds`).
+        """
+        if not self.enabled:
+            return
+        if self.status(session)["state"] == EXHAUSTED:
+            with self._lock:
+                self.rejected += 1
+            raise BudgetExceeded("daily LLM budget used up; showing stored results only")
+        if not self.hourly_usd:
+            return
+
+        deadline = time.monotonic() + self.max_wait_seconds
+        waited = False
+        while True:
+            window_start = time.time() - 3600
+            over = self.ledger.spent_since(window_start) - self.hourly_usd
+            if over < 0:
+                return
+            if not waited:
+                waited = True
+                with self._lock:
+                    self.queued += 1
+            wait = self.ledger.ages_out(window_start, over) + 0.5
+            if time.monotonic() + wait > deadline:
+                with self._lock:
+                    self.rejected += 1
+                raise BudgetExceeded("hourly LLM budget used up; try again in a few minutes")
+            delay = min(wait, 5.0)  # re-check: other processes spend too
+            time.sleep(delay)
+            with self._lock:
+                self.waited_seconds += delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"downgraded": self.downgraded, "queued": self.queued,
+                    "waited_seconds": self.waited_seconds, "rejected": self.rejected}
+
+
+LEDGER = UsageLedger()
+BUDGET = Budget(LEDGER)